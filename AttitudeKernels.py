@@ -0,0 +1,198 @@
+# Module: AttitudeKernels.py
+
+import numpy as np
+
+# Quaternions are (N, 4) float64 arrays of [w, x, y, z] rotating from the body frame to the earth frame. The kernels
+# calculate the entries they need column by column with the out argument of the ufuncs, so the only allocations are the
+# returned arrays and a few scratch arrays. The quaternions are processed in blocks, so the scratch arrays stay in the
+# cache between the passes over a block
+
+# Number of quaternions per block
+ATTITUDE_BLOCK_SIZE = 16384
+
+# Names of the entries of the rotation matrix from the body frame to the earth frame in row-major order
+ROTATION_MATRIX_ENTRIES = ['R[{0}][{1}]'.format(row, column) for row in range(3) for column in range(3)]
+
+# Signs of the squared components w, x, y, z in the diagonal entries of the rotation matrix
+_DIAGONAL_SIGNS = {0: (1, 1, -1, -1), 1: (1, -1, 1, -1), 2: (1, -1, -1, 1)}
+# Off-diagonal entries of the rotation matrix are 2 * (q[a] * q[b] + sign * q[c] * q[d]), by (row, column) the tuple
+# (a, b, sign, c, d)
+_OFF_DIAGONAL_TERMS = {(0, 1): (1, 2, -1, 0, 3), (1, 0): (1, 2, 1, 0, 3),
+                       (0, 2): (1, 3, 1, 0, 2), (2, 0): (1, 3, -1, 0, 2),
+                       (1, 2): (2, 3, -1, 0, 1), (2, 1): (2, 3, 1, 0, 1)}
+
+
+# Returns the quaternion components as one contiguous (N, 4) array
+def stack_quaternions(q0, q1, q2, q3):
+    q = np.empty((len(q0), 4))
+    for i, component in enumerate([q0, q1, q2, q3]):
+        q[:, i] = component
+    return q
+
+
+# Returns the (start, stop) of the blocks of num_samples quaternions
+def get_blocks(num_samples):
+    return [(start, min(start + ATTITUDE_BLOCK_SIZE, num_samples)) for start in range(0, num_samples, ATTITUDE_BLOCK_SIZE)]
+
+
+# Calculate one entry of the rotation matrix of the quaternions into out, scratch is overwritten
+def get_rotation_matrix_entry(q, row, column, out, scratch):
+    if row == column:
+        np.multiply(q[:, 0], q[:, 0], out=out)
+        for i, sign in enumerate(_DIAGONAL_SIGNS[row][1:], 1):
+            np.multiply(q[:, i], q[:, i], out=scratch)
+            if sign > 0:
+                out += scratch
+            else:
+                out -= scratch
+        return out
+
+    a, b, sign, c, d = _OFF_DIAGONAL_TERMS[(row, column)]
+    np.multiply(q[:, a], q[:, b], out=out)
+    np.multiply(q[:, c], q[:, d], out=scratch)
+    if sign > 0:
+        out += scratch
+    else:
+        out -= scratch
+    out *= 2.0
+    return out
+
+
+# Returns the rotation matrices of the quaternions as a tuple of the entries in the order of ROTATION_MATRIX_ENTRIES
+def rotation_matrix(q):
+    entries = np.empty((9, len(q)))
+    scratch = np.empty(min(len(q), ATTITUDE_BLOCK_SIZE))
+    for start, stop in get_blocks(len(q)):
+        for row in range(3):
+            for column in range(3):
+                get_rotation_matrix_entry(q[start:stop], row, column, entries[3 * row + column, start:stop], scratch[:stop - start])
+    return tuple(entries)
+
+
+# Returns arctan2(sign * R[row_y][column_y], R[row_x][column_x]) of the quaternions in out
+def _matrix_angle(q, y_entry, sign, x_entry, out, x_value, scratch):
+    get_rotation_matrix_entry(q, y_entry[0], y_entry[1], out, scratch)
+    if sign < 0:
+        np.negative(out, out=out)
+    get_rotation_matrix_entry(q, x_entry[0], x_entry[1], x_value, scratch)
+    return np.arctan2(out, x_value, out=out)
+
+
+# Returns arcsin(sign * R[row][column]) of the quaternions in out. Rounding errors of normalized quaternions are clipped
+def _matrix_asin(q, entry, sign, out, scratch):
+    get_rotation_matrix_entry(q, entry[0], entry[1], out, scratch)
+    if sign < 0:
+        np.negative(out, out=out)
+    np.clip(out, -1.0, 1.0, out=out)
+    return np.arcsin(out, out=out)
+
+
+# Returns the yaw, roll, pitch Euler angles of the quaternions with the 312 rotation sequence [rad]
+def euler312(q):
+    yaw, roll, pitch = np.empty((3, len(q)))
+    x_value, scratch = np.empty((2, min(len(q), ATTITUDE_BLOCK_SIZE)))
+    for start, stop in get_blocks(len(q)):
+        block, size = q[start:stop], stop - start
+        _matrix_angle(block, (0, 1), -1, (1, 1), yaw[start:stop], x_value[:size], scratch[:size])
+        _matrix_asin(block, (2, 1), 1, roll[start:stop], scratch[:size])
+        _matrix_angle(block, (2, 0), -1, (2, 2), pitch[start:stop], x_value[:size], scratch[:size])
+    return yaw, roll, pitch
+
+
+# Returns the roll, pitch, yaw Euler angles of the quaternions with the 321 rotation sequence [rad]
+def euler321(q):
+    roll, pitch, yaw = np.empty((3, len(q)))
+    x_value, scratch = np.empty((2, min(len(q), ATTITUDE_BLOCK_SIZE)))
+    for start, stop in get_blocks(len(q)):
+        block, size = q[start:stop], stop - start
+        _matrix_angle(block, (2, 1), 1, (2, 2), roll[start:stop], x_value[:size], scratch[:size])
+        _matrix_asin(block, (2, 0), -1, pitch[start:stop], scratch[:size])
+        _matrix_angle(block, (1, 0), 1, (0, 0), yaw[start:stop], x_value[:size], scratch[:size])
+    return roll, pitch, yaw
+
+
+# Returns the index of the last sample at or before every time of new_time, -1 before the first sample. If new_time is
+# sorted, the samples are searched in new_time, which is faster for the usual case of fewer samples than new times
+def get_previous_indices(time, new_time):
+    if len(new_time) > len(time) and (np.diff(new_time) >= 0).all():
+        counts = np.bincount(np.searchsorted(new_time, time, side='left'), minlength=len(new_time) + 1)[:len(new_time)]
+        return np.cumsum(counts) - 1
+
+    return np.searchsorted(time, new_time, side='right') - 1
+
+
+# Returns the quaternions interpolated at new_time. Consecutive quaternions are flipped to the same hemisphere and
+# interpolated linearly, then normalized. Times outside of the samples are nan. time has to be sorted
+def interpolate_quaternions(time, q, new_time):
+    new_q = np.full((len(new_time), 4), np.nan)
+    if len(time) < 2:
+        return new_q
+
+    # q and -q are the same rotation, every quaternion is flipped to the hemisphere of the previous one
+    signs = np.ones(len(q))
+    np.cumprod(np.where(np.einsum('ij,ij->i', q[1:], q[:-1]) < 0, -1.0, 1.0), out=signs[1:])
+    q = q * signs[:, np.newaxis]
+    idx = get_previous_indices(time, new_time)
+    np.clip(idx, 0, len(time) - 2, out=idx)
+    dt = time[idx + 1] - time[idx]
+    alpha = np.zeros(len(new_time))
+    np.divide(new_time - time[idx], dt, out=alpha, where=dt > 0)
+    previous, following = np.empty((2, min(len(new_time), ATTITUDE_BLOCK_SIZE), 4))
+    norm = np.empty(min(len(new_time), ATTITUDE_BLOCK_SIZE))
+    ones = np.ones(4)
+    for start, stop in get_blocks(len(new_time)):
+        size = stop - start
+        np.take(q, idx[start:stop], axis=0, out=previous[:size])
+        np.take(q, idx[start:stop] + 1, axis=0, out=following[:size])
+        following[:size] -= previous[:size]
+        following[:size] *= alpha[start:stop, np.newaxis]
+        previous[:size] += following[:size]
+        np.square(previous[:size], out=following[:size])
+        np.dot(following[:size], ones, out=norm[:size])
+        np.sqrt(norm[:size], out=norm[:size])
+        np.divide(previous[:size], norm[:size, np.newaxis], out=new_q[start:stop])
+    new_q[(new_time < time[0]) | (new_time > time[-1])] = np.nan
+    return new_q
+
+
+# Hamilton product of the conjugate of q with q_setpoint, by component the terms (sign, index in q, index in q_setpoint)
+_ERROR_TERMS = [[(1, 0, 0), (1, 1, 1), (1, 2, 2), (1, 3, 3)],
+                [(1, 0, 1), (-1, 1, 0), (-1, 2, 3), (1, 3, 2)],
+                [(1, 0, 2), (1, 1, 3), (-1, 2, 0), (-1, 3, 1)],
+                [(1, 0, 3), (-1, 1, 2), (1, 2, 1), (-1, 3, 0)]]
+
+
+# Returns the rotation from the quaternions q to the quaternions q_setpoint in the body frame as the x, y, z components
+# of the rotation vector and its angle [rad], the rotation is q^-1 * q_setpoint along the shortest way
+def attitude_error(q, q_setpoint):
+    error = np.empty((4, len(q)))
+    norm, scratch = np.empty((2, min(len(q), ATTITUDE_BLOCK_SIZE)))
+    for start, stop in get_blocks(len(q)):
+        block_error, block_norm, block_scratch = error[:, start:stop], norm[:stop - start], scratch[:stop - start]
+        for out, component_terms in zip(block_error, _ERROR_TERMS):
+            sign, i, j = component_terms[0]
+            np.multiply(q[start:stop, i], q_setpoint[start:stop, j], out=out)
+            for sign, i, j in component_terms[1:]:
+                np.multiply(q[start:stop, i], q_setpoint[start:stop, j], out=block_scratch)
+                if sign > 0:
+                    out += block_scratch
+                else:
+                    out -= block_scratch
+
+        # The shortest rotation has a positive w, q_error and -q_error are the same rotation
+        w, vector = block_error[0], block_error[1:]
+        np.copysign(1.0, w, out=block_scratch)
+        w *= block_scratch
+        vector *= block_scratch
+        # The angle is 2 * arctan2(|v|, w), the vector part is scaled from |v| to the angle. The angle is stored in w
+        np.multiply(vector[0], vector[0], out=block_norm)
+        for component in vector[1:]:
+            np.multiply(component, component, out=block_scratch)
+            block_norm += block_scratch
+        np.sqrt(block_norm, out=block_norm)
+        np.arctan2(block_norm, w, out=w)
+        w *= 2.0
+        block_scratch[:] = 0.0
+        np.divide(w, block_norm, out=block_scratch, where=block_norm > 0)
+        vector *= block_scratch
+    return error[1], error[2], error[3], error[0]
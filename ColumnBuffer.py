@@ -0,0 +1,106 @@
+# Module: ColumnBuffer.py
+
+import numpy as np
+
+
+# Returns buffer with values written at length. A full buffer is replaced by one with twice the capacity, so appending
+# takes amortized constant time per value
+def append_to_buffer(buffer, length, values):
+    if length + len(values) > len(buffer):
+        new_buffer = np.empty(max(2 * len(buffer), length + len(values)), dtype=buffer.dtype)
+        new_buffer[:length] = buffer[:length]
+        buffer = new_buffer
+    buffer[length:length + len(values)] = values
+
+    return buffer
+
+
+# Columns of a topic that samples can be appended to, e.g. while following a logfile that is still written. The
+# dataframe of the topic is made of views of the columns, so it can be replaced after an append without copying
+class ColumnBuffer():
+    def __init__(self, index, columns):
+        self.length = len(index)
+        # Position of the first row in the buffers
+        self._start = 0
+        self._index = np.array(index, dtype=np.float64)
+        self._columns = {name: np.array(values) for name, values in columns.items()}
+
+    @property
+    def index(self):
+        return self._index[self._start:self._start + self.length]
+
+    @property
+    def column_names(self):
+        return list(self._columns)
+
+    def has_column(self, name):
+        return name in self._columns
+
+    def get_column(self, name):
+        return self._columns[name][self._start:self._start + self.length]
+
+    # Add a column with a value for every row
+    def add_column(self, name, values):
+        self._columns[name] = np.array(values)
+
+    def remove_column(self, name):
+        self._columns.pop(name, None)
+
+    # Append rows, columns has to contain new values for all columns
+    def append(self, index, columns):
+        for name, values in columns.items():
+            self._columns[name] = append_to_buffer(self._columns[name], self.length, values)
+        self._index = append_to_buffer(self._index, self.length, index)
+        self.length += len(index)
+
+    def get_series(self, name, index):
+        import pandas as pd
+        return pd.Series(self.get_column(name), index=index, name=name, copy=False)
+
+    # Allocated size of the buffers [bytes]
+    @property
+    def nbytes(self):
+        return self._index.nbytes + sum(buffer.nbytes for buffer in self._columns.values())
+
+    def get_dataframe(self, column_names):
+        import pandas as pd
+        return pd.DataFrame({name: self.get_column(name) for name in column_names}, index=pd.Index(self.index, copy=False), copy=False)
+
+
+# Columns that keep the last capacity rows, e.g. of a live stream, so their memory is bounded. The rows are stored in
+# buffers of twice the capacity and the kept rows are moved to the front when the end of the buffers is reached. The
+# columns are therefore always contiguous and appending takes amortized constant time per row, but views of the columns
+# are only valid until the next append
+class RingColumnBuffer(ColumnBuffer):
+    def __init__(self, capacity, dtypes):
+        self.capacity = capacity
+        self.length = 0
+        self._start = 0
+        self._index = np.empty(2 * capacity, dtype=np.float64)
+        self._columns = {name: np.empty(2 * capacity, dtype=dtype) for name, dtype in dtypes}
+
+    # Add a column with a value for every kept row
+    def add_column(self, name, values):
+        values = np.asarray(values)
+        self._columns[name] = np.empty(2 * self.capacity, dtype=values.dtype)
+        self._columns[name][self._start:self._start + self.length] = values
+
+    # Append rows, the oldest rows are dropped if there are more than capacity rows
+    def append(self, index, columns):
+        num_rows = min(len(index), self.capacity)
+        end = self._start + self.length
+        if end + num_rows > len(self._index):
+            num_kept = min(self.length, self.capacity - num_rows)
+            for buffer in [self._index] + list(self._columns.values()):
+                buffer[:num_kept] = buffer[end - num_kept:end]
+            self._start = 0
+            self.length = num_kept
+            end = num_kept
+
+        self._index[end:end + num_rows] = index[len(index) - num_rows:]
+        for name, values in columns.items():
+            self._columns[name][end:end + num_rows] = values[len(values) - num_rows:]
+        self.length += num_rows
+        if self.length > self.capacity:
+            self._start += self.length - self.capacity
+            self.length = self.capacity
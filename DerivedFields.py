@@ -0,0 +1,206 @@
+# Module: DerivedFields.py
+
+import collections
+import numpy as np
+from AttitudeKernels import *
+
+# Input name that refers to the timestamps of a topic in seconds, (topic, INDEX) refers to the timestamps of another topic
+INDEX = '__index__'
+
+# Dictionary of topics created in postprocessing and the logged topic they are calculated from. The bits of the flag
+# fields of the logged topic are added to the virtual topic
+VIRTUAL_TOPICS = {'estimator_flags*': 'estimator_status_0'}
+
+# Dictionary of the derived fields of every topic (topic name -> field name -> DerivedField), in the order they are
+# listed in the topic
+DERIVED_FIELDS = collections.OrderedDict()
+
+
+# Field calculated in postprocessing from logged or other derived fields. It is only calculated when it is accessed
+class DerivedField():
+    def __init__(self, topic_str, field_str, input_fields, kernel, optional_input_fields=(), output_fields=None, elementwise=True):
+        self.topic_str = topic_str
+        self.field_str = field_str
+        # Fields calculated together in one call of the kernel, which then returns a tuple of their values
+        self.output_fields = output_fields if output_fields is not None else [field_str]
+        # Inputs are fields of the same topic (of the source topic for virtual topics), INDEX or (topic, field) tuples
+        self.input_fields = list(input_fields)
+        # Inputs that are passed to the kernel as None if they are not present
+        self.optional_input_fields = list(optional_input_fields)
+        # Vectorized function that calculates the values of the field from the values of the inputs
+        self.kernel = kernel
+        # True if every output sample only depends on the input samples of the same row, so the field can be extended
+        # by calculating the kernel on appended rows only
+        self.elementwise = elementwise
+
+
+def register(topic_str, field_str, input_fields, kernel, optional_input_fields=(), elementwise=True):
+    topic_fields = DERIVED_FIELDS.setdefault(topic_str, collections.OrderedDict())
+    topic_fields[field_str] = DerivedField(topic_str, field_str, input_fields, kernel, optional_input_fields, elementwise=elementwise)
+
+
+# Register fields that are calculated together, kernel returns a tuple with the values of every field
+def register_group(topic_str, field_strs, input_fields, kernel, optional_input_fields=(), elementwise=True):
+    topic_fields = DERIVED_FIELDS.setdefault(topic_str, collections.OrderedDict())
+    for field_str in field_strs:
+        topic_fields[field_str] = DerivedField(topic_str, field_str, input_fields, kernel, optional_input_fields, list(field_strs), elementwise)
+
+
+def norm(*components):
+    return np.sqrt(sum(component ** 2 for component in components))
+
+
+def register_norm(topic_str, field_str, input_fields):
+    register(topic_str, field_str, input_fields, norm)
+
+
+# Register a field calculated with np.arctan2 together with its value in degrees
+def register_angle(topic_str, field_str, y_field, x_field):
+    register(topic_str, field_str, [y_field, x_field], np.arctan2)
+    register(topic_str, field_str + ' [deg]', [field_str], np.rad2deg)
+
+
+def get_quaternion_fields(field_name_suffix):
+    return [field_name_suffix + '[{0}]'.format(i) for i in range(4)]
+
+
+# Register the Euler angles with the 312 and 321 rotation sequences of a quaternion, the angles of a sequence are
+# calculated together
+def register_yaw_pitch_roll(topic_str, field_name_suffix):
+    q = get_quaternion_fields(field_name_suffix)
+    for names, kernel in [(['yaw312*', 'roll312*', 'pitch312*'], euler312), (['roll321*', 'pitch321*', 'yaw321*'], euler321)]:
+        field_strs = [field_name_suffix + '_' + name for name in names]
+        register_group(topic_str, field_strs, q, lambda *q, kernel=kernel: kernel(stack_quaternions(*q)))
+        for field_str in field_strs:
+            register(topic_str, field_str + ' [deg]', [field_str], np.rad2deg)
+
+
+def register_rotation_matrix(topic_str, field_name_suffix):
+    register_group(topic_str, [field_name_suffix + '_' + name + '*' for name in ROTATION_MATRIX_ENTRIES], get_quaternion_fields(field_name_suffix),
+                   lambda *q: rotation_matrix(stack_quaternions(*q)))
+
+
+def attitude_error_to_setpoint(index, q0, q1, q2, q3, setpoint_index, *q_setpoint):
+    q_setpoint = stack_quaternions(*q_setpoint)
+    if (np.diff(setpoint_index) < 0).any():
+        order = np.argsort(setpoint_index, kind='stable')
+        setpoint_index, q_setpoint = setpoint_index[order], q_setpoint[order]
+    return tuple(np.rad2deg(error) for error in attitude_error(stack_quaternions(q0, q1, q2, q3), interpolate_quaternions(setpoint_index, q_setpoint, index)))
+
+
+# Register the rotation from the attitude to the attitude setpoint in the body frame [deg], the setpoint is interpolated
+# at the timestamps of the attitude
+def register_attitude_error(topic_str, field_name_suffix, setpoint_topic_str, setpoint_field_name_suffix):
+    register_group(topic_str, ['attitude_error_x* [deg]', 'attitude_error_y* [deg]', 'attitude_error_z* [deg]', 'attitude_error* [deg]'],
+                   [INDEX] + get_quaternion_fields(field_name_suffix) + [(setpoint_topic_str, INDEX)] +
+                   [(setpoint_topic_str, field_str) for field_str in get_quaternion_fields(setpoint_field_name_suffix)],
+                   attitude_error_to_setpoint, elementwise=False)
+
+
+# Function from flight_review (https://github.com/PX4/flight_review/)
+def map_projection(lat, lon, anchor_lat, anchor_lon):
+    """ convert lat, lon in [rad] to x, y in [m] with an anchor position """
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    cos_d_lon = np.cos(lon - anchor_lon)
+    sin_anchor_lat = np.sin(anchor_lat)
+    cos_anchor_lat = np.cos(anchor_lat)
+
+    arg = np.clip(sin_anchor_lat * sin_lat + cos_anchor_lat * cos_lat * cos_d_lon, -1, 1)
+    c = np.arccos(arg)
+    # c / sin(c) goes to 1 as the position approaches the anchor
+    k = np.ones_like(c)
+    not_at_anchor = np.abs(c) >= np.finfo(float).eps
+    k[not_at_anchor] = c[not_at_anchor] / np.sin(c[not_at_anchor])
+
+    CONSTANTS_RADIUS_OF_EARTH = 6371000
+    x = k * (cos_anchor_lat * sin_lat - sin_anchor_lat * cos_lat * cos_d_lon) * \
+        CONSTANTS_RADIUS_OF_EARTH
+    y = k * cos_lat * np.sin(lon - anchor_lon) * CONSTANTS_RADIUS_OF_EARTH
+
+    return x, y
+
+
+# Returns the anchor of the projection in [rad]. The reference position of the local position estimate is used if it
+# is set, otherwise the first position
+def get_anchor(lat, lon, ref_timestamp, ref_lat, ref_lon):
+    if ref_timestamp is not None and ref_lat is not None and ref_lon is not None:
+        indices = np.nonzero(ref_timestamp)
+        if len(indices[0]) > 0:
+            return np.deg2rad(ref_lat[indices[0][0]]), np.deg2rad(ref_lon[indices[0][0]])
+
+    return lat[0], lon[0]
+
+
+# Project lat, lon in [deg] * div to north and east in [m]. Every topic is projected on its own when its derived fields
+# are first requested, in one vectorized call
+def lat_lon_m(lat, lon, div, *anchor_fields):
+    lat = np.deg2rad(lat / div)
+    lon = np.deg2rad(lon / div)
+    return map_projection(lat, lon, *get_anchor(lat, lon, *anchor_fields))
+
+
+def register_lat_lon_m(topic_str, lat_str, lon_str, div=1):
+    anchor_fields = [('vehicle_local_position_0', 'ref_timestamp'), ('vehicle_local_position_0', 'ref_lat'), ('vehicle_local_position_0', 'ref_lon')]
+    register_group(topic_str, [lat_str + '_m*', lon_str + '_m*'], [lat_str, lon_str], lambda lat, lon, *anchor: lat_lon_m(lat, lon, div, *anchor), anchor_fields,
+                   elementwise=False)
+
+
+# Add norm of magnetometer and accelerometer measurement to sensor_combined
+register_norm('sensor_combined_0', 'magnetometer_ga_norm*', ['magnetometer_ga[0]', 'magnetometer_ga[1]', 'magnetometer_ga[2]'])
+register_norm('sensor_combined_0', 'accelerometer_m_s2_norm*', ['accelerometer_m_s2[0]', 'accelerometer_m_s2[1]', 'accelerometer_m_s2[2]'])
+
+# Add windspeed magnitude and direction to wind_estimate
+register_norm('wind_estimate_0', 'windspeed_magnitude*', ['windspeed_north', 'windspeed_east'])
+register_angle('wind_estimate_0', 'windspeed_direction*', 'windspeed_east', 'windspeed_north')
+
+# Add vxy and vxyz to vehicle_local_position
+register_norm('vehicle_local_position_0', 'vxy*', ['vx', 'vy'])
+register_norm('vehicle_local_position_0', 'vxyz*', ['vx', 'vy', 'vz'])
+
+# Add vel_ne and vel_ned to vehicle_global_position
+register_norm('vehicle_global_position_0', 'vel_ne*', ['vel_n', 'vel_e'])
+register_norm('vehicle_global_position_0', 'vel_ned*', ['vel_n', 'vel_e', 'vel_d'])
+
+# Add vel_ne_m_s and course over ground to vehicle_gps_position
+for topic_str in ['vehicle_gps_position_0', 'vehicle_gps_position_1']:
+    register_norm(topic_str, 'vel_ne_m_s*', ['vel_n_m_s', 'vel_e_m_s'])
+    register_angle(topic_str, 'gpsCOG*', 'vel_e_m_s', 'vel_n_m_s')
+
+# Add mag_declination_from_states, mag_inclination_from_states and mag_strength_from_states to estimator_status
+register_angle('estimator_status_0', 'mag_declination_from_states*', 'states[17]', 'states[16]')
+register('estimator_status_0', 'mag_strength_from_states*', ['states[16]', 'states[17]', 'states[18]'], lambda x, y, z: (x ** 2 + y ** 2 + z ** 2) ** 0.5)
+register('estimator_status_0', 'mag_inclination_from_states*', ['states[18]', 'mag_strength_from_states*'], lambda z, strength: np.arcsin(z / np.maximum(strength, np.finfo(np.float32).eps)))
+register('estimator_status_0', 'mag_inclination_from_states* [deg]', ['mag_inclination_from_states*'], np.rad2deg)
+register_angle('estimator_status_0', 'ekfGOG*', 'states[5]', 'states[4]')
+
+# Add fields to ekf2_innovations
+for field_str in ['heading_innov_var', 'mag_innov_var[0]', 'mag_innov_var[1]', 'mag_innov_var[2]', 'beta_innov_var',
+                  'vel_pos_innov_var[0]', 'vel_pos_innov_var[1]', 'vel_pos_innov_var[2]']:
+    register('ekf2_innovations_0', field_str + '^0.5', [field_str], np.sqrt)
+register('ekf2_innovations_0', 'heading_innov* [deg]', ['heading_innov'], np.rad2deg)
+
+# Add yaw, pitch, roll
+register_yaw_pitch_roll('vehicle_attitude_0', 'q')
+register_yaw_pitch_roll('vehicle_attitude_groundtruth_0', 'q')
+register_yaw_pitch_roll('vehicle_attitude_setpoint_0', 'q_d')
+register_yaw_pitch_roll('estimator_status_0', 'q')
+register_yaw_pitch_roll('estimator_status_0', 'states')
+register_yaw_pitch_roll('control_state_0', 'q')
+
+# Add the rotation matrix and the error to the attitude setpoint to vehicle_attitude_0
+register_rotation_matrix('vehicle_attitude_0', 'q')
+register_attitude_error('vehicle_attitude_0', 'q', 'vehicle_attitude_setpoint_0', 'q_d')
+
+# Add total pitch setpoint to vehicle_attitude_setpoint_0
+register('vehicle_attitude_setpoint_0', 'pitch_body [deg]', ['pitch_body'], np.rad2deg)
+register('vehicle_attitude_setpoint_0', 'pitch_body + 8 [deg]', ['pitch_body [deg]'], lambda pitch: pitch + 8)
+
+# Add lat_m, lon_m to vehicle_gps_position, vehicle_global_position and position_setpoint_triplet
+register_lat_lon_m('vehicle_gps_position_0', 'lat', 'lon', 1e7)
+register_lat_lon_m('vehicle_gps_position_1', 'lat', 'lon', 1e7)
+register_lat_lon_m('vehicle_global_position_0', 'lat', 'lon')
+register_lat_lon_m('position_setpoint_triplet_0', 'current.lat', 'current.lon')
+
+# Add dt to sensor_combined_0
+register('sensor_combined_0', 'dt*', [INDEX], lambda index: np.diff(index, prepend=index[:1]) * 1e6, elementwise=False)
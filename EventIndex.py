@@ -0,0 +1,88 @@
+# Module: EventIndex.py
+
+import numpy as np
+
+# Categories of the events in the order they are drawn, with the color of their lines
+EVENT_CATEGORIES = ['forward_transition', 'back_transition', 'mode', 'arming', 'parameter', 'dropout', 'message']
+EVENT_COLORS = {'forward_transition': (0, 160, 0), 'back_transition': (200, 0, 0), 'mode': (0, 120, 200), 'arming': (200, 120, 0),
+                'parameter': (0, 0, 0), 'dropout': (150, 0, 150), 'message': (120, 120, 120)}
+
+# Names of the navigation states of vehicle_status
+NAVIGATION_STATES = ['MANUAL', 'ALTCTL', 'POSCTL', 'AUTO_MISSION', 'AUTO_LOITER', 'AUTO_RTL', 'AUTO_RCRECOVER', 'AUTO_RTGS',
+                     'AUTO_LANDENGFAIL', 'AUTO_LANDGPSFAIL', 'ACRO', 'UNUSED', 'DESCEND', 'TERMINATION', 'OFFBOARD', 'STAB',
+                     'RATTITUDE', 'AUTO_TAKEOFF', 'AUTO_LAND', 'AUTO_FOLLOW_TARGET', 'AUTO_PRECLAND']
+# Arming state of vehicle_status when the vehicle is armed
+ARMING_STATE_ARMED = 2
+
+
+# Returns the indices of the samples that differ from the previous sample
+def get_edges(values):
+    return np.flatnonzero(values[1:] != values[:-1]) + 1
+
+
+# Sorted events of a logfile, each with a time [s], a category and a label. The events of a time range or the next
+# event after a time are found by binary search
+class EventIndex():
+    def __init__(self, times=(), categories=(), labels=()):
+        order = np.argsort(np.asarray(times, dtype=np.float64), kind='stable')
+        self.times = np.asarray(times, dtype=np.float64)[order]
+        # Index of the category of every event in EVENT_CATEGORIES
+        self.categories = np.asarray(categories, dtype=np.int8)[order]
+        self.labels = [labels[idx] for idx in order.tolist()]
+
+    def __len__(self):
+        return len(self.times)
+
+    # Returns the indices of the events in [t0, t1], only of the categories in the list if categories is not None
+    def get_events(self, t0, t1, categories=None):
+        indices = np.arange(np.searchsorted(self.times, t0, side='left'), np.searchsorted(self.times, t1, side='right'))
+        if categories is not None:
+            indices = indices[np.isin(self.categories[indices], [EVENT_CATEGORIES.index(category) for category in categories])]
+        return indices
+
+    # Returns the index of the first event after t, or of the last event before t if direction is negative. None if
+    # there is no such event
+    def get_next_event(self, t, direction):
+        if direction > 0:
+            idx = np.searchsorted(self.times, t, side='right')
+            return int(idx) if idx < len(self.times) else None
+
+        idx = np.searchsorted(self.times, t, side='left') - 1
+        return int(idx) if idx >= 0 else None
+
+    # Returns the category name of an event
+    def get_category(self, idx):
+        return EVENT_CATEGORIES[self.categories[idx]]
+
+
+# Build the event index of a logfile. vehicle_status is a dictionary of the time and the values of the fields of
+# vehicle_status_0 that are logged, the parameter changes, dropouts and messages are those of the logfile
+def create_event_index(vehicle_status, forward_transition_lines, back_transition_lines, changed_parameters, dropouts, logged_messages):
+    times = []
+    categories = []
+    labels = []
+
+    def add_events(category, event_times, event_labels):
+        times.extend(event_times)
+        categories.extend([EVENT_CATEGORIES.index(category)] * len(event_times))
+        labels.extend(event_labels)
+
+    add_events('forward_transition', forward_transition_lines, ['forward transition'] * len(forward_transition_lines))
+    add_events('back_transition', back_transition_lines, ['back transition'] * len(back_transition_lines))
+    time = vehicle_status.get('time')
+    if 'nav_state' in vehicle_status:
+        nav_state = vehicle_status['nav_state']
+        edges = get_edges(nav_state)
+        add_events('mode', time[edges].tolist(), ['mode: ' + (NAVIGATION_STATES[state] if state < len(NAVIGATION_STATES) else str(state)) for state in nav_state[edges].tolist()])
+    if 'arming_state' in vehicle_status:
+        armed = vehicle_status['arming_state'] == ARMING_STATE_ARMED
+        edges = get_edges(armed)
+        # Logfiles that start armed have an arming event at their start
+        if len(armed) > 0 and armed[0]:
+            edges = np.append(0, edges)
+        add_events('arming', time[edges].tolist(), ['armed' if is_armed else 'disarmed' for is_armed in armed[edges].tolist()])
+    add_events('parameter', [timestamp / 1e6 for timestamp, name, value in changed_parameters], [name + ': ' + str(value) for timestamp, name, value in changed_parameters])
+    add_events('dropout', [dropout.timestamp / 1e6 for dropout in dropouts], ['dropout: {:d} ms'.format(dropout.duration) for dropout in dropouts])
+    add_events('message', [message.timestamp / 1e6 for message in logged_messages], [message.log_level_str() + ': ' + message.message for message in logged_messages])
+
+    return EventIndex(times, categories, labels)
@@ -0,0 +1,122 @@
+# Module: EventLinesItem.py
+
+from pyqtgraph.Qt import QtCore, QtGui
+import pyqtgraph as pg
+import numpy as np
+
+# Label style of the lines, like the labels of the InfiniteLine of the marker line
+EVENT_LABEL_COLOR = (0, 0, 0)
+EVENT_LABEL_FILL = (200, 200, 200, 100)
+# Vertical position of the labels as a part of the view height from the bottom
+EVENT_LABEL_POSITION = 0.8
+# Horizontal distance of a label from its line and padding of its text [px]
+EVENT_LABEL_MARGIN = 3
+
+
+# Vertical lines at the times of events, all drawn by one item in one paint call instead of an InfiniteLine per event.
+# Only the lines in the visible x range are drawn, and of the lines of a color that fall on the same pixel column only
+# one is drawn. Labels are measured when their line is first visible and are left out where they would overlap the
+# label on their left
+class EventLinesItem(pg.GraphicsObject):
+    def __init__(self, times=(), colors=(), labels=None):
+        super(EventLinesItem, self).__init__()
+        # Sorted times of the lines [s], their colors and labels
+        self._times = np.empty(0)
+        self._colors = []
+        self._labels = None
+        # Dictionary of the indices of the lines by color
+        self._color_indices = {}
+        # Dictionary of the size of the labels that were drawn [px] by line index
+        self._label_sizes = {}
+        self.setData(times, colors, labels)
+
+    # Set the times of the lines [s], a color (r, g, b) for all lines or a list with a color per line, and optionally a
+    # list with a label per line. Nothing is done if the lines did not change, so the item can be set on every redraw
+    def setData(self, times, colors, labels=None):
+        times = np.asarray(times, dtype=np.float64)
+        if len(colors) > 0 and not isinstance(colors[0], (tuple, list)):
+            colors = [tuple(colors)] * len(times)
+        order = np.argsort(times, kind='stable').tolist()
+        times = times[order]
+        colors = [tuple(colors[idx]) for idx in order]
+        labels = [labels[idx] for idx in order] if labels is not None else None
+        if np.array_equal(times, self._times) and colors == self._colors and labels == self._labels:
+            return
+
+        self._times = times
+        self._colors = colors
+        self._labels = labels
+        color_indices = {}
+        for idx, color in enumerate(colors):
+            color_indices.setdefault(color, []).append(idx)
+        self._color_indices = {color: np.array(indices) for color, indices in color_indices.items()}
+        self._label_sizes = {}
+        self.prepareGeometryChange()
+        self.update()
+
+    # The lines span the view vertically, like InfiniteLine the item covers the visible range
+    def boundingRect(self):
+        view_box = self.getViewBox()
+        if view_box is None or len(self._times) == 0:
+            return QtCore.QRectF()
+
+        return view_box.viewRect()
+
+    def viewRangeChanged(self):
+        self.prepareGeometryChange()
+        self.update()
+
+    # Returns the indices of the sorted times in [left, right], one per pixel column of width pixel_width
+    @staticmethod
+    def get_visible_indices(times, left, right, pixel_width):
+        indices = np.arange(np.searchsorted(times, left, side='left'), np.searchsorted(times, right, side='right'))
+        if pixel_width > 0 and len(indices) > 1:
+            indices = indices[np.diff(np.floor((times[indices] - left) / pixel_width), prepend=-1) != 0]
+        return indices
+
+    # Returns the width and height of the label of a line [px]
+    def _get_label_size(self, idx, font_metrics):
+        if idx not in self._label_sizes:
+            rect = font_metrics.boundingRect(QtCore.QRect(0, 0, 10000, 10000), int(QtCore.Qt.AlignLeft), self._labels[idx])
+            self._label_sizes[idx] = (rect.width() + 2 * EVENT_LABEL_MARGIN, rect.height() + EVENT_LABEL_MARGIN)
+        return self._label_sizes[idx]
+
+    # Draw the labels of the visible lines from left to right in pixel coordinates, so the text is not scaled
+    def _paint_labels(self, painter, indices, rect):
+        transform = painter.transform()
+        font_metrics = QtGui.QFontMetrics(painter.font())
+        y = rect.top() + EVENT_LABEL_POSITION * rect.height()
+        painter.save()
+        painter.resetTransform()
+        painter.setPen(pg.mkPen(color=EVENT_LABEL_COLOR))
+        last_right = None
+        for idx in np.sort(indices).tolist():
+            position = transform.map(QtCore.QPointF(self._times[idx], y))
+            left = position.x() + EVENT_LABEL_MARGIN
+            if last_right is not None and left < last_right:
+                continue
+            width, height = self._get_label_size(idx, font_metrics)
+            label_rect = QtCore.QRectF(left, position.y(), width, height)
+            painter.fillRect(label_rect, pg.mkColor(EVENT_LABEL_FILL))
+            painter.drawText(label_rect.adjusted(EVENT_LABEL_MARGIN, 0, 0, 0), int(QtCore.Qt.AlignLeft), self._labels[idx])
+            last_right = left + width
+        painter.restore()
+
+    def paint(self, painter, *args):
+        view_box = self.getViewBox()
+        if view_box is None:
+            return
+
+        rect = view_box.viewRect()
+        pixel_width = self.pixelWidth()
+        visible_indices = []
+        for color, indices in self._color_indices.items():
+            indices = indices[self.get_visible_indices(self._times[indices], rect.left(), rect.right(), pixel_width)]
+            pen = pg.mkPen(color=color)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawLines([QtCore.QLineF(t, rect.top(), t, rect.bottom()) for t in self._times[indices].tolist()])
+            visible_indices.append(indices)
+
+        if self._labels is not None and len(visible_indices) > 0:
+            self._paint_labels(painter, np.concatenate(visible_indices), rect)
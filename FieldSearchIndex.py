@@ -0,0 +1,96 @@
+# Module: FieldSearchIndex.py
+
+import re
+import numpy as np
+
+# Prefix of a filter that is matched fuzzy, the characters have to appear in this order
+FUZZY_PREFIX = '~'
+# Prefix of a filter that is a regular expression
+REGEX_PREFIX = '/'
+# Separator of the topic and the field in the searched strings
+FIELD_SEPARATOR = '->'
+
+
+# Returns the trigrams of the UTF-8 encoded string as integer codes, one per byte offset
+def get_trigram_codes(string):
+    buffer = np.frombuffer(string.encode(), dtype=np.uint8).astype(np.int64)
+    return (buffer[:-2] << 16) | (buffer[1:-1] << 8) | buffer[2:]
+
+
+# Search index of the "topic->field" strings of a logfile, built once when the logfile is loaded so filtering the topic
+# tree does not scan the tree at every keystroke. Substrings are looked up in an inverted index of the trigrams of the
+# UTF-8 encoded strings and only the candidates are compared, fuzzy filters and regular expressions are matched against the strings of all fields.
+# Matching ignores the case
+class FieldSearchIndex():
+    def __init__(self, topic_fields):
+        # List of (topic name, list of field names), the fields are numbered in this order
+        self.topic_fields = [(topic_str, list(field_names)) for topic_str, field_names in topic_fields]
+        # Lowercase "topic->field" string of every field
+        self.entries = [(topic_str + FIELD_SEPARATOR + field_str).lower() for topic_str, field_names in self.topic_fields for field_str in field_names]
+        # All entries in one string, one per line, for the fuzzy filters
+        self._text = '\n'.join(self.entries)
+        self._line_starts = np.cumsum([0] + [len(entry) + 1 for entry in self.entries[:-1]])
+
+        # Sorted trigram codes with the sorted numbers of the entries that contain them, the entries of
+        # self._trigram_codes[i] are self._trigram_entries[self._trigram_starts[i]:self._trigram_starts[i + 1]]. The
+        # trigrams of all entries are taken from the text at once, except those across a line break
+        codes = get_trigram_codes(self._text)
+        is_line_break = np.frombuffer(self._text.encode(), dtype=np.uint8) == ord('\n')
+        lines = np.cumsum(is_line_break)[:len(codes)]
+        in_line = ~(is_line_break[:-2] | is_line_break[1:-1] | is_line_break[2:])
+        keys = np.sort(codes[in_line] * max(len(self.entries), 1) + lines[in_line])
+        keys = keys[np.diff(keys, prepend=-1) != 0]
+        codes = keys // max(len(self.entries), 1)
+        self._trigram_entries = (keys % max(len(self.entries), 1)).astype(np.int32)
+        self._trigram_starts = np.flatnonzero(np.diff(codes, prepend=-1, append=-1))
+        self._trigram_codes = codes[self._trigram_starts[:-1]]
+
+    @property
+    def num_fields(self):
+        return len(self.entries)
+
+    # Returns a boolean mask of the fields that match the filter, None if the filter is not a valid regular expression.
+    # An empty filter matches all fields
+    def search(self, filter_str):
+        if filter_str.startswith(REGEX_PREFIX):
+            try:
+                pattern = re.compile(filter_str[len(REGEX_PREFIX):], re.IGNORECASE)
+            except re.error:
+                return None
+            return np.array([pattern.search(entry) is not None for entry in self.entries], dtype=bool)
+
+        if filter_str.startswith(FUZZY_PREFIX):
+            return self._search_fuzzy(filter_str[len(FUZZY_PREFIX):].lower())
+
+        return self._search_substring(filter_str.lower())
+
+    def _search_substring(self, substring):
+        mask = np.zeros(len(self.entries), dtype=bool)
+        if len(substring) < 3:
+            mask[[idx for idx, entry in enumerate(self.entries) if substring in entry]] = True
+            return mask
+
+        # Candidates contain all trigrams of the substring, the rarest trigrams are intersected first
+        codes = np.unique(get_trigram_codes(substring))
+        positions = np.searchsorted(self._trigram_codes, codes)
+        if (positions == len(self._trigram_codes)).any() or (self._trigram_codes[positions] != codes).any():
+            return mask
+        trigram_entries = [self._trigram_entries[self._trigram_starts[position]:self._trigram_starts[position + 1]] for position in positions.tolist()]
+        trigram_entries.sort(key=len)
+        candidates = trigram_entries[0]
+        for indices in trigram_entries[1:]:
+            candidates = np.intersect1d(candidates, indices, assume_unique=True)
+        mask[[idx for idx in candidates.tolist() if substring in self.entries[idx]]] = True
+        return mask
+
+    def _search_fuzzy(self, characters):
+        mask = np.zeros(len(self.entries), dtype=bool)
+        if len(self.entries) == 0:
+            return mask
+
+        # The characters are matched in order within one line of the text. Every character is preceded by a run of other
+        # characters, so a line is matched from its start without backtracking
+        pattern = re.compile('^' + ''.join('[^{0}\n]*{0}'.format(re.escape(character)) for character in characters), re.MULTILINE)
+        starts = np.array([match.start() for match in pattern.finditer(self._text)], dtype=np.int64)
+        mask[np.searchsorted(self._line_starts, starts, side='right') - 1] = True
+        return mask
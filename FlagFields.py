@@ -0,0 +1,75 @@
+# Module: FlagFields.py
+
+import numpy as np
+
+# Fields whose name ends with this suffix and that have an integer type are flag fields, every bit is a field of its own
+FLAGS_SUFFIX = 'flags'
+
+# Names of the bits of the flag fields by field name, starting with bit 0. The bits of other flag fields are named by
+# their number
+FLAG_BIT_NAMES = {
+    'control_mode_flags': [
+        'CS_TILT_ALIGN',  # 0 - true if the filter tilt alignment is complete
+        'CS_YAW_ALIGN',  # 1 - true if the filter yaw alignment is complete
+        'CS_GPS',  # 2 - true if GPS measurements are being fused
+        'CS_OPT_FLOW',  # 3 - true if optical flow measurements are being fused
+        'CS_MAG_HDG',  # 4 - true if a simple magnetic yaw heading is being fused
+        'CS_MAG_3D',  # 5 - true if 3-axis magnetometer measurement are being fused
+        'CS_MAG_DEC',  # 6 - true if synthetic magnetic declination measurements are being fused
+        'CS_IN_AIR',  # 7 - true when thought to be airborne
+        'CS_WIND',  # 8 - true when wind velocity is being estimated
+        'CS_BARO_HGT',  # 9 - true when baro height is being fused as a primary height reference
+        'CS_RNG_HGT',  # 10 - true when range finder height is being fused as a primary height reference
+        'CS_GPS_HGT',  # 11 - true when GPS height is being fused as a primary height reference
+        'CS_EV_POS',  # 12 - true when local position data from external vision is being fused
+        'CS_EV_YAW',  # 13 - true when yaw data from external vision measurements is being fused
+        'CS_EV_HGT',  # 14 - true when height data from external vision measurements is being fused
+        'CS_BETA',  # 15 - true when synthetic sideslip measurements are being fused
+        'CS_MAG_FIELD',  # 16 - true when only the magnetic field states are updated by the magnetometer
+        'CS_FIXED_WING',  # 17 - true when thought to be operating as a fixed wing vehicle with constrained sideslip
+        'CS_MAG_FAULT',  # 18 - true when the magnetomer has been declared faulty and is no longer being used
+        'CS_ASPD',  # 19 - true when airspeed measurements are being fused
+        'CS_GND_EFFECT',  # 20 - true when when protection from ground effect induced static pressure rise is active
+        'CS_RNG_STUCK',  # 21 - true when a stuck range finder sensor has been detected
+        'CS_GPS_YAW',  # 22 - true when yaw (not ground course) data from a GPS receiver is being fused
+        'CS_MAG_ALIGNED'],  # 23 - true when the in-flight mag field alignment has been completed
+    'gps_check_fail_flags': [
+        'GPS_CHECK_FAIL_GPS_FIX',  # 0 : insufficient fix type (no 3D solution)
+        'GPS_CHECK_FAIL_MIN_SAT_COUNT',  # 1 : minimum required sat count fail
+        'GPS_CHECK_FAIL_MIN_GDOP',  # 2 : minimum required GDoP fail
+        'GPS_CHECK_FAIL_MAX_HORZ_ERR',  # 3 : maximum allowed horizontal position error fail
+        'GPS_CHECK_FAIL_MAX_VERT_ERR',  # 4 : maximum allowed vertical position error fail
+        'GPS_CHECK_FAIL_MAX_SPD_ERR',  # 5 : maximum allowed speed error fail
+        'GPS_CHECK_FAIL_MAX_HORZ_DRIFT',  # 6 : maximum allowed horizontal position drift fail - requires stationary vehicle
+        'GPS_CHECK_FAIL_MAX_VERT_DRIFT',  # 7 : maximum allowed vertical position drift fail - requires stationary vehicle
+        'GPS_CHECK_FAIL_MAX_HORZ_SPD_ERR',  # 8 : maximum allowed horizontal speed fail - requires stationary vehicle
+        'GPS_CHECK_FAIL_MAX_VERT_SPD_ERR']}  # 9 : maximum allowed vertical velocity discrepancy fail
+
+
+# Returns True if the field is a flag field
+def is_flags_field(field_str, dtype):
+    return field_str.endswith(FLAGS_SUFFIX) and np.dtype(dtype).kind in 'iu'
+
+
+# Returns the names of the bits of a flag field
+def get_bit_names(field_str, dtype):
+    bit_names = FLAG_BIT_NAMES.get(field_str)
+    if bit_names is None:
+        bit_names = [field_str + '_bit{:d}'.format(bit) for bit in range(np.dtype(dtype).itemsize * 8)]
+    return bit_names
+
+
+# Returns a bit of the flags as an array of 0 and 1 with one byte per sample. The bit is taken from a strided view of
+# the byte that holds it, so there is no temporary array of the size of the flags
+def get_bit(flags, bit):
+    flags = np.ascontiguousarray(flags)
+    if flags.dtype.byteorder == '>':
+        flags = flags.astype(flags.dtype.newbyteorder('<'))
+    flag_bytes = flags.view(np.uint8)[bit // 8::flags.dtype.itemsize]
+    return np.bitwise_and(np.right_shift(flag_bytes, bit % 8), 1)
+
+
+# Returns the indices of the samples at which the flags change and the changed bits at every change
+def get_flag_changes(flags):
+    indices = np.flatnonzero(flags[1:] != flags[:-1]) + 1
+    return indices, np.bitwise_xor(flags[indices], flags[indices - 1])
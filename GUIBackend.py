@@ -1,11 +1,14 @@
 # Module: GUIBackend.py
 
-from GraphData import *
+from StreamGraphData import *
+
+# Index of the first overlaid logfile in the graph data, after the main and the secondary logfile
+FIRST_OVERLAY_ID = 2
 
 
 class GUIBackend():
 
-    def __init__(self, link_x_range=False, link_y_range=False):
+    def __init__(self, link_x_range=False, link_y_range=False, use_cache=True, num_workers=1, stream_capacity=STREAM_CAPACITY, cache_size=CACHE_SIZE):
         # List of curve class elements currently displayed
         self.curve_list = []
         # True if every datapoint should be indicated in the plot
@@ -32,10 +35,35 @@ class GUIBackend():
         self.link_y_range = link_y_range
         # True if the parameter changes are currently displayed
         self.show_changed_parameters = False
+        # True if the lines of all events of the event index are currently displayed
+        self.show_events = False
+        # True if converted logfiles should be stored in and loaded from the on-disk cache
+        self.use_cache = use_cache
+        # Maximum size of the on-disk cache [bytes]
+        self.cache_size = cache_size
+        # Number of worker processes used to index large logfiles
+        self.num_workers = num_workers
+        # True if the displayed logfiles are followed while they are written
+        self.follow_logfile = False
+        # Number of samples of every topic kept from a live stream
+        self.stream_capacity = stream_capacity
+        # Number of samples per segment of the PSD and the spectrogram
+        self.spectrum_segment_size = SEGMENT_SIZE
+        # Event the overlaid logfiles are aligned on with the main logfile, see ALIGNMENT_EVENTS
+        self.overlay_alignment = 'start'
+        # True if the overlaid logfiles are displayed in small multiples instead of in the main graph
+        self.overlay_small_multiples = False
+        # Alignment of the secondary logfile with the main logfile while their x axes are linked, None to link their
+        # times as they are
+        self.secondary_alignment = None
         # The object used to display the arrow at the vehicle position in the 2D trajectory graph
         self.arrow_obj = None
         # The object used to display the current pposition setpoint in the 2D trajectory graph
         self.current_sp_marker_obj = None
+        # List of objects used to display the trajectories in the 2D trajectory graph
+        self.trajectory_curves_obj = []
+        # (logfile, line width) the 2D trajectory graph is currently drawn with, None if it is not displayed
+        self.trajectory_style = None
 
         # Ordered dictionary of colors and if they are occupied or not
         color_tuples = [("C0", [False, [31, 119, 180]]),
@@ -51,6 +79,7 @@ class GUIBackend():
 
         self.color_dict = collections.OrderedDict(color_tuples)
 
+        # Graph data of the main and the secondary logfile, followed by the logfiles overlaid on the main graph
         self.graph_data = [GraphData() for _ in [0, 1]]
 
     @property
@@ -68,7 +97,50 @@ class GUIBackend():
         return 1
 
     def load_ulog_to_graph_data(self, logfile_str, graph_id=0):
-        self.graph_data[graph_id].ulog_to_df(logfile_str)
+        self.graph_data[graph_id].ulog_to_df(logfile_str, lazy=True, use_cache=self.use_cache, num_workers=self.num_workers, cache_size=self.cache_size)
+
+    @property
+    def overlay_graph_ids(self):
+        return list(range(FIRST_OVERLAY_ID, len(self.graph_data)))
+
+    # Add a logfile to overlay on the main graph, it is indexed with load_ulog_to_graph_data by its loader. Its topics are
+    # decoded when their curves are displayed, so the memory used by an overlaid logfile is bounded by the displayed topics
+    def add_overlay_logfile(self, logfile_str):
+        graph_data = GraphData()
+        graph_data.path_to_logfile = logfile_str
+        self.graph_data.append(graph_data)
+        return len(self.graph_data) - 1
+
+    def remove_overlay_logfiles(self):
+        for graph_data in self.graph_data[FIRST_OVERLAY_ID:]:
+            graph_data.close()
+        del self.graph_data[FIRST_OVERLAY_ID:]
+
+    # Set the time offsets of the overlaid logfiles so that they are aligned with the main logfile, see
+    # GraphData.get_time_offset. Logfiles that cannot be aligned are aligned on their start
+    def align_overlay_logfiles(self, graph_ids=None):
+        if graph_ids is None:
+            graph_ids = self.overlay_graph_ids
+        for graph_data in [self.graph_data[graph_id] for graph_id in graph_ids]:
+            graph_data.time_offset = graph_data.get_time_offset(self.graph_data[0], self.overlay_alignment)
+            if graph_data.time_offset is None:
+                print("WARNING: Could not align " + graph_data.path_to_logfile + " on " + self.overlay_alignment + ", aligned on the start")
+                graph_data.time_offset = graph_data.get_time_offset(self.graph_data[0], 'start')
+
+    # Set the time offset of the secondary logfile, it is aligned with the main logfile while their x axes are linked
+    # and displayed at its own times otherwise. Returns True if the time offset changed
+    def align_secondary_logfile(self):
+        graph_data = self.graph_data[1]
+        time_offset = 0
+        if self.link_x_range and self.secondary_alignment is not None and self.secondary_graph_mode == 'secondary_logfile' and graph_data.path_to_logfile != '':
+            time_offset = graph_data.get_time_offset(self.graph_data[0], self.secondary_alignment)
+            if time_offset is None:
+                print("WARNING: Could not align " + graph_data.path_to_logfile + " on " + self.secondary_alignment)
+                time_offset = 0
+
+        changed = time_offset != graph_data.time_offset
+        graph_data.time_offset = time_offset
+        return changed
 
         # Returns true if the selected topic and field is already in the list
     def contains(self, selected_topic, selected_field):
@@ -122,3 +194,24 @@ class CurveClass():
         selected_topic = selected_topic_and_field.split('->')[0]
         selected_field = selected_topic_and_field.split('->')[1]
         return selected_topic, selected_field
+
+
+# Plot items of a displayed curve and the style they are currently drawn with
+class CurvePlotItems():
+    def __init__(self, curve, pyramid, time, y_value):
+        self.curve = curve
+        # Object used to mark the nan samples of the curve, None if the curve has no nan samples
+        self.nan_curve = None
+        # Min/max pyramid, time and displayed y value of the curve, used to update its level of detail
+        self.pyramid = pyramid
+        self.time = time
+        self.y_value = y_value
+        # (color, line width, symbol, rescaled) used when the items were last styled
+        self.style = None
+
+    @property
+    def items(self):
+        if self.nan_curve is None:
+            return [self.curve]
+
+        return [self.curve, self.nan_curve]
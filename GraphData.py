@@ -1,13 +1,56 @@
 from pyulog import *
+from ULogIndex import *
+from LogCache import *
+from LevelOfDetail import *
+from RangeStatistics import *
+from SpectralAnalysis import *
+from DerivedFields import *
+from FlagFields import *
+from EventIndex import *
+from ColumnBuffer import *
 import collections
-import pandas as pd
+import collections.abc
+import threading
 import numpy as np
+# pandas is imported when the first dataframe is created, it is not needed to index a logfile or to show the window
+
+# Name of the column buffer column with the sorted timestamps of a topic
+SORTED_TIME = '__sorted_time__'
+
+# Size of the parts that topics are split into when they are decoded in parallel [bytes]
+PARALLEL_DECODE_SIZE = 1 << 25
+
+# Events that logfiles can be aligned on, the change of a parameter is given as 'parameter:<name>'
+ALIGNMENT_EVENTS = ['start', 'arming', 'takeoff', 'transition']
+PARAMETER_EVENT_PREFIX = 'parameter:'
+# Logfiles can also be aligned on the cross-correlation of a field, given as 'correlation:<topic>-><field>'
+CORRELATION_ALIGNMENT_PREFIX = 'correlation:'
+# Maximum number of samples of a cross-correlated signal, the resampling period is increased for long logfiles
+MAX_CORRELATION_SAMPLES = 1 << 18
+# Minimum part of the shorter signal that has to overlap the other signal at a cross-correlated time offset
+MIN_CORRELATION_OVERLAP = 0.5
+# Number of resampled fields and of spectra that are cached
+RESAMPLED_CACHE_SIZE = 64
+SPECTRUM_CACHE_SIZE = 16
+
+
+# Returns True if logfiles can be aligned on alignment_str, see GraphData.get_time_offset
+def is_valid_alignment(alignment_str):
+    if alignment_str.startswith(CORRELATION_ALIGNMENT_PREFIX):
+        return '->' in alignment_str
+
+    return alignment_str in ALIGNMENT_EVENTS or alignment_str.startswith(PARAMETER_EVENT_PREFIX)
+
+
+# Returns the times from start to stop at a fixed period [s]
+def get_time_grid(start, stop, period):
+    return start + period * np.arange(int(np.floor((stop - start) / period)) + 1)
 
 
 class GraphData():
     def __init__(self):
         # Dictionary of topic dataframes
-        self.df_dict = {}
+        self.df_dict = LazyTopicDict()
         # List of changed parameters
         self.changed_parameters = []
         # The path to the currently opened logfile
@@ -18,14 +61,16 @@ class GraphData():
         self.back_transition_lines = []
         # True if the marker line is currently displayed
         self.show_marker_line = False
-        # List of objects used to display green lines at start and stop of forward transition
-        self.ft_lines_obj = []
-        # List of objects used to display red lines at start and stop of backward transition
-        self.bt_lines_obj = []
-        # List of objects used to display lines at parameter changes
-        self.parameter_lines_obj = []
+        # Object used to display green lines at start and stop of forward transition
+        self.ft_lines_obj = None
+        # Object used to display red lines at start and stop of backward transition
+        self.bt_lines_obj = None
+        # Object used to display lines at parameter changes
+        self.parameter_lines_obj = None
         # Object used to display the graph legend
         self.legend_obj = None
+        # Object used to display lines at the events of the event index
+        self.event_lines_obj = None
         # Object used to display the marker line
         self.marker_line_obj = None
         # The position of the marker line
@@ -34,353 +79,723 @@ class GraphData():
         self.initial_parameters = {}
         # Graph title
         self.title = ''
+        # Time added to the samples when they are displayed, used to align an overlaid logfile with the main logfile [s]
+        self.time_offset = 0
         self._logfile_str = ''
-
-    # Convert a pyulog.core.ULog object to a dictionary of dataframes
-    def ulog_to_df(self, logfile_str):
+        # Index of the currently opened logfile, used to decode topics on request
+        self._ulog_index = None
+        # Dictionary of field names for every topic, known before the topics are decoded
+        self._topic_fields = {}
+        # Dictionary of the field data types of every topic
+        self._topic_dtypes = {}
+        # Dictionary of the derived fields that have been calculated ((topic name, field name) -> series)
+        self._derived_fields = {}
+        # Dictionary of the derived fields of the bits of the flag fields by topic name and field name, and the
+        # (logged topic name, flag field name, bit) of every bit and flag field by (topic name, field name), the bit is
+        # None for the flag fields
+        self._flag_bit_fields = {}
+        self._flag_bits = {}
+        # Dictionary of the plot items of the displayed curves (selected topic and field -> CurvePlotItems)
+        self.curve_items = {}
+        # Dictionary of min/max pyramids of the plotted fields
+        self._min_max_pyramids = {}
+        # Dictionary of the indexes for statistics of time ranges by (topic name, field name)
+        self._range_statistics = {}
+        # Dictionary of the sorted timestamps of the topics used for lookups
+        self._sorted_times = {}
+        # Column store backing the topic dataframes, persistent if the on-disk cache is used
+        self._log_cache = None
+        # Dictionary of the column buffers of the topics that samples were appended to by update
+        self._column_buffers = {}
+        # Resampled fields by (topic name, field name, first time, last time, number of samples) in the order they were
+        # used, and time offsets to other logfiles by (other logfile, last timestamps, alignment)
+        self._resampled_fields = collections.OrderedDict()
+        self._time_offsets = {}
+        # Spectra by (topic name, field name, start, stop, segment size) in the order they were used
+        self._spectra = collections.OrderedDict()
+        # Dictionary of the times and changed bits of the changes of the flag fields by (topic name, field name)
+        self._flag_changes = {}
+        # Index of the events of the logfile, created when it is first used
+        self._event_index = None
+
+    # Convert a uLog file to a dictionary of dataframes. In lazy mode only the topic and field names are read and the
+    # dataframe of a topic is created the first time it is accessed in df_dict. If use_cache is set the converted
+    # topics and the metadata are stored on disk and reused the next time the same logfile is opened, the cache is kept
+    # below cache_size [bytes]. With num_workers > 1 large logfiles are indexed, and in non-lazy mode decoded, in a pool
+    # of worker processes
+    def ulog_to_df(self, logfile_str, lazy=False, use_cache=False, num_workers=1, cache_size=CACHE_SIZE):
         self.df_dict.clear()
+        self._derived_fields = {}
+        self._min_max_pyramids = {}
+        self._range_statistics = {}
+        self._sorted_times = {}
+        self._column_buffers = {}
+        self._resampled_fields.clear()
+        self._spectra.clear()
+        self._flag_changes = {}
+        self._event_index = None
+        self._time_offsets = {}
+        self.time_offset = 0
         self._logfile_str = logfile_str
-        ulog = ULog(logfile_str)
-        for elem in sorted(ulog.data_list, key=lambda d: d.name + str(d.multi_id)):
-            topic_name = elem.name + "_" + str(elem.multi_id)
-            column_names = set(elem.data.keys())
-            df = pd.DataFrame(index=elem.data['timestamp'] / 1e6)
-            for name in column_names - {'timestamp'}:
-                df[name] = elem.data[name]
-
-            self.df_dict[topic_name] = df
-
-        self.changed_parameters = ulog.changed_parameters
-        self.initial_parameters = ulog.initial_parameters
-        self.logged_messages = ulog.logged_messages
-        self.start_timestamp = ulog.start_timestamp
-        self.last_timestamp = ulog.last_timestamp
-        self.dropouts = ulog.dropouts
-        self.msg_info_dict = ulog.msg_info_dict
-        self.msg_info_multiple_dict = ulog.msg_info_multiple_dict
-        self.data_list = ulog.data_list
+        self.close()
+        self._log_cache = LogCache(logfile_str, persistent=use_cache, max_size=cache_size)
+        cached = self._log_cache.load_metadata() if use_cache else None
+        metadata = cached[0] if cached is not None else None
+        executor = create_process_pool(num_workers) if num_workers > 1 else None
+        try:
+            if metadata is not None:
+                self._ulog_index = ULogIndex.from_metadata(logfile_str, metadata['ulog_index'], cached[1])
+                self._topic_fields = metadata['topic_fields']
+                self._topic_dtypes = {topic_str: [(name, np.dtype(dtype_str)) for name, dtype_str in dtypes] for topic_str, dtypes in metadata['topic_dtypes'].items()}
+                self._index_flag_fields()
+            else:
+                self._ulog_index = ULogIndex(logfile_str, num_workers, executor)
+                self._index_topic_fields()
+            if not lazy and executor is not None:
+                self._decode_topics_parallel([topic_str for topic_str in self._ulog_index.topics if not self._log_cache.has_topic(topic_str)], executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.changed_parameters = self._ulog_index.changed_parameters
+        self.initial_parameters = self._ulog_index.initial_parameters
+        self.logged_messages = self._ulog_index.logged_messages
+        self.start_timestamp = self._ulog_index.start_timestamp
+        self.last_timestamp = self._ulog_index.last_timestamp
+        self.dropouts = self._ulog_index.dropouts
+        self.msg_info_dict = self._ulog_index.msg_info_dict
+        self.msg_info_multiple_dict = self._ulog_index.msg_info_multiple_dict
+        self.file_corrupt = self._ulog_index.file_corrupt
+        self.data_list = sorted(self._ulog_index.topics.values(), key=lambda d: d.name + str(d.multi_id))
+        self.df_dict.set_pending(sorted(self._topic_fields), self._load_topic)
+        if not lazy:
+            for topic_str in list(self.df_dict):
+                for field_str in self.get_field_names(topic_str):
+                    self.get_field(topic_str, field_str)
+
         self._set_title()
-        self._get_transition_timestamps()
-        self._add_all_fields_to_df()
+        if metadata is not None:
+            self.forward_transition_lines = metadata['forward_transition_lines']
+            self.back_transition_lines = metadata['back_transition_lines']
+        else:
+            self._get_transition_timestamps()
+            if self._log_cache.persistent:
+                ulog_index_metadata, arrays = self._ulog_index.get_metadata()
+                self._log_cache.save_metadata({'ulog_index': ulog_index_metadata,
+                                               'topic_fields': self._topic_fields,
+                                               'topic_dtypes': {topic_str: [[name, np.dtype(dtype).str] for name, dtype in dtypes] for topic_str, dtypes in self._topic_dtypes.items()},
+                                               'forward_transition_lines': self.forward_transition_lines,
+                                               'back_transition_lines': self.back_transition_lines}, arrays)
+
+    # Close the currently opened logfile and remove its temporary column store. Dataframes that are already loaded stay
+    # valid
+    def close(self):
+        if self._ulog_index is not None:
+            self._ulog_index.close()
+            self._ulog_index = None
+
+        if self._log_cache is not None:
+            self._log_cache.close()
+            self._log_cache = None
+
+    # Read the messages that were appended to the logfile since it was opened or last updated, e.g. while it is still
+    # being written. The new samples of loaded topics are decoded and appended to their columns, together with the
+    # calculated derived fields that only depend on samples of the same row, so the cost only depends on the number of
+    # new samples. Other topics with new samples are loaded again when they are accessed. Returns the names of the
+    # topics with new samples
+    def update(self):
+        if self._ulog_index is None:
+            return []
+
+        with self.df_dict.lock:
+            num_old_data_points = self._ulog_index.update()
+            if len(num_old_data_points) == 0:
+                return []
+
+            topics = set(self._topic_fields)
+            self._index_topic_fields(set(self._ulog_index.topics) - topics)
+            self.data_list = sorted(self._ulog_index.topics.values(), key=lambda d: d.name + str(d.multi_id))
+            self.last_timestamp = self._ulog_index.last_timestamp
+            self.file_corrupt = self._ulog_index.file_corrupt
+
+            updated_topics = list(num_old_data_points)
+            for topic_str, source_topic_str in VIRTUAL_TOPICS.items():
+                if source_topic_str in num_old_data_points and topic_str in self._topic_fields:
+                    updated_topics.append(topic_str)
+                    num_old_data_points[topic_str] = num_old_data_points[source_topic_str]
+            new_rows = {}
+            for topic_str in updated_topics:
+                start = num_old_data_points[topic_str]
+                source_topic_str = VIRTUAL_TOPICS.get(topic_str)
+                if start > 0 and self.df_dict.is_loaded(topic_str) and topic_str in topics and (source_topic_str is None or source_topic_str in new_rows):
+                    new_rows[topic_str] = self._append_rows(topic_str, start, new_rows.get(source_topic_str))
+                else:
+                    self._reset_topic(topic_str)
+
+            # Derived fields with inputs from other topics are calculated again when they are accessed
+            for topic_str, field_str in list(self._derived_fields):
+                derived_field = self._get_derived_fields(topic_str)[field_str]
+                input_fields = derived_field.input_fields + derived_field.optional_input_fields
+                if any(isinstance(input_field, tuple) and input_field[0] in num_old_data_points for input_field in input_fields):
+                    self._remove_derived_field(topic_str, field_str)
+
+            if 'vehicle_status_0' in new_rows:
+                self._get_transition_timestamps()
+            self._event_index = None
+
+            return updated_topics
+
+    # Decode the messages of a loaded topic from start on and append them to its columns. For virtual topics
+    # source_rows are the new rows of the source topic. Returns the new rows of the logged and derived fields
+    def _append_rows(self, topic_str, start, source_rows=None):
+        if topic_str not in self._column_buffers:
+            df = self.df_dict[topic_str]
+            self._column_buffers[topic_str] = ColumnBuffer(df.index.values, {name: df[name].values for name in df.columns})
+        column_buffer = self._column_buffers[topic_str]
+
+        if source_rows is not None:
+            index = source_rows[INDEX]
+            rows = {}
+        else:
+            num_rows = self._ulog_index.topics[topic_str].num_data_points - start
+            index = np.empty(num_rows, dtype=np.float64)
+            rows = {name: np.empty(num_rows, dtype=dtype) for name, dtype in self._topic_dtypes[topic_str]}
+            self._ulog_index.decode_into(topic_str, rows, index, start)
+
+        # Derived fields are extended in the order they are registered, which is after their inputs
+        input_rows = dict(source_rows if source_rows is not None else rows, **{INDEX: index})
+        for field_str, derived_field in self._get_derived_fields(topic_str).items():
+            if field_str != derived_field.output_fields[0] or (topic_str, field_str) not in self._derived_fields:
+                continue
+            input_fields = derived_field.input_fields + [input_field for input_field in derived_field.optional_input_fields
+                                                         if input_field in self._topic_fields.get(VIRTUAL_TOPICS.get(topic_str, topic_str), [])]
+            if not derived_field.elementwise or any(input_field not in input_rows for input_field in input_fields):
+                for output_field_str in derived_field.output_fields:
+                    self._remove_derived_field(topic_str, output_field_str)
+                continue
+            inputs = [input_rows[input_field] for input_field in derived_field.input_fields]
+            inputs += [input_rows.get(input_field) for input_field in derived_field.optional_input_fields]
+            values = derived_field.kernel(*inputs)
+            if len(derived_field.output_fields) == 1:
+                values = (values,)
+            for output_field_str, output_values in zip(derived_field.output_fields, values):
+                if not column_buffer.has_column(output_field_str):
+                    column_buffer.add_column(output_field_str, self._derived_fields[(topic_str, output_field_str)].values)
+                rows[output_field_str] = input_rows[output_field_str] = output_values
+
+        if topic_str in self._sorted_times:
+            if not column_buffer.has_column(SORTED_TIME):
+                column_buffer.add_column(SORTED_TIME, self._sorted_times[topic_str])
+            rows[SORTED_TIME] = np.maximum.accumulate(np.append(self._sorted_times[topic_str][-1:], index))[1:]
+
+        column_buffer.append(index, {name: values for name, values in rows.items() if column_buffer.has_column(name)})
+        df = column_buffer.get_dataframe([name for name, dtype in self._topic_dtypes.get(topic_str, [])])
+        self.df_dict[topic_str] = df
+        for field_str in column_buffer.column_names:
+            if (topic_str, field_str) in self._derived_fields:
+                self._derived_fields[(topic_str, field_str)] = column_buffer.get_series(field_str, df.index)
+        if topic_str in self._sorted_times:
+            self._sorted_times[topic_str] = column_buffer.get_column(SORTED_TIME)
+        for (pyramid_topic_str, field_str), pyramid in self._min_max_pyramids.items():
+            if pyramid_topic_str == topic_str:
+                field = self.get_field(topic_str, field_str)
+                pyramid.extend(field.index.values, field.values)
+        self._remove_cached_fields(topic_str)
+
+        return input_rows
+
+    # Forget everything calculated from the samples of a topic, it is loaded again the next time it is accessed
+    def _reset_topic(self, topic_str):
+        self.df_dict.reset(topic_str)
+        self._log_cache.remove_topic(topic_str)
+        self._column_buffers.pop(topic_str, None)
+        self._sorted_times.pop(topic_str, None)
+        for key in list(self._derived_fields):
+            if key[0] == topic_str:
+                self._remove_derived_field(*key)
+        for key in list(self._min_max_pyramids):
+            if key[0] == topic_str:
+                del self._min_max_pyramids[key]
+        self._remove_cached_fields(topic_str)
+
+    def _remove_derived_field(self, topic_str, field_str):
+        self._derived_fields.pop((topic_str, field_str), None)
+        self._min_max_pyramids.pop((topic_str, field_str), None)
+        self._remove_cached_fields(topic_str, field_str)
+        if topic_str in self._column_buffers:
+            self._column_buffers[topic_str].remove_column(field_str)
+
+    # Returns the names of the logged and derived fields of a topic without decoding it
+    def get_field_names(self, topic_str):
+        return self._topic_fields[topic_str]
+
+    # Returns a field of a topic as a series indexed by time. Derived fields are calculated the first time they are
+    # accessed
+    def get_field(self, topic_str, field_str):
+        df = self.df_dict[topic_str]
+        if field_str in df.columns:
+            return df[field_str]
+
+        if (topic_str, field_str) not in self._derived_fields:
+            if field_str not in self._topic_fields[topic_str]:
+                raise KeyError(field_str)
+            derived_field = self._get_derived_fields(topic_str)[field_str]
+            inputs = [self._get_derived_field_input(derived_field, input_field, False) for input_field in derived_field.input_fields]
+            inputs += [self._get_derived_field_input(derived_field, input_field, True) for input_field in derived_field.optional_input_fields]
+            values = derived_field.kernel(*inputs)
+            if len(derived_field.output_fields) == 1:
+                values = (values,)
+            import pandas as pd
+            for output_field_str, output_values in zip(derived_field.output_fields, values):
+                self._derived_fields[(topic_str, output_field_str)] = pd.Series(output_values, index=df.index, name=output_field_str)
+
+        return self._derived_fields[(topic_str, field_str)]
+
+    # Returns the derived fields of a topic by field name, the registered ones followed by the bits of the flag fields
+    def _get_derived_fields(self, topic_str):
+        if topic_str not in self._flag_bit_fields:
+            return DERIVED_FIELDS.get(topic_str, {})
+
+        return collections.OrderedDict(list(DERIVED_FIELDS.get(topic_str, {}).items()) + list(self._flag_bit_fields[topic_str].items()))
+
+    # Returns True if the field is a flag field or a bit of one
+    def is_flag_field(self, topic_str, field_str):
+        return (topic_str, field_str) in self._flag_bits
+
+    # Returns the sorted times at which a flag field changes, for a bit of a flag field the times at which the bit
+    # changes
+    def get_flag_changes(self, topic_str, field_str):
+        source_topic_str, flags_field_str, bit = self._flag_bits[(topic_str, field_str)]
+        with self.df_dict.lock:
+            key = (source_topic_str, flags_field_str)
+            if key not in self._flag_changes:
+                flags = self.get_field(source_topic_str, flags_field_str)
+                indices, changed_bits = get_flag_changes(flags.values)
+                order = np.argsort(flags.index.values[indices], kind='stable')
+                self._flag_changes[key] = (flags.index.values[indices][order], changed_bits[order])
+            times, changed_bits = self._flag_changes[key]
+
+        if bit is None:
+            return times
+        return times[get_bit(changed_bits, bit) > 0]
+
+    def _get_derived_field_input(self, derived_field, input_field, optional):
+        if input_field == INDEX:
+            return self.df_dict[derived_field.topic_str].index.values
+
+        if isinstance(input_field, tuple):
+            topic_str, field_str = input_field
+            if field_str == INDEX:
+                return self.df_dict[topic_str].index.values
+        else:
+            topic_str = VIRTUAL_TOPICS.get(derived_field.topic_str, derived_field.topic_str)
+            field_str = input_field
+        if optional and (topic_str not in self._topic_fields or field_str not in self._topic_fields[topic_str]):
+            return None
+
+        return self.get_field(topic_str, field_str).values
+
+    # Returns the min/max pyramid used to display a field at a level of detail matching the visible range
+    def get_min_max_pyramid(self, topic_str, field_str):
+        if (topic_str, field_str) not in self._min_max_pyramids:
+            field = self.get_field(topic_str, field_str)
+            self._min_max_pyramids[(topic_str, field_str)] = MinMaxPyramid(field.index.values, field.values)
+
+        return self._min_max_pyramids[(topic_str, field_str)]
+
+    # Returns the index of a field for statistics of the samples in time ranges, see RangeStatistics
+    def get_range_statistics(self, topic_str, field_str):
+        if (topic_str, field_str) not in self._range_statistics:
+            self._range_statistics[(topic_str, field_str)] = RangeStatistics(self._get_sorted_time(topic_str), self.get_field(topic_str, field_str).values)
+
+        return self._range_statistics[(topic_str, field_str)]
+
+    # Returns the index of the last sample of a topic at or before each timestamp in t, -1 if there is none. t can be
+    # a scalar or an array of timestamps
+    def get_sample_index(self, topic_str, t):
+        return np.searchsorted(self._get_sorted_time(topic_str), t, side='right') - 1
+
+    # Returns the start and stop index of the samples of a topic in [t0, t1]. t0 and t1 can be scalars or arrays
+    def get_sample_range(self, topic_str, t0, t1):
+        time = self._get_sorted_time(topic_str)
+        return np.searchsorted(time, t0, side='left'), np.searchsorted(time, t1, side='right')
+
+    # Timestamps that go backwards are replaced by the running maximum, so a lookup finds the same sample as a linear
+    # search for the first later sample
+    def _get_sorted_time(self, topic_str):
+        if topic_str not in self._sorted_times:
+            index = self.df_dict[topic_str].index
+            if index.is_monotonic_increasing:
+                self._sorted_times[topic_str] = index.values
+            else:
+                self._sorted_times[topic_str] = np.maximum.accumulate(index.values)
+
+        return self._sorted_times[topic_str]
+
+    # Returns the fields of a topic linearly interpolated at the times of time_grid as an array with a row per field.
+    # Times outside of the samples are nan. The samples around every time are looked up once for all fields
+    def _interpolate_fields(self, topic_str, field_strs, time_grid):
+        time = self._get_sorted_time(topic_str)
+        values = np.full((len(field_strs), len(time_grid)), np.nan)
+        if len(time) == 0:
+            return values
+
+        inside = (time_grid >= time[0]) & (time_grid <= time[-1])
+        grid = time_grid[inside]
+        idx = np.minimum(np.searchsorted(time, grid, side='right') - 1, max(len(time) - 2, 0))
+        next_idx = np.minimum(idx + 1, len(time) - 1)
+        dt = time[next_idx] - time[idx]
+        weight = np.divide(grid - time[idx], dt, out=np.zeros(len(grid)), where=dt > 0)
+        samples = np.stack([self.get_field(topic_str, field_str).values.astype(np.float64) for field_str in field_strs])
+        values[:, inside] = samples[:, idx] + weight * (samples[:, next_idx] - samples[:, idx])
+        return values
+
+    # Resample fields of any topics on a common time grid from start to stop at a fixed period, the times are the
+    # displayed times, which include the time offset of the logfile. topic_and_fields is a list of (topic name, field
+    # name). Returns the time grid and an array with a row per field. The resampled fields are cached
+    def get_resampled_fields(self, topic_and_fields, start, stop, period):
+        time_grid = get_time_grid(start, stop, period)
+        grid_key = (time_grid[0] - self.time_offset, time_grid[-1] - self.time_offset, len(time_grid))
+        missing_fields = {}
+        for topic_str, field_str in topic_and_fields:
+            if (topic_str, field_str) + grid_key not in self._resampled_fields:
+                missing_fields.setdefault(topic_str, []).append(field_str)
+        for topic_str, field_strs in missing_fields.items():
+            field_strs = list(dict.fromkeys(field_strs))
+            for field_str, values in zip(field_strs, self._interpolate_fields(topic_str, field_strs, time_grid - self.time_offset)):
+                self._resampled_fields[(topic_str, field_str) + grid_key] = values
+
+        resampled_fields = np.empty((len(topic_and_fields), len(time_grid)))
+        for row, topic_and_field in enumerate(topic_and_fields):
+            self._resampled_fields.move_to_end(tuple(topic_and_field) + grid_key)
+            resampled_fields[row] = self._resampled_fields[tuple(topic_and_field) + grid_key]
+        while len(self._resampled_fields) > max(RESAMPLED_CACHE_SIZE, len(topic_and_fields)):
+            self._resampled_fields.popitem(last=False)
+
+        return time_grid, resampled_fields
+
+    # Forget the range statistics, resampled fields, spectra and flag changes of a field, of all fields of the topic if
+    # field_str is None
+    def _remove_cached_fields(self, topic_str, field_str=None):
+        for cache in [self._range_statistics, self._resampled_fields, self._spectra, self._flag_changes]:
+            for key in list(cache):
+                if key[0] == topic_str and (field_str is None or key[1] == field_str):
+                    del cache[key]
+
+    # Returns the spectrum of a field in [t0, t1], see SpectralAnalysis.get_spectrum. Samples with time steps that are
+    # not uniform are linearly resampled at the median time step. Returns None if there are not enough samples or if
+    # is_cancelled returns True during the calculation. The spectra are cached
+    def get_spectrum(self, topic_str, field_str, t0, t1, segment_size=SEGMENT_SIZE, is_cancelled=None):
+        key = (topic_str, field_str, t0, t1, segment_size)
+        # Spectra are calculated in a worker thread while the caches can be cleared by an update
+        with self.df_dict.lock:
+            spectrum = self._spectra.get(key)
+            if spectrum is not None:
+                self._spectra.move_to_end(key)
+        if spectrum is None:
+            idx_start, idx_stop = self.get_sample_range(topic_str, t0, t1)
+            time = self._get_sorted_time(topic_str)[idx_start:idx_stop]
+            if len(time) < MIN_SPECTRUM_SAMPLES:
+                return None
+            dt = np.diff(time)
+            period = np.median(dt)
+            if not period > 0:
+                return None
+
+            resampled = np.abs(dt - period).max() > MAX_SAMPLING_JITTER * period
+            if resampled:
+                y_value = self._interpolate_fields(topic_str, [field_str], get_time_grid(time[0], time[-1], period))[0]
+            else:
+                y_value = self.get_field(topic_str, field_str).values[idx_start:idx_stop].astype(np.float64)
+            spectrum = get_spectrum(y_value, 1 / period, time[0], segment_size, resampled, is_cancelled)
+            if spectrum is None:
+                return None
+            with self.df_dict.lock:
+                self._spectra[key] = spectrum
+                while len(self._spectra) > SPECTRUM_CACHE_SIZE:
+                    self._spectra.popitem(last=False)
+
+        return spectrum
+
+    # Find the names of all logged fields and of the derived fields whose inputs are present. Missing inputs are only
+    # reported for the topics in new_topics, all topics if it is None
+    def _index_topic_fields(self, new_topics=None):
+        self._topic_fields = {}
+        self._topic_dtypes = {}
+        for topic_str, topic in self._ulog_index.topics.items():
+            self._topic_dtypes[topic_str] = [(name, topic.dtype[name]) for name in topic.field_names if name != 'timestamp']
+            self._topic_fields[topic_str] = [name for name, dtype in self._topic_dtypes[topic_str]]
+
+        for topic_str, source_topic_str in VIRTUAL_TOPICS.items():
+            if source_topic_str in self._topic_fields:
+                self._topic_fields[topic_str] = []
+
+        self._index_flag_fields()
+        for topic_str, bit_fields in self._flag_bit_fields.items():
+            self._topic_fields[topic_str].extend(bit_fields)
+
+        for topic_str, derived_fields in DERIVED_FIELDS.items():
+            if topic_str not in self._topic_fields:
+                continue
+            for field_str, derived_field in derived_fields.items():
+                missing_inputs = []
+                for input_field in derived_field.input_fields:
+                    if isinstance(input_field, tuple):
+                        input_topic_str, input_field_str = input_field
+                    else:
+                        input_topic_str, input_field_str = VIRTUAL_TOPICS.get(topic_str, topic_str), input_field
+                    if input_field_str == INDEX:
+                        if input_topic_str not in self._topic_fields:
+                            missing_inputs.append(input_topic_str)
+                    elif input_field_str not in self._topic_fields.get(input_topic_str, []):
+                        missing_inputs.append(input_field_str)
+
+                if len(missing_inputs) > 0:
+                    if new_topics is None or topic_str in new_topics:
+                        print("WARNING: " + topic_str + "->" + field_str + " not available, missing input: " + ", ".join(missing_inputs))
+                else:
+                    self._topic_fields[topic_str].append(field_str)
+
+    # Create the derived fields of the bits of all flag fields. The bits are fields of the virtual topic of the logged
+    # topic if there is one, otherwise of the logged topic
+    def _index_flag_fields(self):
+        self._flag_bit_fields = {}
+        self._flag_bits = {}
+        virtual_topics = {source_topic_str: topic_str for topic_str, source_topic_str in VIRTUAL_TOPICS.items() if topic_str in self._topic_fields}
+        for source_topic_str, dtypes in self._topic_dtypes.items():
+            topic_str = virtual_topics.get(source_topic_str, source_topic_str)
+            for flags_field_str, dtype in dtypes:
+                if not is_flags_field(flags_field_str, dtype):
+                    continue
+                self._flag_bits[(source_topic_str, flags_field_str)] = (source_topic_str, flags_field_str, None)
+                bit_fields = self._flag_bit_fields.setdefault(topic_str, collections.OrderedDict())
+                for bit, bit_str in enumerate(get_bit_names(flags_field_str, dtype)):
+                    bit_fields[bit_str] = DerivedField(topic_str, bit_str, [flags_field_str], lambda flags, bit=bit: get_bit(flags, bit))
+                    self._flag_bits[(topic_str, bit_str)] = (source_topic_str, flags_field_str, bit)
+
+    def _load_topic(self, topic_str):
+        if self._log_cache.has_topic(topic_str):
+            return self._log_cache.load_topic(topic_str)
+
+        # Topics created in postprocessing only consist of derived fields
+        if topic_str in VIRTUAL_TOPICS:
+            import pandas as pd
+            return pd.DataFrame(index=self.df_dict[VIRTUAL_TOPICS[topic_str]].index)
+
+        # Decode the logged fields directly into the memory mapped columns of the topic, keeping their data types
+        topic = self._ulog_index.topics[topic_str]
+        columns = self._log_cache.create_topic(topic_str, topic.num_data_points, [('__index__', np.float64)] + self._topic_dtypes[topic_str])
+        index = columns.pop('__index__')
+        self._ulog_index.decode_into(topic_str, columns, index)
+        self._log_cache.commit_topic(topic_str)
+        del columns, index
+
+        return self._log_cache.load_topic(topic_str)
+
+    # Decode topics into the column store in a pool of worker processes. Large topics are split into parts that are
+    # decoded by different workers, every worker writes its rows directly into the memory mapped file of the topic
+    def _decode_topics_parallel(self, topic_list, executor):
+        futures = []
+        for topic_str in topic_list:
+            topic = self._ulog_index.topics[topic_str]
+            self._log_cache.create_topic(topic_str, topic.num_data_points, [('__index__', np.float64)] + self._topic_dtypes[topic_str])
+            bin_path, layout = self._log_cache.get_created_topic(topic_str)
+            rows_per_part = max(1, PARALLEL_DECODE_SIZE // topic.dtype.itemsize)
+            for start in range(0, topic.num_data_points, rows_per_part):
+                futures.append(executor.submit(_decode_topic_rows, self._logfile_str, topic.get_rows(start, start + rows_per_part), bin_path, layout, start))
+
+        for future in futures:
+            future.result()
+        for topic_str in topic_list:
+            self._log_cache.commit_topic(topic_str)
 
     def _set_title(self):
         self.title = self._logfile_str
         if 'AIRCRAFT_ID' in self.initial_parameters:
             self.title = self.title + " ({0})".format(int(self.initial_parameters['AIRCRAFT_ID']))
 
-    # Add fields to df_dict. * is added to the names to represent that it was calculated in postprocessing and not logged
-    def _add_all_fields_to_df(self):
-        # Add norm of magnetometer measurement to sensor_combined
-        try:
-            topic_str = 'sensor_combined_0'
-            self.df_dict[topic_str]['magnetometer_ga_norm*'] = np.sqrt(self.df_dict[topic_str]['magnetometer_ga[0]']**2 + self.df_dict[topic_str]['magnetometer_ga[1]']**2 + self.df_dict[topic_str]['magnetometer_ga[2]']**2)
-        except Exception as ex:
-            pass
-
-        # Add norm of accelerometer measurement to sensor_combined
-        try:
-            topic_str = 'sensor_combined_0'
-            self.df_dict[topic_str]['accelerometer_m_s2_norm*'] = np.sqrt(self.df_dict[topic_str]['accelerometer_m_s2[0]']**2 + self.df_dict[topic_str]['accelerometer_m_s2[1]']**2 + self.df_dict[topic_str]['accelerometer_m_s2[2]']**2)
-        except Exception as ex:
-            pass
-
-        # Add windspeed magnitude and direction to wind_estimate
-        try:
-            topic_str = 'wind_estimate_0'
-            self.df_dict[topic_str]['windspeed_magnitude*'] = np.sqrt(self.df_dict[topic_str]['windspeed_north']**2 + self.df_dict[topic_str]['windspeed_east']**2)
-            self.df_dict[topic_str]['windspeed_direction*'] = np.arctan2(self.df_dict[topic_str]['windspeed_east'], self.df_dict[topic_str]['windspeed_north'])
-            self.df_dict[topic_str]['windspeed_direction* [deg]'] = np.rad2deg(self.df_dict[topic_str]['windspeed_direction*'])
-        except Exception as ex:
-            pass
-
-        # Add vxy and vxyz to vehicle_local_position
-        try:
-            topic_str = 'vehicle_local_position_0'
-            self.df_dict[topic_str]['vxy*'] = np.sqrt(self.df_dict[topic_str]['vx']**2 + self.df_dict[topic_str]['vy']**2)
-            self.df_dict[topic_str]['vxyz*'] = np.sqrt(self.df_dict[topic_str]['vx']**2 + self.df_dict[topic_str]['vy']**2 + self.df_dict[topic_str]['vz']**2)
-        except Exception as ex:
-            pass
-
-        # Add vel_ne and vel_ned to vehicle_global_position
-        try:
-            topic_str = 'vehicle_global_position_0'
-            self.df_dict[topic_str]['vel_ne*'] = np.sqrt(self.df_dict[topic_str]['vel_n']**2 + self.df_dict[topic_str]['vel_e']**2)
-            self.df_dict[topic_str]['vel_ned*'] = np.sqrt(self.df_dict[topic_str]['vel_n']**2 + self.df_dict[topic_str]['vel_e']**2 + self.df_dict[topic_str]['vel_d']**2)
-        except Exception as ex:
-            pass
-
-        # Add vel_ne_m_s to vehicle_gps_position_0
-        try:
-            topic_str = 'vehicle_gps_position_0'
-            self.df_dict[topic_str]['vel_ne_m_s*'] = np.sqrt(self.df_dict[topic_str]['vel_n_m_s']**2 + self.df_dict[topic_str]['vel_e_m_s']**2)
-            self.df_dict[topic_str]['gpsCOG*'] = np.arctan2(self.df_dict[topic_str]['vel_e_m_s'], self.df_dict[topic_str]['vel_n_m_s'])
-            self.df_dict[topic_str]['gpsCOG* [deg]'] = np.rad2deg(self.df_dict[topic_str]['gpsCOG*'])
-        except Exception as ex:
-            pass
-
-        # Add vel_ne_m_s to vehicle_gps_position_1
-        try:
-            topic_str = 'vehicle_gps_position_1'
-            self.df_dict[topic_str]['vel_ne_m_s*'] = np.sqrt(self.df_dict[topic_str]['vel_n_m_s']**2 + self.df_dict[topic_str]['vel_e_m_s']**2)
-            self.df_dict[topic_str]['gpsCOG*'] = np.arctan2(self.df_dict[topic_str]['vel_e_m_s'], self.df_dict[topic_str]['vel_n_m_s'])
-            self.df_dict[topic_str]['gpsCOG* [deg]'] = np.rad2deg(self.df_dict[topic_str]['gpsCOG*'])
-        except Exception as ex:
-            pass
-
-        # Add mag_declination_from_states, mag_inclination_from_states and mag_strength_from_states to estimator_status
-        try:
-            topic_str = 'estimator_status_0'
-            self.df_dict[topic_str]['mag_declination_from_states*'] = np.arctan2(self.df_dict[topic_str]['states[17]'], self.df_dict[topic_str]['states[16]'])
-            self.df_dict[topic_str]['mag_declination_from_states* [deg]'] = np.rad2deg(self.df_dict[topic_str]['mag_declination_from_states*'])
-            self.df_dict[topic_str]['mag_strength_from_states*'] = (self.df_dict[topic_str]['states[16]'] ** 2 + self.df_dict[topic_str]['states[17]'] ** 2 + self.df_dict[topic_str]['states[18]'] ** 2) ** 0.5
-            self.df_dict[topic_str]['mag_inclination_from_states*'] = np.arcsin(self.df_dict[topic_str]['states[18]'] / np.maximum(self.df_dict[topic_str]['mag_strength_from_states*'], np.finfo(np.float32).eps))
-            self.df_dict[topic_str]['mag_inclination_from_states* [deg]'] = np.rad2deg(self.df_dict[topic_str]['mag_inclination_from_states*'])
-            self.df_dict[topic_str]['ekfGOG*'] = np.arctan2(self.df_dict[topic_str]['states[5]'], self.df_dict[topic_str]['states[4]'])
-            self.df_dict[topic_str]['ekfGOG* [deg]'] = np.rad2deg(self.df_dict[topic_str]['ekfGOG*'])
-        except Exception as ex:
-            pass
-
-        # Add fields to ekf2_innovations
-        try:
-            topic_str = 'ekf2_innovations_0'
-            self.df_dict[topic_str]['heading_innov_var^0.5'] = np.sqrt(self.df_dict[topic_str]['heading_innov_var'])
-            self.df_dict[topic_str]['mag_innov_var[0]^0.5'] = np.sqrt(self.df_dict[topic_str]['mag_innov_var[0]'])
-            self.df_dict[topic_str]['mag_innov_var[1]^0.5'] = np.sqrt(self.df_dict[topic_str]['mag_innov_var[1]'])
-            self.df_dict[topic_str]['mag_innov_var[2]^0.5'] = np.sqrt(self.df_dict[topic_str]['mag_innov_var[2]'])
-            self.df_dict[topic_str]['beta_innov_var^0.5'] = np.sqrt(self.df_dict[topic_str]['beta_innov_var'])
-            self.df_dict[topic_str]['vel_pos_innov_var[0]^0.5'] = np.sqrt(self.df_dict[topic_str]['vel_pos_innov_var[0]'])
-            self.df_dict[topic_str]['vel_pos_innov_var[1]^0.5'] = np.sqrt(self.df_dict[topic_str]['vel_pos_innov_var[1]'])
-            self.df_dict[topic_str]['vel_pos_innov_var[2]^0.5'] = np.sqrt(self.df_dict[topic_str]['vel_pos_innov_var[2]'])
-            self.df_dict[topic_str]['heading_innov* [deg]'] = np.rad2deg(self.df_dict[topic_str]['heading_innov'])
-        except Exception as ex:
-            pass
-
-        # Add yaw, pitch, roll
-        self._add_yaw_pitch_roll('vehicle_attitude_0', 'q')
-        self._add_yaw_pitch_roll('vehicle_attitude_groundtruth_0', 'q')
-        self._add_yaw_pitch_roll('vehicle_attitude_setpoint_0', 'q_d')
-        self._add_yaw_pitch_roll('estimator_status_0', 'q')
-        self._add_yaw_pitch_roll('estimator_status_0', 'states')
-        self._add_yaw_pitch_roll('control_state_0', 'q')
-
-        # Add total pitch setpoint to vehicle_attitude_setpoint_0
-        try:
-            topic_str = 'vehicle_attitude_setpoint_0'
-            self.df_dict[topic_str]['pitch_body [deg]'] = np.rad2deg(self.df_dict[topic_str]['pitch_body'])
-            self.df_dict[topic_str]['pitch_body + 8 [deg]'] = self.df_dict[topic_str]['pitch_body [deg]'] + 8
-        except Exception as ex:
-            pass
-
-        # Add lat_m, lon_m to vehicle_gps_position
-        try:
-            self._add_lat_lon_m('vehicle_gps_position_0', 'lat', 'lon', 1e7)
-        except Exception as ex:
-            pass
-
-        try:
-            self._add_lat_lon_m('vehicle_gps_position_1', 'lat', 'lon', 1e7)
-        except Exception as ex:
-            pass
-
-        # Add lat_m, lon_m to vehicle_global_position
-        try:
-            self._add_lat_lon_m('vehicle_global_position_0', 'lat', 'lon')
-        except Exception as ex:
-            pass
-
-        # Add lat_m, lon_m to position_setpoint_triplet_0
-        try:
-            self._add_lat_lon_m('position_setpoint_triplet_0', 'current.lat', 'current.lon')
-        except Exception as ex:
-            pass
-
-        # Add dt to sensor_combined_0
-        try:
-            topic_str = 'sensor_combined_0'
-            self.df_dict[topic_str]['dt*'] = np.insert(np.diff(self.df_dict[topic_str].index) * 1e6, 0, 0)
-        except Exception as ex:
-            pass
-
-        # Add bits of control_mode_flags and gps_check_fail_flags to estimator_flags*
-        try:
-            control_mode_flags_values = self.df_dict['estimator_status_0']['control_mode_flags'].values
-            topic_str = 'estimator_flags*'
-            self.df_dict[topic_str] = pd.DataFrame(((2 ** 0 & control_mode_flags_values) > 0) * 1, index=self.df_dict['estimator_status_0'].index, columns=['CS_TILT_ALIGN'])  # 0 - true if the filter tilt alignment is complete
-            self.df_dict[topic_str]['CS_YAW_ALIGN'] = ((2 ** 1 & control_mode_flags_values) > 0) * 1  # 1 - true if the filter yaw alignment is complete
-            self.df_dict[topic_str]['CS_GPS'] = ((2 ** 2 & control_mode_flags_values) > 0) * 1  # 2 - true if GPS measurements are being fused
-            self.df_dict[topic_str]['CS_OPT_FLOW'] = ((2 ** 3 & control_mode_flags_values) > 0) * 1  # 3 - true if optical flow measurements are being fused
-            self.df_dict[topic_str]['CS_MAG_HDG'] = ((2 ** 4 & control_mode_flags_values) > 0) * 1  # 4 - true if a simple magnetic yaw heading is being fused
-            self.df_dict[topic_str]['CS_MAG_3D'] = ((2 ** 5 & control_mode_flags_values) > 0) * 1  # 5 - true if 3-axis magnetometer measurement are being fused
-            self.df_dict[topic_str]['CS_MAG_DEC'] = ((2 ** 6 & control_mode_flags_values) > 0) * 1  # 6 - true if synthetic magnetic declination measurements are being fused
-            self.df_dict[topic_str]['CS_IN_AIR'] = ((2 ** 7 & control_mode_flags_values) > 0) * 1  # 7 - true when thought to be airborne
-            self.df_dict[topic_str]['CS_WIND'] = ((2 ** 8 & control_mode_flags_values) > 0) * 1  # 8 - true when wind velocity is being estimated
-            self.df_dict[topic_str]['CS_BARO_HGT'] = ((2 ** 9 & control_mode_flags_values) > 0) * 1  # 9 - true when baro height is being fused as a primary height reference
-            self.df_dict[topic_str]['CS_RNG_HGT'] = ((2 ** 10 & control_mode_flags_values) > 0) * 1  # 10 - true when range finder height is being fused as a primary height reference
-            self.df_dict[topic_str]['CS_GPS_HGT'] = ((2 ** 11 & control_mode_flags_values) > 0) * 1  # 11 - true when GPS height is being fused as a primary height reference
-            self.df_dict[topic_str]['CS_EV_POS'] = ((2 ** 12 & control_mode_flags_values) > 0) * 1  # 12 - true when local position data from external vision is being fused
-            self.df_dict[topic_str]['CS_EV_YAW'] = ((2 ** 13 & control_mode_flags_values) > 0) * 1  # 13 - true when yaw data from external vision measurements is being fused
-            self.df_dict[topic_str]['CS_EV_HGT'] = ((2 ** 14 & control_mode_flags_values) > 0) * 1  # 14 - true when height data from external vision measurements is being fused
-            self.df_dict[topic_str]['CS_BETA'] = ((2 ** 15 & control_mode_flags_values) > 0) * 1  # 15 - true when synthetic sideslip measurements are being fused
-            self.df_dict[topic_str]['CS_MAG_FIELD'] = ((2 ** 16 & control_mode_flags_values) > 0) * 1  # 16 - true when only the magnetic field states are updated by the magnetometer
-            self.df_dict[topic_str]['CS_FIXED_WING'] = ((2 ** 17 & control_mode_flags_values) > 0) * 1  # 17 - true when thought to be operating as a fixed wing vehicle with constrained sideslip
-            self.df_dict[topic_str]['CS_MAG_FAULT'] = ((2 ** 18 & control_mode_flags_values) > 0) * 1  # 18 - true when the magnetomer has been declared faulty and is no longer being used
-            self.df_dict[topic_str]['CS_ASPD'] = ((2 ** 19 & control_mode_flags_values) > 0) * 1  # 19 - true when airspeed measurements are being fused
-            self.df_dict[topic_str]['CS_GND_EFFECT'] = ((2 ** 20 & control_mode_flags_values) > 0) * 1  # 20 - true when when protection from ground effect induced static pressure rise is active
-            self.df_dict[topic_str]['CS_RNG_STUCK'] = ((2 ** 21 & control_mode_flags_values) > 0) * 1  # 21 - true when a stuck range finder sensor has been detected
-            self.df_dict[topic_str]['CS_GPS_YAW'] = ((2 ** 22 & control_mode_flags_values) > 0) * 1  # 22 - true when yaw (not ground course) data from a GPS receiver is being fused
-            self.df_dict[topic_str]['CS_MAG_ALIGNED'] = ((2 ** 23 & control_mode_flags_values) > 0) * 1  # 23 - true when the in-flight mag field alignment has been completed
-
-            gps_check_fail_flags_values = self.df_dict['estimator_status_0']['gps_check_fail_flags'].values
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_GPS_FIX'] = ((2 ** 0 & gps_check_fail_flags_values) > 0) * 1  # 0 : insufficient fix type (no 3D solution)
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MIN_SAT_COUNT'] = ((2 ** 1 & gps_check_fail_flags_values) > 0) * 1  # 1 : minimum required sat count fail
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MIN_GDOP'] = ((2 ** 2 & gps_check_fail_flags_values) > 0) * 1  # 2 : minimum required GDoP fail
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_HORZ_ERR'] = ((2 ** 3 & gps_check_fail_flags_values) > 0) * 1  # 3 : maximum allowed horizontal position error fail
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_VERT_ERR'] = ((2 ** 4 & gps_check_fail_flags_values) > 0) * 1  # 4 : maximum allowed vertical position error fail
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_SPD_ERR'] = ((2 ** 5 & gps_check_fail_flags_values) > 0) * 1  # 5 : maximum allowed speed error fail
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_HORZ_DRIFT'] = ((2 ** 6 & gps_check_fail_flags_values) > 0) * 1  # 6 : maximum allowed horizontal position drift fail - requires stationary vehicle
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_VERT_DRIFT'] = ((2 ** 7 & gps_check_fail_flags_values) > 0) * 1  # 7 : maximum allowed vertical position drift fail - requires stationary vehicle
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_HORZ_SPD_ERR'] = ((2 ** 8 & gps_check_fail_flags_values) > 0) * 1  # 8 : maximum allowed horizontal speed fail - requires stationary vehicle
-            self.df_dict[topic_str]['GPS_CHECK_FAIL_MAX_VERT_SPD_ERR'] = ((2 ** 9 & gps_check_fail_flags_values) > 0) * 1  # 9 : maximum allowed vertical velocity discrepancy fail
-
-        except Exception as ex:
-            pass
-
-    def _add_lat_lon_m(self, topic_str, lat_str, lon_str, div=1):
-        lat = np.deg2rad(self.df_dict[topic_str][lat_str].values / div)
-        lon = np.deg2rad(self.df_dict[topic_str][lon_str].values / div)
-
-        anchor_lat = lat[0]
-        anchor_lon = lon[0]
-
-        # try to get the anchor position from the dataset
-        try:
-            local_pos_data = self.df_dict['vehicle_local_position_0']
-            indices = np.nonzero(local_pos_data['ref_timestamp'])
-            if len(indices[0]) > 0:
-                anchor_lat = np.deg2rad(local_pos_data['ref_lat'].values[indices[0][0]])
-                anchor_lon = np.deg2rad(local_pos_data['ref_lon'].values[indices[0][0]])
-        except:
-            pass
-
-        lat_m, lon_m = self._map_projection(lat, lon, anchor_lat, anchor_lon)
-        self.df_dict[topic_str][lat_str + '_m*'] = lat_m
-        self.df_dict[topic_str][lon_str + '_m*'] = lon_m
-
-    # Function from flight_review (https://github.com/PX4/flight_review/)
-    def _map_projection(self, lat, lon, anchor_lat, anchor_lon):
-        """ convert lat, lon in [rad] to x, y in [m] with an anchor position """
-        sin_lat = np.sin(lat)
-        cos_lat = np.cos(lat)
-        cos_d_lon = np.cos(lon - anchor_lon)
-        sin_anchor_lat = np.sin(anchor_lat)
-        cos_anchor_lat = np.cos(anchor_lat)
-
-        arg = sin_anchor_lat * sin_lat + cos_anchor_lat * cos_lat * cos_d_lon
-        arg[arg > 1] = 1
-        arg[arg < -1] = -1
-
-        # np.set_printoptions(threshold=np.nan)
-        c = np.arccos(arg)
-        k = np.copy(lat)
-        for i in range(len(lat)):
-            if np.abs(c[i]) < np.finfo(float).eps:
-                k[i] = 1
-            else:
-                k[i] = c[i] / np.sin(c[i])
-
-        CONSTANTS_RADIUS_OF_EARTH = 6371000
-        x = k * (cos_anchor_lat * sin_lat - sin_anchor_lat * cos_lat * cos_d_lon) * \
-            CONSTANTS_RADIUS_OF_EARTH
-        y = k * cos_lat * np.sin(lon - anchor_lon) * CONSTANTS_RADIUS_OF_EARTH
-
-        return x, y
-
-    def _add_yaw_pitch_roll(self, topic_str, field_name_suffix=''):
-        try:
-            q0 = self.df_dict[topic_str][field_name_suffix + '[0]']
-            q1 = self.df_dict[topic_str][field_name_suffix + '[1]']
-            q2 = self.df_dict[topic_str][field_name_suffix + '[2]']
-            q3 = self.df_dict[topic_str][field_name_suffix + '[3]']
-
-            self.df_dict[topic_str][field_name_suffix + '_' + 'yaw312*'] = np.arctan2(-2.0 * (q1 * q2 - q0 * q3), q0 * q0 - q1 * q1 + q2 * q2 - q3 * q3)
-            self.df_dict[topic_str][field_name_suffix + '_' + 'roll312*'] = np.arcsin(2.0 * (q2 * q3 + q0 * q1))
-            self.df_dict[topic_str][field_name_suffix + '_' + 'pitch312*'] = np.arctan2(-2.0 * (q1 * q3 - q0 * q2), q0 * q0 - q1 * q1 - q2 * q2 + q3 * q3)
-
-            self.df_dict[topic_str][field_name_suffix + '_' + 'yaw312* [deg]'] = np.rad2deg(self.df_dict[topic_str][field_name_suffix + '_' + 'yaw312*'])
-            self.df_dict[topic_str][field_name_suffix + '_' + 'roll312* [deg]'] = np.rad2deg(self.df_dict[topic_str][field_name_suffix + '_' + 'roll312*'])
-            self.df_dict[topic_str][field_name_suffix + '_' + 'pitch312* [deg]'] = np.rad2deg(self.df_dict[topic_str][field_name_suffix + '_' + 'pitch312*'])
-        except Exception as ex:
-            pass
-
+    # Find the start and stop of the forward transitions and the start and stop of the transitions while the vehicle is
+    # a rotary wing from the edges of the fields of vehicle_status_0
     def _get_transition_timestamps(self):
-        try:
-            if self.df_dict['vehicle_status_0']['in_transition_mode'].any():
-                forward_transition_lines = self.df_dict['vehicle_status_0'].index[self.df_dict['vehicle_status_0'].ne(self.df_dict['vehicle_status_0'].shift())['in_transition_to_fw']].tolist()
-                forward_transition_lines.pop(0)
-                self.forward_transition_lines = forward_transition_lines
-
-                logical_series = self.df_dict['vehicle_status_0'].ne(self.df_dict['vehicle_status_0'].shift())[['in_transition_mode']]
-                logical_series2 = self.df_dict['vehicle_status_0']['is_rotary_wing'] == True
-
-                df_comb = pd.concat([logical_series, logical_series2], axis=1)
-
-                idx = (df_comb['in_transition_mode']) & (df_comb['is_rotary_wing'])
-                back_transition_lines = self.df_dict['vehicle_status_0'].index[idx].tolist()
-                back_transition_lines.pop(0)
-                self.back_transition_lines = back_transition_lines
-        except:
-            pass
+        if not all(field_str in self._topic_fields.get('vehicle_status_0', []) for field_str in ['in_transition_mode', 'in_transition_to_fw', 'is_rotary_wing']):
+            return
+        in_transition_mode = self.get_field('vehicle_status_0', 'in_transition_mode')
+        if not in_transition_mode.values.any():
+            return
+
+        time = in_transition_mode.index.values
+        self.forward_transition_lines = time[get_edges(self.get_field('vehicle_status_0', 'in_transition_to_fw').values)].tolist()
+        edges = get_edges(in_transition_mode.values)
+        is_rotary_wing = self.get_field('vehicle_status_0', 'is_rotary_wing').values[edges] == True
+        self.back_transition_lines = time[edges[is_rotary_wing]].tolist()
+
+    # Returns the index of the transitions, mode changes, arming and disarming, parameter changes, dropouts and logged
+    # messages of the logfile. It is created when it is first used after the logfile changed
+    def get_event_index(self):
+        with self.df_dict.lock:
+            if self._event_index is None:
+                if self._ulog_index is None:
+                    return EventIndex()
+                vehicle_status = {}
+                if 'vehicle_status_0' in self._topic_fields:
+                    vehicle_status['time'] = self.df_dict['vehicle_status_0'].index.values
+                    for field_str in ['nav_state', 'arming_state']:
+                        if field_str in self._topic_fields['vehicle_status_0']:
+                            vehicle_status[field_str] = self.get_field('vehicle_status_0', field_str).values
+                self._event_index = create_event_index(vehicle_status, self.forward_transition_lines, self.back_transition_lines, self.changed_parameters,
+                                                       self.dropouts, self.logged_messages)
+            return self._event_index
+
+    # Returns the time of the first occurrence of an alignment event [s], None if it does not occur in the logfile. Only
+    # the topic of the event is decoded
+    def get_event_time(self, event_str):
+        if event_str == 'start':
+            return self.start_timestamp / 1e6
+
+        if event_str == 'arming':
+            if 'arming_state' not in self._topic_fields.get('vehicle_status_0', []):
+                return None
+            vehicle_status = self.df_dict['vehicle_status_0']
+            armed = np.flatnonzero(vehicle_status['arming_state'].values == ARMING_STATE_ARMED)
+            return vehicle_status.index[armed[0]] if len(armed) > 0 else None
+
+        if event_str == 'takeoff':
+            if 'landed' not in self._topic_fields.get('vehicle_land_detected_0', []):
+                return None
+            vehicle_land_detected = self.df_dict['vehicle_land_detected_0']
+            flying = np.flatnonzero(vehicle_land_detected['landed'].values == 0)
+            return vehicle_land_detected.index[flying[0]] if len(flying) > 0 else None
+
+        if event_str == 'transition':
+            return self.forward_transition_lines[0] if len(self.forward_transition_lines) > 0 else None
+
+        if event_str.startswith(PARAMETER_EVENT_PREFIX):
+            parameter_str = event_str[len(PARAMETER_EVENT_PREFIX):]
+            for timestamp, name, value in self.changed_parameters:
+                if name == parameter_str:
+                    return timestamp / 1e6
+            return None
+
+        raise ValueError("Unknown alignment event " + event_str)
+
+    # Returns the time offset that aligns this logfile with the reference logfile [s], to be used as the time offset of
+    # this logfile. The logfiles are aligned on an event or on the cross-correlation of a field. Returns None if the
+    # event or the field is missing in one of the logfiles. The offsets are cached until one of the logfiles changes
+    def get_time_offset(self, reference, alignment_str):
+        key = (reference._logfile_str, reference.last_timestamp, self.last_timestamp, alignment_str)
+        if key not in self._time_offsets:
+            if alignment_str.startswith(CORRELATION_ALIGNMENT_PREFIX):
+                topic_str, separator, field_str = alignment_str[len(CORRELATION_ALIGNMENT_PREFIX):].partition('->')
+                if not separator:
+                    raise ValueError("Correlated field has to be given as <topic>-><field>: " + alignment_str)
+                time_offset = self.get_correlation_offset(reference, topic_str, field_str)
+            else:
+                event_time = self.get_event_time(alignment_str)
+                reference_event_time = reference.get_event_time(alignment_str)
+                time_offset = reference_event_time - event_time if event_time is not None and reference_event_time is not None else None
+            self._time_offsets[key] = time_offset
+
+        return self._time_offsets[key]
+
+    # Returns the time offset at which a field of this logfile matches the field of the reference logfile best [s], None
+    # if a logfile does not have the field. Both fields are resampled at the same period and their cross-correlation is
+    # calculated with FFTs. Offsets at which the signals overlap by less than MIN_CORRELATION_OVERLAP are ignored
+    def get_correlation_offset(self, reference, topic_str, field_str):
+        if field_str not in self._topic_fields.get(topic_str, []) or field_str not in reference._topic_fields.get(topic_str, []):
+            return None
+        time = self._get_sorted_time(topic_str)
+        reference_time = reference._get_sorted_time(topic_str)
+        if len(time) < 2 or len(reference_time) < 2:
+            return None
+
+        period = max(np.median(np.diff(time)), np.median(np.diff(reference_time)),
+                     (time[-1] - time[0] + reference_time[-1] - reference_time[0]) / MAX_CORRELATION_SAMPLES)
+        if not period > 0:
+            return None
+        signal = self._interpolate_fields(topic_str, [field_str], get_time_grid(time[0], time[-1], period))[0]
+        reference_signal = reference._interpolate_fields(topic_str, [field_str], get_time_grid(reference_time[0], reference_time[-1], period))[0]
+        if np.isnan(signal).all() or np.isnan(reference_signal).all():
+            return None
+        signal = np.nan_to_num(signal - np.nanmean(signal))
+        reference_signal = np.nan_to_num(reference_signal - np.nanmean(reference_signal))
+
+        # correlation[lag] is the sum of reference_signal[n + lag] * signal[n], negative lags wrap around
+        size = 1 << (len(signal) + len(reference_signal) - 1).bit_length()
+        correlation = np.fft.irfft(np.fft.rfft(reference_signal, size) * np.conj(np.fft.rfft(signal, size)), size)
+        lags = np.arange(size)
+        lags[lags >= len(reference_signal)] -= size
+        overlap = np.minimum(len(signal), len(reference_signal) - lags) - np.maximum(0, -lags)
+        valid = overlap >= MIN_CORRELATION_OVERLAP * min(len(signal), len(reference_signal))
+        correlation = np.where(valid, correlation, -np.inf)
+        best = int(np.argmax(correlation))
+        if not correlation[best] > 0:
+            return None
+
+        return reference_time[0] - time[0] + lags[best] * period
+
+    # Returns the information printed by ulog_info as a dictionary
+    def get_ulog_info(self):
+        # From pyulog.info
+        dropout_durations = [dropout.duration for dropout in self.dropouts]
+        topics = []
+        for d in sorted(self.data_list, key=lambda d: d.name + str(d.multi_id)):
+            message_size = sum([ULog.get_field_size(f.type_str) for f in d.field_data])
+            topics.append({'name': d.name, 'multi_id': d.multi_id, 'message_size': message_size,
+                           'num_data_points': d.num_data_points, 'total_bytes': message_size * d.num_data_points})
+
+        return {'start_time': int(self.start_timestamp / 1e6),
+                'duration': int((self.last_timestamp - self.start_timestamp) / 1e6),
+                'dropout_count': len(dropout_durations),
+                'dropout_total_duration': sum(dropout_durations) / 1000.,
+                'dropout_max_duration': max(dropout_durations) if len(dropout_durations) > 0 else 0,
+                'dropout_mean_duration': int(sum(dropout_durations) / len(dropout_durations)) if len(dropout_durations) > 0 else 0,
+                'info': {k: self.msg_info_dict[k] for k in sorted(self.msg_info_dict)},
+                'info_multiple': {k: self.msg_info_multiple_dict[k] for k in sorted(self.msg_info_multiple_dict)},
+                'topics': topics}
 
     def ulog_info(self):
         print("########### ulog_info: " + self.path_to_logfile + " ###########")
-        # From pyulog.info
         verbose = False
-        m1, s1 = divmod(int(self.start_timestamp / 1e6), 60)
+        info = self.get_ulog_info()
+        m1, s1 = divmod(info['start_time'], 60)
         h1, m1 = divmod(m1, 60)
-        m2, s2 = divmod(int((self.last_timestamp - self.start_timestamp) / 1e6), 60)
+        m2, s2 = divmod(info['duration'], 60)
         h2, m2 = divmod(m2, 60)
         print("Logging start time: {:d}:{:02d}:{:02d}, duration: {:d}:{:02d}:{:02d}".format(
             h1, m1, s1, h2, m2, s2))
 
-        dropout_durations = [dropout.duration for dropout in self.dropouts]
-        if len(dropout_durations) == 0:
+        if info['dropout_count'] == 0:
             print("No Dropouts")
         else:
             print("Dropouts: count: {:}, total duration: {:.1f} s, max: {:} ms, mean: {:} ms"
-                  .format(len(dropout_durations), sum(dropout_durations) / 1000.,
-                          max(dropout_durations),
-                          int(sum(dropout_durations) / len(dropout_durations))))
+                  .format(info['dropout_count'], info['dropout_total_duration'],
+                          info['dropout_max_duration'], info['dropout_mean_duration']))
 
         # version = self.get_version_info_str()
         # if not version is None:
         #     print('SW Version: {}'.format(version))
 
         print("Info Messages:")
-        for k in sorted(self.msg_info_dict):
+        for k, value in info['info'].items():
             if not k.startswith('perf_') or verbose:
-                print(" {0}: {1}".format(k, self.msg_info_dict[k]))
+                print(" {0}: {1}".format(k, value))
 
-        if len(self.msg_info_multiple_dict) > 0:
+        if len(info['info_multiple']) > 0:
             if verbose:
                 print("Info Multiple Messages:")
-                for k in sorted(self.msg_info_multiple_dict):
-                    print(" {0}: {1}".format(k, self.msg_info_multiple_dict[k]))
+                for k, value in info['info_multiple'].items():
+                    print(" {0}: {1}".format(k, value))
             else:
                 print("Info Multiple Messages: {}".format(
-                    ", ".join(["[{}: {}]".format(k, len(self.msg_info_multiple_dict[k])) for k in
-                               sorted(self.msg_info_multiple_dict)])))
+                    ", ".join(["[{}: {}]".format(k, len(value)) for k, value in info['info_multiple'].items()])))
 
         print("")
         print("{:<41} {:7}, {:10}".format("Name (multi id, message size in bytes)",
                                           "number of data points", "total bytes"))
 
-        data_list_sorted = sorted(self.data_list, key=lambda d: d.name + str(d.multi_id))
-        for d in data_list_sorted:
-            message_size = sum([ULog.get_field_size(f.type_str) for f in d.field_data])
-            num_data_points = len(d.data['timestamp'])
-            name_id = "{:} ({:}, {:})".format(d.name, d.multi_id, message_size)
-            print(" {:<40} {:7d} {:10d}".format(name_id, num_data_points,
-                                                message_size * num_data_points))
+        for topic in info['topics']:
+            name_id = "{:} ({:}, {:})".format(topic['name'], topic['multi_id'], topic['message_size'])
+            print(" {:<40} {:7d} {:10d}".format(name_id, topic['num_data_points'], topic['total_bytes']))
 
     def ulog_messages(self):
         print("########### ulog_messages: " + self.path_to_logfile + " ###########")
@@ -390,3 +805,72 @@ class GraphData():
             h1, m1 = divmod(m1, 60)
             print("{:d}:{:02d}:{:02d} {:}: {:}".format(
                 h1, m1, s1, m.log_level_str(), m.message))
+
+
+# Decode a part of a topic that starts at row start into the file of the created topic, run in a worker process
+def _decode_topic_rows(logfile_str, topic, bin_path, layout, start):
+    ulog_index = ULogIndex.from_state(logfile_str, {'topics': {topic.topic_name: topic}})
+    stop = start + topic.num_data_points
+    columns = {name: column[start:stop] for name, column in map_created_topic(bin_path, layout).items()}
+    index = columns.pop(layout['index'])
+    ulog_index.decode_into(topic.topic_name, columns, index)
+    ulog_index.close()
+
+
+# Dictionary of topic dataframes where pending topics are loaded the first time they are accessed. Topics can be
+# accessed from several threads, a topic is only loaded once
+class LazyTopicDict(collections.abc.MutableMapping):
+    def __init__(self):
+        self._loaded = {}
+        self._pending = set()
+        self._load_topic = None
+        # Held while a topic is loaded or replaced
+        self.lock = threading.RLock()
+
+    def set_pending(self, topic_names, load_topic):
+        self._pending = set(topic_names) - set(self._loaded)
+        self._load_topic = load_topic
+
+    # Load a topic again the next time it is accessed, e.g. when its dataframe is outdated
+    def reset(self, topic_str):
+        with self.lock:
+            self._loaded.pop(topic_str, None)
+            self._pending.add(topic_str)
+
+    def is_loaded(self, topic_str):
+        return topic_str in self._loaded
+
+    def __getitem__(self, topic_str):
+        if topic_str not in self._loaded:
+            with self.lock:
+                if topic_str not in self._loaded:
+                    if topic_str not in self._pending:
+                        raise KeyError(topic_str)
+                    self._loaded[topic_str] = self._load_topic(topic_str)
+                    self._pending.discard(topic_str)
+
+        return self._loaded[topic_str]
+
+    def __setitem__(self, topic_str, df):
+        with self.lock:
+            self._loaded[topic_str] = df
+            self._pending.discard(topic_str)
+
+    def __delitem__(self, topic_str):
+        if topic_str in self._pending:
+            self._pending.discard(topic_str)
+        else:
+            del self._loaded[topic_str]
+
+    def __contains__(self, topic_str):
+        return topic_str in self._loaded or topic_str in self._pending
+
+    def __iter__(self):
+        return iter(list(self._loaded) + sorted(self._pending))
+
+    def __len__(self):
+        return len(self._loaded) + len(self._pending)
+
+    def clear(self):
+        self._loaded.clear()
+        self._pending.clear()
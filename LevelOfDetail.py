@@ -0,0 +1,166 @@
+# Module: LevelOfDetail.py
+
+import numpy as np
+from ColumnBuffer import append_to_buffer
+
+# Number of blocks of one level that are merged into a block of the next level
+PYRAMID_FACTOR = 4
+# Number of samples per pixel below which the raw samples are displayed
+MAX_SAMPLES_PER_PIXEL = 4
+
+
+# Run-length index of the nan samples of a curve. Every run of consecutive nan samples is stored as its start index and
+# its stop index after the last nan sample. Curves of integer fields cannot have nan samples and have no runs
+class NanRuns():
+    def __init__(self):
+        self.starts = np.empty(0, dtype=np.int64)
+        self.stops = np.empty(0, dtype=np.int64)
+        self.num_samples = 0
+
+    # Update the runs after samples were appended to the curve, only the new samples are checked for nan
+    def extend(self, y_value):
+        num_old_samples = self.num_samples
+        self.num_samples = len(y_value)
+        if y_value.dtype.kind not in 'fc' or self.num_samples == num_old_samples:
+            return
+
+        edges = np.diff(np.isnan(y_value[num_old_samples:]).view(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1) + num_old_samples
+        stops = np.flatnonzero(edges == -1) + num_old_samples
+        # A run at the end of the old samples is continued by a run at the start of the new samples
+        if len(starts) > 0 and len(self.stops) > 0 and starts[0] == num_old_samples and self.stops[-1] == num_old_samples:
+            self.stops[-1] = stops[0]
+            starts = starts[1:]
+            stops = stops[1:]
+        self.starts = np.append(self.starts, starts)
+        self.stops = np.append(self.stops, stops)
+
+    def __len__(self):
+        return len(self.starts)
+
+    # Returns the times of the first and last nan sample of the runs in [x_min, x_max] as pairs. Runs that are less
+    # than pixel_width apart are merged, so there is at most one run per pixel
+    def get_markers(self, time, x_min, x_max, pixel_width):
+        start_times = time[self.starts]
+        end_times = time[self.stops - 1]
+        first = np.searchsorted(end_times, x_min, side='left')
+        last = np.searchsorted(start_times, x_max, side='right')
+        start_times = start_times[first:last]
+        end_times = end_times[first:last]
+        if pixel_width > 0 and len(start_times) > 1:
+            breaks = np.flatnonzero(start_times[1:] - end_times[:-1] >= pixel_width)
+            start_times = start_times[np.append(0, breaks + 1)]
+            end_times = end_times[np.append(breaks, len(end_times) - 1)]
+        return np.column_stack((start_times, end_times)).ravel()
+
+
+# Multi-resolution min/max pyramid of a curve. Every level stores for each block of samples the index of the minimum
+# and the maximum sample, so a decimated curve keeps all spikes of the raw samples
+class MinMaxPyramid():
+    def __init__(self, time, y_value):
+        self.time = np.asarray(time)
+        self.y_value = np.asarray(y_value)
+        # List of (block size, indices of the block minimums, indices of the block maximums), finest level first
+        self.levels = []
+        # Buffers of the indices of every level that the levels are views of, so they can be extended
+        self._level_buffers = []
+        # Runs of the nan samples, used to mark them at the current zoom
+        self.nan_runs = NanRuns()
+        self._update_levels(0)
+        self.nan_runs.extend(self.y_value)
+
+    # Update the pyramid after samples were appended to the curve. time and y_value are all samples of the curve, only
+    # the blocks that contain new samples are calculated again
+    def extend(self, time, y_value):
+        num_old_samples = len(self.y_value)
+        self.time = np.asarray(time)
+        self.y_value = np.asarray(y_value)
+        self._update_levels(num_old_samples)
+        self.nan_runs.extend(self.y_value)
+
+    # Calculate the blocks of every level that contain samples from num_old_samples on
+    def _update_levels(self, num_old_samples):
+        # nan samples are ignored unless all samples of a block are nan
+        is_float = self.y_value.dtype.kind == 'f'
+        num_samples = len(self.y_value)
+        block_size = 1
+        level = 0
+        while num_samples > PYRAMID_FACTOR:
+            # Levels that did not exist before are calculated completely
+            first_block = num_old_samples // (block_size * PYRAMID_FACTOR) if level < len(self.levels) else 0
+            if level == 0:
+                min_idx = max_idx = np.arange(first_block * PYRAMID_FACTOR, len(self.y_value))
+            else:
+                min_idx = self.levels[level - 1][1][first_block * PYRAMID_FACTOR:]
+                max_idx = self.levels[level - 1][2][first_block * PYRAMID_FACTOR:]
+            min_idx = self._reduce(min_idx, self.y_value, np.argmin, np.inf if is_float else None)
+            max_idx = self._reduce(max_idx, self.y_value, np.argmax, -np.inf if is_float else None)
+            block_size *= PYRAMID_FACTOR
+            num_samples = first_block + len(min_idx)
+            if level < len(self.levels):
+                min_buffer = append_to_buffer(self._level_buffers[level][0], first_block, min_idx)
+                max_buffer = append_to_buffer(self._level_buffers[level][1], first_block, max_idx)
+            else:
+                min_buffer = min_idx
+                max_buffer = max_idx
+            self._level_buffers[level:level + 1] = [(min_buffer, max_buffer)]
+            self.levels[level:level + 1] = [(block_size, min_buffer[:num_samples], max_buffer[:num_samples])]
+            level += 1
+
+    @staticmethod
+    def _reduce(idx, y_value, arg_function, nan_value):
+        num_full_blocks = len(idx) // PYRAMID_FACTOR
+        full_blocks = idx[:num_full_blocks * PYRAMID_FACTOR].reshape(num_full_blocks, PYRAMID_FACTOR)
+        block_values = y_value[full_blocks]
+        if nan_value is not None:
+            block_values = np.where(np.isnan(block_values), nan_value, block_values)
+        reduced = full_blocks[np.arange(num_full_blocks), arg_function(block_values, axis=1)]
+        rest = idx[num_full_blocks * PYRAMID_FACTOR:]
+        if len(rest) > 0:
+            rest_values = y_value[rest]
+            if nan_value is not None:
+                rest_values = np.where(np.isnan(rest_values), nan_value, rest_values)
+            reduced = np.append(reduced, rest[arg_function(rest_values)])
+
+        return reduced
+
+    # Returns the indices of the samples needed to draw the samples [idx_start, idx_stop) with the given pixel width
+    def _get_indices(self, idx_start, idx_stop, pixels):
+        num_samples = idx_stop - idx_start
+        if num_samples <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        level = None
+        for candidate in self.levels:
+            if num_samples // candidate[0] >= pixels:
+                level = candidate
+        if level is None or num_samples <= pixels * MAX_SAMPLES_PER_PIXEL:
+            return np.arange(idx_start, idx_stop)
+
+        # Use the blocks that are completely inside the range, the partial blocks at the ends are drawn at a finer level
+        block_size, min_idx, max_idx = level
+        block_start = -(-idx_start // block_size)
+        block_stop = idx_stop // block_size
+        min_idx = min_idx[block_start:block_stop]
+        max_idx = max_idx[block_start:block_stop]
+        # Draw the minimum and maximum of each block in the order they were logged
+        first = np.minimum(min_idx, max_idx)
+        second = np.maximum(min_idx, max_idx)
+        return np.concatenate((self._get_indices(idx_start, block_start * block_size, pixels),
+                               np.column_stack((first, second)).ravel(),
+                               self._get_indices(block_stop * block_size, idx_stop, pixels)))
+
+    # Returns the indices of the samples to display when x_min to x_max is visible with a width of pixels. The samples
+    # outside of the visible range are included at a coarse level to keep the bounds of the curve
+    def get_indices(self, x_min, x_max, pixels):
+        pixels = max(int(pixels), 1)
+        num_samples = len(self.time)
+        idx_min = max(np.searchsorted(self.time, x_min, side='right') - 1, 0)
+        idx_max = min(np.searchsorted(self.time, x_max, side='left') + 1, num_samples)
+        return np.concatenate((self._get_indices(0, idx_min, pixels),
+                               self._get_indices(idx_min, idx_max, pixels),
+                               self._get_indices(idx_max, num_samples, pixels)))
+
+    def get_curve(self, x_min, x_max, pixels):
+        indices = self.get_indices(x_min, x_max, pixels)
+        return self.time[indices], self.y_value[indices]
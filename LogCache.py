@@ -0,0 +1,258 @@
+# Module: LogCache.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import urllib.parse
+import weakref
+import numpy as np
+
+# Increase when the content of the cache changes, old entries are then ignored
+CACHE_VERSION = 7
+# Size of the blocks of the logfile that are hashed
+HASH_BLOCK_SIZE = 1 << 16
+# Number of blocks spread over the logfile that are hashed in addition to the first and last block
+HASH_BLOCK_COUNT = 64
+# Alignment of the columns in the topic files
+COLUMN_ALIGNMENT = 64
+# Maximum size of the cache [bytes], the least recently used entries are removed when a logfile is opened
+CACHE_SIZE = 2 << 30
+# File of an entry that contains the path of its logfile, its modification time is the last time the entry was used
+ENTRY_LOGFILE_FILE = 'logfile.txt'
+
+# Paths of the entries used by the stores of this process, they are not removed while they are open
+_open_entries = set()
+
+
+# Returns the total size of the files of a cache entry [bytes]
+def get_entry_size(entry_path):
+    size = 0
+    with os.scandir(entry_path) as it:
+        for dir_entry in it:
+            try:
+                size += dir_entry.stat().st_size
+            except OSError:
+                pass
+    return size
+
+
+# Remove the entries of the cache that are outdated and the least recently used entries until the cache is not larger
+# than max_size. An entry is outdated if it was created for logfile_str with another key, e.g. before messages were
+# appended to the logfile, or if it has no logfile file because it was created by an older version. The entry at
+# current_path and the entries open in this process are kept
+def prune_cache(cache_dir, max_size, logfile_str, current_path):
+    try:
+        entry_names = os.listdir(cache_dir)
+    except OSError:
+        return
+
+    entries = []
+    total_size = 0
+    for entry_name in entry_names:
+        entry_path = os.path.join(cache_dir, entry_name)
+        if not os.path.isdir(entry_path):
+            continue
+        try:
+            size = get_entry_size(entry_path)
+            if entry_path == current_path or entry_path in _open_entries:
+                total_size += size
+                continue
+            logfile_path = os.path.join(entry_path, ENTRY_LOGFILE_FILE)
+            with open(logfile_path, 'r') as f:
+                entry_logfile_str = f.read()
+            access_time = os.stat(logfile_path).st_mtime
+        except OSError:
+            entry_logfile_str = None
+        if entry_logfile_str is None or entry_logfile_str == logfile_str:
+            shutil.rmtree(entry_path, ignore_errors=True)
+            continue
+        entries.append((access_time, size, entry_path))
+        total_size += size
+
+    for access_time, size, entry_path in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= size
+
+
+# Returns writable views of the columns of a topic in the buffer of its file
+def get_topic_columns(buffer, layout):
+    length = layout['length']
+    return {name: buffer[offset:offset + length * np.dtype(dtype_str).itemsize].view(dtype_str) for name, dtype_str, offset in layout['columns']}
+
+
+# Returns writable views of the columns of a created topic, e.g. in a worker process
+def map_created_topic(bin_path, layout):
+    return get_topic_columns(np.memmap(bin_path, dtype=np.uint8, mode='r+'), layout)
+
+
+# Column store of a converted logfile. Each topic is stored as a file of contiguous columns that is memory mapped
+# when the topic is loaded, everything else is stored in a JSON metadata file and arrays in .npy files. A persistent store is used as a cache of
+# converted logfiles, a temporary store only backs the dataframes of the currently opened logfile. The cache is kept
+# below max_size when a persistent store is opened
+class LogCache():
+    def __init__(self, logfile_str, cache_dir=None, persistent=True, max_size=CACHE_SIZE):
+        self.persistent = persistent
+        if persistent:
+            if cache_dir is None:
+                cache_dir = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'ulog_explorer')
+            self.path = os.path.join(cache_dir, self._get_key(logfile_str))
+            _open_entries.add(self.path)
+            weakref.finalize(self, _open_entries.discard, self.path)
+            self._mark_used(os.path.abspath(logfile_str))
+            prune_cache(cache_dir, max_size, os.path.abspath(logfile_str), self.path)
+        else:
+            self._create_temporary_dir()
+        # Writable memory maps, layouts and file paths of topics that are created but not yet committed
+        self._created_topics = {}
+
+    # Remove the files of a temporary store. Dataframes that are already loaded stay valid as long as they are mapped
+    def close(self):
+        if not self.persistent:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    # Write the path of the logfile to the entry, which also marks the entry as recently used. Failures are reported
+    # when the topics are written
+    def _mark_used(self, logfile_str):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, ENTRY_LOGFILE_FILE), 'w') as f:
+                f.write(logfile_str)
+        except OSError:
+            pass
+
+    def _create_temporary_dir(self):
+        self.path = tempfile.mkdtemp(prefix='ulog_explorer_')
+        weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    # The key depends on the path, size and modification time of the logfile and a hash of blocks of its content
+    @staticmethod
+    def _get_key(logfile_str):
+        stat = os.stat(logfile_str)
+        key_hash = hashlib.sha1()
+        key_hash.update('{0}|{1}|{2}|{3}'.format(CACHE_VERSION, os.path.abspath(logfile_str), stat.st_size, stat.st_mtime_ns).encode())
+        with open(logfile_str, 'rb') as f:
+            block_offsets = np.linspace(0, max(stat.st_size - HASH_BLOCK_SIZE, 0), HASH_BLOCK_COUNT + 2).astype(np.int64)
+            for offset in np.unique(block_offsets):
+                f.seek(int(offset))
+                key_hash.update(f.read(HASH_BLOCK_SIZE))
+
+        return key_hash.hexdigest()
+
+    def _topic_path(self, topic_str):
+        return os.path.join(self.path, urllib.parse.quote(topic_str, safe=''))
+
+    # Returns the metadata and the dictionary of memory mapped arrays of save_metadata, None if they are not stored
+    def load_metadata(self):
+        try:
+            with open(os.path.join(self.path, 'metadata.json'), 'r') as f:
+                metadata = json.load(f)
+            arrays = {name: np.load(self._topic_path(name) + '.npy', mmap_mode='r', allow_pickle=False) for name in metadata['arrays']}
+        except Exception:
+            return None
+
+        return metadata['metadata'], arrays
+
+    # Store a JSON compatible dictionary and a dictionary of arrays. Nothing is stored with pickle, so a cache entry
+    # that was replaced cannot run code when it is loaded
+    def save_metadata(self, metadata, arrays):
+        for name, values in arrays.items():
+            self._write_file(self._topic_path(name) + '.npy', lambda f, values=values: np.save(f, np.asarray(values), allow_pickle=False))
+        # The metadata is written last, it is only loaded if all arrays exist
+        self._write_file(os.path.join(self.path, 'metadata.json'), lambda f: f.write(json.dumps({'metadata': metadata, 'arrays': list(arrays)}).encode()))
+
+    def has_topic(self, topic_str):
+        return os.path.isfile(self._topic_path(topic_str) + '.json')
+
+    # Returns a dataframe whose index and columns are views into the memory mapped topic file
+    def load_topic(self, topic_str):
+        topic_path = self._topic_path(topic_str)
+        with open(topic_path + '.json', 'r') as f:
+            layout = json.load(f)
+
+        buffer = np.memmap(topic_path + '.bin', dtype=np.uint8, mode='r')
+        length = layout['length']
+        columns = {}
+        for name, dtype_str, offset in layout['columns']:
+            columns[name] = np.frombuffer(buffer, dtype=np.dtype(dtype_str), count=length, offset=offset)
+        index = columns.pop(layout['index'])
+        # A topic is only loaded once from a temporary store, the file is removed when it is no longer mapped. Files
+        # that are mapped cannot be removed on Windows, they are removed with the store there
+        if not self.persistent and os.name == 'posix':
+            os.remove(topic_path + '.json')
+            os.remove(topic_path + '.bin')
+
+        import pandas as pd
+        return pd.DataFrame(columns, index=pd.Index(index), copy=False)
+
+    # Create the file of a topic and return writable views of its columns. The topic can be loaded after commit_topic
+    def create_topic(self, topic_str, length, dtypes):
+        columns = []
+        size = 0
+        for name, dtype in dtypes:
+            dtype = np.dtype(dtype)
+            columns.append([name, dtype.str, size])
+            size += -(-length * dtype.itemsize // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+        bin_path = self._topic_path(topic_str) + '.bin.tmp'
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            buffer = np.memmap(bin_path, dtype=np.uint8, mode='w+', shape=(max(size, 1),))
+        except OSError as ex:
+            if not self.persistent:
+                raise
+            self._use_temporary_store(ex)
+            return self.create_topic(topic_str, length, dtypes)
+
+        layout = {'length': length, 'index': dtypes[0][0], 'columns': columns}
+        self._created_topics[topic_str] = (buffer, layout, bin_path)
+        return get_topic_columns(buffer, layout)
+
+    # Returns the path of the file and the layout of a created topic, used to write its columns in another process
+    def get_created_topic(self, topic_str):
+        buffer, layout, bin_path = self._created_topics[topic_str]
+        return bin_path, layout
+
+    # Finish a created topic. A topic that was created before the store switched to a temporary store is moved there,
+    # its columns may already be written
+    def commit_topic(self, topic_str):
+        buffer, layout, bin_path = self._created_topics.pop(topic_str)
+        buffer.flush()
+        del buffer
+        topic_path = self._topic_path(topic_str)
+        if os.path.dirname(bin_path) == self.path:
+            os.replace(bin_path, topic_path + '.bin')
+        else:
+            shutil.move(bin_path, topic_path + '.bin')
+        # The layout is written last, a topic is only loaded from the cache if its layout exists
+        self._write_file(topic_path + '.json', lambda f: f.write(json.dumps(layout).encode()))
+
+    # Remove a topic that is outdated, e.g. because messages were appended to the logfile
+    def remove_topic(self, topic_str):
+        topic_path = self._topic_path(topic_str)
+        for file_path in [topic_path + '.json', topic_path + '.bin']:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+
+    # Write a file atomically
+    def _write_file(self, file_path, write):
+        tmp_path = file_path + '.tmp'
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, file_path)
+        except OSError as ex:
+            if not self.persistent:
+                raise
+            self._use_temporary_store(ex)
+            self._write_file(os.path.join(self.path, os.path.basename(file_path)), write)
+
+    # Switch to a temporary store if the cache is not writable
+    def _use_temporary_store(self, ex):
+        print("WARNING: Failed to write to the log cache, caching disabled: " + str(ex))
+        self.persistent = False
+        self._create_temporary_dir()
@@ -0,0 +1,95 @@
+# Module: LogLoader.py
+
+import collections
+import threading
+from pyqtgraph.Qt import QtCore
+
+
+# Thread that opens a logfile and decodes its topics in the background. Topics can still be accessed while they are
+# loaded, a topic that is not decoded yet is then decoded in the calling thread. Overlaid logfiles only decode the
+# topics that are requested, and a logfile that is already indexed can be loaded again to decode more topics
+class LogLoader(QtCore.QThread):
+    # Emitted with the graph id when the logfile is indexed and the topic and field names are known
+    sigIndexed = QtCore.Signal(int)
+    # Emitted with the graph id and the topic when a topic is decoded
+    sigTopicLoaded = QtCore.Signal(int, str)
+    # Emitted with the graph id when all topics are decoded or loading was cancelled
+    sigDone = QtCore.Signal(int)
+    # Emitted with the graph id and the error message if the logfile could not be opened
+    sigFailed = QtCore.Signal(int, str)
+
+    def __init__(self, backend, graph_id, priority_topics=(), load_all_topics=True, indexed=False):
+        super(LogLoader, self).__init__()
+        self.backend = backend
+        self.graph_id = graph_id
+        self.logfile_str = backend.graph_data[graph_id].path_to_logfile
+        self.load_all_topics = load_all_topics
+        # True when the topic and field names of the logfile are known
+        self.indexed = indexed
+        self.num_topics = 0
+        self.num_loaded_topics = 0
+        self._cancelled = False
+        # True when no more topics are decoded
+        self._done = False
+        # Topics that are not decoded yet, the first topic is decoded next
+        self._queue = collections.deque(priority_topics)
+        self._queue_lock = threading.Lock()
+
+    # Stop decoding topics after the current topic
+    def cancel(self):
+        self._cancelled = True
+
+    # Decode a topic before the other remaining topics, e.g. when it is selected for plotting. A topic that is not
+    # queued is added if it is in the logfile and not decoded yet. Returns False if the topic is not decoded
+    def prioritize(self, topic_str):
+        with self._queue_lock:
+            if self._done:
+                return False
+            if topic_str in self._queue:
+                self._queue.remove(topic_str)
+            elif self.indexed:
+                df_dict = self.backend.graph_data[self.graph_id].df_dict
+                if topic_str not in df_dict or df_dict.is_loaded(topic_str):
+                    return False
+                self.num_topics += 1
+            self._queue.appendleft(topic_str)
+        return True
+
+    def run(self):
+        was_indexed = self.indexed
+        if not was_indexed:
+            try:
+                self.backend.load_ulog_to_graph_data(self.logfile_str, self.graph_id)
+            except Exception as ex:
+                self.sigFailed.emit(self.graph_id, str(ex))
+                return
+
+        df_dict = self.backend.graph_data[self.graph_id].df_dict
+        with self._queue_lock:
+            topics = [topic_str for topic_str in self._queue if topic_str in df_dict and not df_dict.is_loaded(topic_str)]
+            if self.load_all_topics:
+                topics += [topic_str for topic_str in df_dict if topic_str not in topics]
+            self._queue = collections.deque(topics)
+            self.num_topics = len(topics)
+            self.indexed = True
+        if not was_indexed:
+            self.sigIndexed.emit(self.graph_id)
+
+        while not self._cancelled:
+            with self._queue_lock:
+                if len(self._queue) == 0:
+                    break
+                topic_str = self._queue.popleft()
+            try:
+                df_dict[topic_str]
+            except Exception as ex:
+                print("ERROR: Failed to load " + topic_str + ": " + str(ex))
+                # A logfile that only decodes the requested topics drops the topic, so its curves do not request it again
+                if not self.load_all_topics:
+                    del df_dict[topic_str]
+            self.num_loaded_topics += 1
+            self.sigTopicLoaded.emit(self.graph_id, topic_str)
+
+        with self._queue_lock:
+            self._done = True
+        self.sigDone.emit(self.graph_id)
@@ -0,0 +1,118 @@
+# Module: RangeStatistics.py
+
+import numpy as np
+
+# Percentiles of the samples in a range [%]
+PERCENTILES = [5, 50, 95]
+# Names of the statistics of a range in the order they are displayed
+STATISTICS_NAMES = ['samples', 'min', 'max', 'mean', 'std', 'rms'] + ['p{:d}'.format(percentile) for percentile in PERCENTILES] + \
+                   ['slope', 'rate [Hz]', 'dt jitter [ms]', 'nans']
+# Number of samples per block of the min/max sparse tables
+BLOCK_SIZE = 64
+# Maximum number of samples the percentiles are calculated from, larger ranges are subsampled at a fixed stride
+MAX_PERCENTILE_SAMPLES = 1 << 16
+
+
+# Returns the cumulative sum of values with a leading zero, so the sum of values[i0:i1] is sums[i1] - sums[i0]
+def get_cumulative_sum(values):
+    sums = np.zeros(len(values) + 1)
+    np.cumsum(values, out=sums[1:])
+    return sums
+
+
+# Returns a sparse table of the blocks of values, level k holds the reduction of 2^k blocks starting at every block.
+# nan samples are ignored unless all samples are nan
+def get_sparse_table(values, reduce_function):
+    num_blocks = -(-len(values) // BLOCK_SIZE)
+    blocks = np.full(num_blocks * BLOCK_SIZE, np.nan)
+    blocks[:len(values)] = values
+    levels = [reduce_function.reduce(blocks.reshape(num_blocks, BLOCK_SIZE), axis=1)]
+    width = 1
+    while 2 * width <= num_blocks:
+        levels.append(reduce_function(levels[-1][:-width], levels[-1][width:]))
+        width *= 2
+
+    return levels
+
+
+# Index of a field for statistics of the samples in a time range. Sums, sums of squares, nan counts and the sums of the
+# time steps are stored as cumulative sums, and the minimum and maximum of blocks of samples in sparse tables, so a
+# range is queried in constant time however many samples it has. Only the percentiles are calculated from the samples
+# in the range, from at most MAX_PERCENTILE_SAMPLES of them. time has to be sorted
+class RangeStatistics():
+    def __init__(self, time, y_value):
+        self.time = np.asarray(time)
+        self.y_value = np.asarray(y_value, dtype=np.float64)
+        is_nan = np.isnan(self.y_value)
+        # The values and time steps are summed relative to their mean, so the sums of squares keep their precision
+        self._shift = np.mean(self.y_value[~is_nan]) if not is_nan.all() else 0.0
+        shifted = np.where(is_nan, 0.0, self.y_value - self._shift)
+        self._sums = get_cumulative_sum(shifted)
+        self._square_sums = get_cumulative_sum(shifted * shifted)
+        self._nan_counts = get_cumulative_sum(is_nan)
+        dt = np.diff(self.time)
+        self._dt_shift = np.mean(dt) if len(dt) > 0 else 0.0
+        self._dt_sums = get_cumulative_sum(dt - self._dt_shift)
+        self._dt_square_sums = get_cumulative_sum((dt - self._dt_shift) ** 2)
+        self._min_tables = get_sparse_table(self.y_value, np.fmin)
+        self._max_tables = get_sparse_table(self.y_value, np.fmax)
+
+    # Returns the minimum or maximum of the samples [idx_start, idx_stop) from the sparse tables, the partial blocks at
+    # the ends are reduced from the samples
+    def _reduce_range(self, idx_start, idx_stop, tables, reduce_function):
+        block_start = -(-idx_start // BLOCK_SIZE)
+        block_stop = idx_stop // BLOCK_SIZE
+        if block_start >= block_stop:
+            return reduce_function.reduce(self.y_value[idx_start:idx_stop])
+
+        level = (block_stop - block_start).bit_length() - 1
+        result = reduce_function(tables[level][block_start], tables[level][block_stop - (1 << level)])
+        if idx_start < block_start * BLOCK_SIZE:
+            result = reduce_function(result, reduce_function.reduce(self.y_value[idx_start:block_start * BLOCK_SIZE]))
+        if block_stop * BLOCK_SIZE < idx_stop:
+            result = reduce_function(result, reduce_function.reduce(self.y_value[block_stop * BLOCK_SIZE:idx_stop]))
+        return result
+
+    # Returns a dictionary of the statistics of the samples in [t0, t1] by the names in STATISTICS_NAMES, None if there
+    # are no samples in the range
+    def get_statistics(self, t0, t1):
+        idx_start = int(np.searchsorted(self.time, t0, side='left'))
+        idx_stop = int(np.searchsorted(self.time, t1, side='right'))
+        num_samples = idx_stop - idx_start
+        if num_samples <= 0:
+            return None
+
+        statistics = dict.fromkeys(STATISTICS_NAMES, np.nan)
+        statistics['samples'] = num_samples
+        num_nans = int(self._nan_counts[idx_stop] - self._nan_counts[idx_start])
+        statistics['nans'] = num_nans
+        num_values = num_samples - num_nans
+        if num_values > 0:
+            mean = (self._sums[idx_stop] - self._sums[idx_start]) / num_values
+            variance = max((self._square_sums[idx_stop] - self._square_sums[idx_start]) / num_values - mean * mean, 0.0)
+            statistics['min'] = self._reduce_range(idx_start, idx_stop, self._min_tables, np.fmin)
+            statistics['max'] = self._reduce_range(idx_start, idx_stop, self._max_tables, np.fmax)
+            # The rounding errors of the sums do not add up to a variance for constant values
+            if statistics['min'] == statistics['max']:
+                mean = statistics['min'] - self._shift
+                variance = 0.0
+            statistics['mean'] = self._shift + mean
+            statistics['std'] = np.sqrt(variance)
+            statistics['rms'] = np.sqrt(variance + statistics['mean'] ** 2)
+            values = self.y_value[idx_start:idx_stop:-(-num_samples // MAX_PERCENTILE_SAMPLES)]
+            values = values[~np.isnan(values)]
+            if len(values) > 0:
+                for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                    statistics['p{:d}'.format(percentile)] = value
+
+        # Time steps [idx_start, idx_stop - 1) are between the samples in the range
+        duration = self.time[idx_stop - 1] - self.time[idx_start]
+        if num_samples > 1 and duration > 0:
+            statistics['slope'] = (self.y_value[idx_stop - 1] - self.y_value[idx_start]) / duration
+            statistics['rate [Hz]'] = (num_samples - 1) / duration
+            num_steps = num_samples - 1
+            mean_dt = (self._dt_sums[idx_stop - 1] - self._dt_sums[idx_start]) / num_steps
+            variance_dt = max((self._dt_square_sums[idx_stop - 1] - self._dt_square_sums[idx_start]) / num_steps - mean_dt * mean_dt, 0.0)
+            statistics['dt jitter [ms]'] = np.sqrt(variance_dt) * 1e3
+
+        return statistics
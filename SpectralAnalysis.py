@@ -0,0 +1,66 @@
+# Module: SpectralAnalysis.py
+
+import numpy as np
+# scipy is imported when the first spectrum is calculated, it is not needed to show the window
+
+# Number of samples per segment of the Welch PSD and of the spectrogram, segments overlap by half
+SEGMENT_SIZE = 1024
+# Minimum number of samples a spectrum is calculated from
+MIN_SPECTRUM_SAMPLES = 16
+# Maximum number of columns of the spectrogram, the segments of a column are averaged
+MAX_SPECTROGRAM_COLUMNS = 1000
+# Maximum deviation of the time steps from the median time step of samples that are used without resampling, as a
+# part of the median time step
+MAX_SAMPLING_JITTER = 0.05
+
+
+# Welch power spectral density and spectrogram of a field in a time range
+class Spectrum():
+    def __init__(self, frequencies, psd, column_times, column_duration, spectrogram, sample_rate, resampled):
+        # Frequencies of the PSD and of the rows of the spectrogram [Hz]
+        self.frequencies = frequencies
+        # Power spectral density averaged over all segments without nan samples [unit^2/Hz]
+        self.psd = psd
+        # Start times and duration of the columns of the spectrogram [s]
+        self.column_times = column_times
+        self.column_duration = column_duration
+        # Power spectral density of every column, an array of columns x frequencies, nan for columns without segments
+        self.spectrogram = spectrogram
+        self.sample_rate = sample_rate
+        # True if the samples were resampled at a fixed rate because their time steps were not uniform
+        self.resampled = resampled
+
+
+# Calculate the spectrum of uniformly sampled values starting at start_time. The segments are processed one column of
+# the spectrogram at a time, so the memory does not depend on the number of samples. Segments with nan samples are
+# left out. Returns None if is_cancelled returns True before the spectrum is complete
+def get_spectrum(y_value, sample_rate, start_time, segment_size=SEGMENT_SIZE, resampled=False, is_cancelled=None):
+    import scipy.signal
+
+    segment_size = min(segment_size, len(y_value))
+    step = segment_size // 2
+    num_segments = (len(y_value) - segment_size) // step + 1
+    segments_per_column = -(-num_segments // MAX_SPECTROGRAM_COLUMNS)
+    num_columns = -(-num_segments // segments_per_column)
+    frequencies = np.fft.rfftfreq(segment_size, 1 / sample_rate)
+    spectrogram = np.full((num_columns, len(frequencies)), np.nan)
+    psd_sum = np.zeros(len(frequencies))
+    num_psd_segments = 0
+    for column in range(num_columns):
+        if is_cancelled is not None and is_cancelled():
+            return None
+        first_segment = column * segments_per_column
+        stop_segment = min(first_segment + segments_per_column, num_segments)
+        chunk = y_value[first_segment * step:(stop_segment - 1) * step + segment_size]
+        _, _, psds = scipy.signal.spectrogram(chunk, sample_rate, window='hann', nperseg=segment_size, noverlap=segment_size - step,
+                                              detrend='constant', scaling='density', mode='psd')
+        finite = np.isfinite(psds).all(axis=0)
+        if finite.any():
+            spectrogram[column] = psds[:, finite].mean(axis=1)
+            psd_sum += psds[:, finite].sum(axis=1)
+            num_psd_segments += int(finite.sum())
+
+    psd = psd_sum / num_psd_segments if num_psd_segments > 0 else np.full(len(frequencies), np.nan)
+    column_duration = segments_per_column * step / sample_rate
+    column_times = start_time + np.arange(num_columns) * column_duration
+    return Spectrum(frequencies, psd, column_times, column_duration, spectrogram, sample_rate, resampled)
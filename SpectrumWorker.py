@@ -0,0 +1,42 @@
+# Module: SpectrumWorker.py
+
+from pyqtgraph.Qt import QtCore
+
+
+# Thread that calculates the spectra of fields in a time range, so the GUI does not block on long logfiles. The spectra
+# are cached in the graph data, fields whose spectrum was calculated before are done at once
+class SpectrumWorker(QtCore.QThread):
+    # Emitted with the topic and field name when the spectrum of a field is calculated
+    sigSpectrum = QtCore.Signal(str, str)
+    # Emitted when all spectra are calculated or the calculation was cancelled
+    sigDone = QtCore.Signal()
+
+    def __init__(self, graph_data, topic_and_fields, t0, t1, segment_size):
+        super(SpectrumWorker, self).__init__()
+        self.graph_data = graph_data
+        self.topic_and_fields = list(topic_and_fields)
+        self.t0 = t0
+        self.t1 = t1
+        self.segment_size = segment_size
+        # Dictionary of the calculated spectra by (topic name, field name)
+        self.spectra = {}
+        self._cancelled = False
+
+    # Stop the calculation after the current column of the current spectrogram
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        for topic_str, field_str in self.topic_and_fields:
+            if self._cancelled:
+                break
+            try:
+                spectrum = self.graph_data.get_spectrum(topic_str, field_str, self.t0, self.t1, self.segment_size, lambda: self._cancelled)
+            except Exception as ex:
+                print("ERROR: Failed to calculate the spectrum of " + topic_str + "->" + field_str + ": " + str(ex))
+                continue
+            if spectrum is not None:
+                self.spectra[(topic_str, field_str)] = spectrum
+                self.sigSpectrum.emit(topic_str, field_str)
+
+        self.sigDone.emit()
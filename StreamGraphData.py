@@ -0,0 +1,111 @@
+# Module: StreamGraphData.py
+
+from GraphData import *
+from ULogStream import *
+
+# Default number of samples of every topic that are kept from a stream
+STREAM_CAPACITY = 1 << 16
+
+
+# Graph data of a live uLog stream. Only the last capacity samples of every topic are kept in ring buffers, so the
+# memory is bounded however long the stream runs. The topics are accessed like those of a logfile, update reads the
+# messages received since the last update
+class StreamGraphData(GraphData):
+    def __init__(self, capacity=STREAM_CAPACITY):
+        super(StreamGraphData, self).__init__()
+        self.capacity = capacity
+        # Dictionary of the ring buffers of the topics
+        self._ring_buffers = {}
+
+    # Start reading a stream from a UDP socket (udp://host:port) or a named pipe
+    def open_stream(self, source_str):
+        self.df_dict.clear()
+        self._derived_fields = {}
+        self._min_max_pyramids = {}
+        self._range_statistics = {}
+        self._sorted_times = {}
+        self._resampled_fields.clear()
+        self._spectra.clear()
+        self._flag_changes = {}
+        self._event_index = None
+        self._time_offsets = {}
+        self._ring_buffers = {}
+        self._topic_fields = {}
+        self._topic_dtypes = {}
+        self._logfile_str = source_str
+        self.close()
+        self._ulog_index = ULogStream(source_str)
+
+        self.changed_parameters = self._ulog_index.changed_parameters
+        self.initial_parameters = self._ulog_index.initial_parameters
+        self.logged_messages = self._ulog_index.logged_messages
+        self.dropouts = self._ulog_index.dropouts
+        self.msg_info_dict = self._ulog_index.msg_info_dict
+        self.msg_info_multiple_dict = self._ulog_index.msg_info_multiple_dict
+        self.start_timestamp = 0
+        self.last_timestamp = 0
+        self.file_corrupt = False
+        self.data_list = []
+        self.forward_transition_lines = []
+        self.back_transition_lines = []
+        self._set_title()
+
+    # Allocated size of the ring buffers [bytes]
+    @property
+    def buffer_size(self):
+        return sum(ring_buffer.nbytes for ring_buffer in self._ring_buffers.values())
+
+    # Append the samples received since the last update to the ring buffers. Derived fields, pyramids and lookups of
+    # the updated topics are calculated again when they are accessed, their cost is bounded by the capacity. Returns
+    # the names of the topics with new samples
+    def update(self):
+        if self._ulog_index is None:
+            return []
+
+        with self.df_dict.lock:
+            new_data = self._ulog_index.read()
+            if len(new_data) == 0:
+                return []
+
+            new_topics = set(self._ulog_index.topics) - set(self._topic_fields)
+            if len(new_topics) > 0:
+                self._index_topic_fields(new_topics)
+                self.data_list = sorted(self._ulog_index.topics.values(), key=lambda d: d.name + str(d.multi_id))
+                self._set_title()
+            self.start_timestamp = self._ulog_index.start_timestamp
+            self.last_timestamp = self._ulog_index.last_timestamp
+            self.file_corrupt = self._ulog_index.file_corrupt
+
+            updated_topics = list(new_data)
+            for topic_str, rows in new_data.items():
+                ring_buffer = self._ring_buffers.get(topic_str)
+                # A topic that is subscribed again can have other fields
+                if ring_buffer is None or ring_buffer.column_names != [name for name, dtype in self._topic_dtypes[topic_str]]:
+                    ring_buffer = RingColumnBuffer(self.capacity, self._topic_dtypes[topic_str])
+                    self._ring_buffers[topic_str] = ring_buffer
+                ring_buffer.append(rows['timestamp'] / 1e6, {name: rows[name] for name in ring_buffer.column_names})
+                self.df_dict[topic_str] = ring_buffer.get_dataframe(ring_buffer.column_names)
+
+            import pandas as pd
+            for topic_str, source_topic_str in VIRTUAL_TOPICS.items():
+                if source_topic_str in new_data and topic_str in self._topic_fields:
+                    self.df_dict[topic_str] = pd.DataFrame(index=self.df_dict[source_topic_str].index)
+                    updated_topics.append(topic_str)
+
+            for topic_str, field_str in list(self._derived_fields):
+                derived_field = self._get_derived_fields(topic_str)[field_str]
+                input_topics = [input_field[0] for input_field in derived_field.input_fields + derived_field.optional_input_fields if isinstance(input_field, tuple)]
+                if topic_str in updated_topics or any(input_topic_str in updated_topics for input_topic_str in input_topics):
+                    del self._derived_fields[(topic_str, field_str)]
+            for key in list(self._min_max_pyramids):
+                if key[0] in updated_topics:
+                    del self._min_max_pyramids[key]
+            for topic_str in updated_topics:
+                self._sorted_times.pop(topic_str, None)
+                self._remove_cached_fields(topic_str)
+
+            if 'vehicle_status_0' in new_data:
+                self._get_transition_timestamps()
+            self._event_index = None
+
+            return updated_topics
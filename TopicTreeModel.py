@@ -0,0 +1,146 @@
+# Module: TopicTreeModel.py
+
+from pyqtgraph.Qt import QtCore, QtGui
+
+
+# Topic row of the TopicTreeModel, the field rows refer to it as their parent
+class TopicNode():
+    def __init__(self, topic_str, field_names):
+        self.topic_str = topic_str
+        self.field_names = field_names
+        # Names of the fields that are shown and the row of the topic while it is shown
+        self.shown_field_names = field_names
+        self.row = -1
+
+
+# Model of the topic tree, a topic row per topic with a row per field as children. The rows are served from the names
+# of the topics and fields, the view only asks for the rows it displays, so no object is created per field. Filtered
+# out fields and topics without shown fields have no rows. The topics and fields that are plotted are highlighted, their
+# state is set from the curve list instead of walking the tree
+class TopicTreeModel(QtCore.QAbstractItemModel):
+    def __init__(self, parent=None):
+        super(TopicTreeModel, self).__init__(parent)
+        # List of all topic nodes and of the shown topic nodes in the order of the rows
+        self._topics = []
+        self._shown_topics = []
+        # Dictionary of the rows of the shown topics by topic name
+        self._topic_rows = {}
+        # Dictionary of the plotted fields by topic name
+        self._plotted_fields = {}
+
+    # Replace the topics and fields, topic_fields is a list of (topic name, list of field names). All fields are shown
+    def set_topic_fields(self, topic_fields):
+        self._topics = [TopicNode(topic_str, list(field_names)) for topic_str, field_names in topic_fields]
+        self.set_shown_fields(None)
+
+    # Show the fields in field_mask, a boolean per field in the order of the topics and fields, all fields if it is
+    # None. The rows are replaced, so the view collapses all topics
+    def set_shown_fields(self, field_mask):
+        self.beginResetModel()
+        self._shown_topics = []
+        offset = 0
+        for topic in self._topics:
+            if field_mask is None:
+                topic.shown_field_names = topic.field_names
+            else:
+                topic_field_mask = field_mask[offset:offset + len(topic.field_names)]
+                offset += len(topic.field_names)
+                if not topic_field_mask.any():
+                    topic.row = -1
+                    continue
+                topic.shown_field_names = topic.field_names if topic_field_mask.all() else \
+                    [field_str for field_str, shown in zip(topic.field_names, topic_field_mask.tolist()) if shown]
+            topic.row = len(self._shown_topics)
+            self._shown_topics.append(topic)
+        self._topic_rows = {topic.topic_str: topic.row for topic in self._shown_topics}
+        self.endResetModel()
+
+    # Returns True if some fields of the topic are filtered out
+    def is_partially_shown(self, topic_str):
+        row = self._topic_rows.get(topic_str)
+        return row is not None and len(self._shown_topics[row].shown_field_names) < len(self._shown_topics[row].field_names)
+
+    # Set the plotted fields from a list of (topic name, field name), only the rows of topics whose state changes are
+    # updated
+    def set_plotted_fields(self, topic_and_fields):
+        plotted_fields = {}
+        for topic_str, field_str in topic_and_fields:
+            plotted_fields.setdefault(topic_str, set()).add(field_str)
+        changed_topics = [topic_str for topic_str in set(plotted_fields) | set(self._plotted_fields)
+                          if plotted_fields.get(topic_str) != self._plotted_fields.get(topic_str)]
+        self._plotted_fields = plotted_fields
+
+        for topic_str in changed_topics:
+            row = self._topic_rows.get(topic_str)
+            if row is None:
+                continue
+            topic_index = self.index(row, 0)
+            self.dataChanged.emit(topic_index, topic_index)
+            num_fields = len(self._shown_topics[row].shown_field_names)
+            if num_fields > 0:
+                self.dataChanged.emit(self.index(0, 0, topic_index), self.index(num_fields - 1, 0, topic_index))
+
+    # Returns the index of a topic row, an invalid index if the topic is not shown
+    def get_topic_index(self, topic_str):
+        row = self._topic_rows.get(topic_str)
+        if row is None:
+            return QtCore.QModelIndex()
+
+        return self.index(row, 0)
+
+    # Returns the (topic name, field name) of a row, the field name is None for a topic row
+    def get_topic_and_field(self, index):
+        topic = index.internalPointer()
+        if topic is None:
+            return self._shown_topics[index.row()].topic_str, None
+
+        return topic.topic_str, topic.shown_field_names[index.row()]
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QtCore.QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column)
+
+        return self.createIndex(row, column, self._shown_topics[parent.row()])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        topic = index.internalPointer()
+        if topic is None:
+            return QtCore.QModelIndex()
+
+        return self.createIndex(topic.row, 0)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return len(self._shown_topics)
+        if parent.internalPointer() is None:
+            return len(self._shown_topics[parent.row()].shown_field_names)
+
+        return 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        topic_str, field_str = self.get_topic_and_field(index)
+        if role == QtCore.Qt.DisplayRole:
+            return topic_str if field_str is None else field_str
+        if topic_str not in self._plotted_fields:
+            return None
+        # Topics with plotted fields are grey, plotted fields are displayed as selected
+        if field_str is None:
+            if role == QtCore.Qt.BackgroundRole:
+                return QtGui.QBrush(QtCore.Qt.gray)
+        elif field_str in self._plotted_fields[topic_str]:
+            if role == QtCore.Qt.BackgroundRole:
+                return QtGui.QApplication.palette().highlight()
+            if role == QtCore.Qt.ForegroundRole:
+                return QtGui.QApplication.palette().highlightedText()
+
+        return None
@@ -0,0 +1,482 @@
+# Module: ULogIndex.py
+
+from pyulog import ULog
+from array import array
+import concurrent.futures
+import copy
+import mmap
+import multiprocessing
+import os
+import struct
+import numpy as np
+from ColumnBuffer import append_to_buffer
+
+# Minimum size of the chunks of the data section that are scanned in parallel
+PARALLEL_MIN_CHUNK_SIZE = 1 << 24
+# Number of consecutive valid message headers needed to accept an offset as message boundary in a parallel scan
+MESSAGE_CHAIN_LENGTH = 32
+
+
+# Index of a uLog file. Only the message headers are read when the index is created, the data of a topic is decoded
+# from the memory mapped file the first time it is requested. The messages are parsed with the private message classes
+# of pyulog (ULog._MessageHeader, _MessageInfo, _MessageAddLogged, _MessageFlagBits) and its message type and sync
+# constants, which are not part of its public API and can change between releases. pyulog is pinned to a tested version
+# in requirements.txt
+class ULogIndex():
+    # Message types that may appear in the data section
+    _DATA_SECTION_TYPES = {ULog.MSG_TYPE_DATA, ULog.MSG_TYPE_INFO, ULog.MSG_TYPE_INFO_MULTIPLE, ULog.MSG_TYPE_PARAMETER,
+                           ULog.MSG_TYPE_PARAMETER_DEFAULT, ULog.MSG_TYPE_ADD_LOGGED_MSG, ULog.MSG_TYPE_REMOVE_LOGGED_MSG,
+                           ULog.MSG_TYPE_SYNC, ULog.MSG_TYPE_DROPOUT, ULog.MSG_TYPE_LOGGING, ULog.MSG_TYPE_LOGGING_TAGGED}
+
+    # With num_workers > 1 the data section of large logfiles is scanned in parallel, in executor or in a pool of
+    # worker processes that is created for the scan
+    def __init__(self, logfile_str, num_workers=1, executor=None):
+        self._init_attributes(logfile_str)
+        self._open_file()
+
+        # Offset of the first message after the definitions
+        self.data_start = self._read_file_header_and_definitions()
+        segment_ends = [offset for offset in self._appended_offsets if offset > self.data_start] + [len(self._mm)]
+        positions = array('q')
+        num_chunks = [min(num_workers, (segment_end - segment_start) // PARALLEL_MIN_CHUNK_SIZE)
+                      for segment_start, segment_end in zip([self.data_start] + segment_ends[:-1], segment_ends)]
+        if max(num_chunks) > 1 and executor is None:
+            with create_process_pool(num_workers) as executor:
+                self._scan_pos = self._scan_segments(self.data_start, segment_ends, num_chunks, positions, executor)
+        else:
+            self._scan_pos = self._scan_segments(self.data_start, segment_ends, num_chunks, positions, executor)
+        # Size of the file when it was last scanned
+        self._scan_end = len(self._mm)
+        self._index_messages(np.frombuffer(positions, dtype=np.int64))
+
+    def _init_attributes(self, logfile_str):
+        self.logfile_str = logfile_str
+        # Dictionary of message formats
+        self.message_formats = {}
+        # Dictionary of logged topics (topic name -> TopicIndex)
+        self.topics = {}
+        self.initial_parameters = {}
+        self.changed_parameters = []
+        self.logged_messages = []
+        self.dropouts = []
+        self.msg_info_dict = {}
+        self.msg_info_multiple_dict = {}
+        self.start_timestamp = 0
+        self.last_timestamp = 0
+        self.file_corrupt = False
+        self._appended_offsets = []
+        # Subscriptions by message id and the file offset of the add logged message
+        self._subscriptions = {}
+        # File offsets of messages that need a timestamp which is only known after the data is indexed
+        self._timestamped_messages = []
+        # Maximum timestamp of every topic so far, used to timestamp messages that are indexed later
+        self._max_timestamps = {}
+        # File offsets of the indexed messages that are not data messages
+        self._message_positions = np.empty(0, dtype=np.int64)
+
+    # Create an index from the state of a previously created index of the same file, without scanning the file
+    @classmethod
+    def from_state(cls, logfile_str, state):
+        ulog_index = cls.__new__(cls)
+        ulog_index.__dict__.update(state)
+        ulog_index.logfile_str = logfile_str
+        ulog_index._open_file()
+        return ulog_index
+
+    # Returns the index as a JSON compatible dictionary and a dictionary of arrays, which are stored in the log cache.
+    # Only the file offsets of the messages are stored, the messages are parsed again by from_metadata
+    def get_metadata(self):
+        metadata = {'topics': [[topic_name, topic.add_logged_pos] for topic_name, topic in self.topics.items()],
+                    'parameter_timestamps': [timestamp for timestamp, name, value in self.changed_parameters],
+                    'dropout_timestamps': [dropout.timestamp for dropout in self.dropouts],
+                    'last_timestamp': self.last_timestamp,
+                    'file_corrupt': self.file_corrupt,
+                    'max_timestamps': self._max_timestamps,
+                    'scan_pos': self._scan_pos,
+                    'scan_end': self._scan_end}
+        arrays = {'offsets.' + topic_name: topic.offsets for topic_name, topic in self.topics.items()}
+        arrays['message_positions'] = self._message_positions
+        return metadata, arrays
+
+    # Create an index from the metadata and arrays of get_metadata. The definitions and the messages that are not data
+    # messages are parsed from the file, the data section is not scanned
+    @classmethod
+    def from_metadata(cls, logfile_str, metadata, arrays):
+        ulog_index = cls.__new__(cls)
+        ulog_index._init_attributes(logfile_str)
+        ulog_index._open_file()
+        ulog_index.data_start = ulog_index._read_file_header_and_definitions()
+        ulog_index._index_other_messages(np.asarray(arrays['message_positions'], dtype=np.int64))
+        parameter_timestamps = iter(metadata['parameter_timestamps'])
+        dropout_timestamps = iter(metadata['dropout_timestamps'])
+        for pos, target_list, item in ulog_index._timestamped_messages:
+            if target_list is ulog_index.changed_parameters:
+                target_list.append((next(parameter_timestamps),) + item)
+            else:
+                item.timestamp = next(dropout_timestamps)
+                target_list.append(item)
+        ulog_index._timestamped_messages = []
+
+        header = ULog._MessageHeader()
+        for topic_name, add_logged_pos in metadata['topics']:
+            header.initialize(ulog_index._mm[add_logged_pos:add_logged_pos + 3])
+            data = ulog_index._mm[add_logged_pos + 3:add_logged_pos + 3 + header.msg_size]
+            msg_add_logged = ULog._MessageAddLogged(data, header, ulog_index.message_formats)
+            ulog_index.topics[topic_name] = TopicIndex(msg_add_logged, arrays['offsets.' + topic_name], add_logged_pos)
+        ulog_index.last_timestamp = metadata['last_timestamp']
+        ulog_index.file_corrupt = metadata['file_corrupt']
+        ulog_index._max_timestamps = metadata['max_timestamps']
+        ulog_index._scan_pos = metadata['scan_pos']
+        ulog_index._scan_end = metadata['scan_end']
+        return ulog_index
+
+    def _open_file(self):
+        self._file = open(self.logfile_str, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = np.frombuffer(self._mm, dtype=np.uint8)
+
+    def close(self):
+        self._buffer = None
+        self._mm.close()
+        self._file.close()
+
+    def _read_file_header_and_definitions(self):
+        header_data = self._mm[:16]
+        if len(header_data) != 16 or header_data[:7] != ULog.HEADER_BYTES:
+            raise TypeError("Invalid file format (Failed to parse header)")
+        self.start_timestamp, = struct.unpack('<Q', header_data[8:])
+
+        header = ULog._MessageHeader()
+        pos = 16
+        while pos + 3 <= len(self._mm):
+            header.initialize(self._mm[pos:pos + 3])
+            data = self._mm[pos + 3:pos + 3 + header.msg_size]
+            if header.msg_type == ULog.MSG_TYPE_INFO:
+                msg_info = ULog._MessageInfo(data, header)
+                self.msg_info_dict[msg_info.key] = msg_info.value
+            elif header.msg_type == ULog.MSG_TYPE_INFO_MULTIPLE:
+                self._add_message_info_multiple(ULog._MessageInfo(data, header, is_info_multiple=True))
+            elif header.msg_type == ULog.MSG_TYPE_FORMAT:
+                msg_format = ULog.MessageFormat(data, header)
+                self.message_formats[msg_format.name] = msg_format
+            elif header.msg_type == ULog.MSG_TYPE_PARAMETER:
+                msg_info = ULog._MessageInfo(data, header)
+                self.initial_parameters[msg_info.key] = msg_info.value
+            elif header.msg_type == ULog.MSG_TYPE_FLAG_BITS:
+                self._appended_offsets = ULog._MessageFlagBits(data, header).appended_offsets
+            elif header.msg_type in (ULog.MSG_TYPE_ADD_LOGGED_MSG, ULog.MSG_TYPE_LOGGING, ULog.MSG_TYPE_LOGGING_TAGGED):
+                break
+            pos += 3 + header.msg_size
+
+        return pos
+
+    def _add_message_info_multiple(self, msg_info):
+        if msg_info.key in self.msg_info_multiple_dict:
+            if msg_info.is_continued:
+                self.msg_info_multiple_dict[msg_info.key][-1].append(msg_info.value)
+            else:
+                self.msg_info_multiple_dict[msg_info.key].append([msg_info.value])
+        else:
+            self.msg_info_multiple_dict[msg_info.key] = [[msg_info.value]]
+
+    # Returns the offset where the scan of the last segment stopped
+    def _scan_segments(self, data_start, segment_ends, num_chunks, positions, executor):
+        for segment_end, segment_num_chunks in zip(segment_ends, num_chunks):
+            if segment_num_chunks > 1:
+                pos = self._scan_messages_parallel(data_start, segment_end, positions, executor, segment_num_chunks)
+            else:
+                pos = self._scan_messages(data_start, segment_end, positions)
+            data_start = segment_end
+
+        return pos
+
+    # Index the messages that were written to the file since it was indexed, e.g. while it is still being logged. The
+    # scan continues after the last complete message. Returns the number of data messages that every topic with new
+    # messages had before the update, 0 for new topics and for topics that are replaced by a new subscription
+    def update(self):
+        if os.path.getsize(self.logfile_str) <= self._scan_end:
+            return {}
+
+        # The previous memory map stays valid as long as topics decoded in other threads use it, it does not need its
+        # file object
+        previous_file = self._file
+        self._open_file()
+        previous_file.close()
+        positions = array('q')
+        self._scan_pos = self._scan_messages(self._scan_pos, len(self._mm), positions)
+        self._scan_end = len(self._mm)
+        return self._index_messages(np.frombuffer(positions, dtype=np.int64))
+
+    # Collect the file offset of every message in [pos, end) that starts before stop. Returns the offset where the scan
+    # stopped
+    def _scan_messages(self, pos, end, positions, stop=None):
+        pos, corrupt_pos = scan_messages(self._mm, pos, end, positions, stop)
+        self.file_corrupt = self.file_corrupt or corrupt_pos >= 0
+        return pos
+
+    # Scan [pos, end) in chunks, all chunks but the first are scanned by the worker processes. A worker starts at the
+    # first offset of its chunk that looks like a message boundary. The scan from an offset only depends on the offset,
+    # so the result of a worker is used from the offset where the scan of the previous chunk stopped if the worker
+    # reached it too. Otherwise the chunk is scanned again from there. The collected offsets are therefore always the
+    # same as those of a serial scan
+    def _scan_messages_parallel(self, pos, end, positions, executor, num_chunks):
+        chunk_bounds = np.linspace(pos, end, num_chunks + 1).astype(np.int64).tolist()
+        futures = [executor.submit(_scan_chunk, self.logfile_str, start, stop, end)
+                   for start, stop in zip(chunk_bounds[1:-1], chunk_bounds[2:])]
+        pos = self._scan_messages(pos, end, positions, chunk_bounds[1])
+        for stop, future in zip(chunk_bounds[2:], futures):
+            if pos + 3 > end:
+                future.cancel()
+                continue
+            chunk_positions, chunk_pos, corrupt_pos = future.result()
+            idx = int(np.searchsorted(np.frombuffer(chunk_positions, dtype=np.int64), pos))
+            if pos == chunk_pos or (idx < len(chunk_positions) and chunk_positions[idx] == pos):
+                positions.extend(chunk_positions[idx:])
+                self.file_corrupt = self.file_corrupt or corrupt_pos >= pos
+                pos = chunk_pos
+            else:
+                pos = self._scan_messages(pos, end, positions, stop)
+
+        return pos
+
+    # Handle the messages at positions that are not data messages
+    def _index_other_messages(self, positions):
+        self._message_positions = np.concatenate([self._message_positions, positions])
+        header = ULog._MessageHeader()
+        for pos in positions.tolist():
+            header.initialize(self._mm[pos:pos + 3])
+            data = self._mm[pos + 3:pos + 3 + header.msg_size]
+            if header.msg_type == ULog.MSG_TYPE_ADD_LOGGED_MSG:
+                msg_add_logged = ULog._MessageAddLogged(data, header, self.message_formats)
+                self._subscriptions[msg_add_logged.msg_id] = (msg_add_logged, pos)
+            elif header.msg_type == ULog.MSG_TYPE_PARAMETER:
+                msg_info = ULog._MessageInfo(data, header)
+                self._timestamped_messages.append((pos, self.changed_parameters, (msg_info.key, msg_info.value)))
+            elif header.msg_type == ULog.MSG_TYPE_DROPOUT:
+                self._timestamped_messages.append((pos, self.dropouts, ULog.MessageDropout(data, header, 0)))
+            elif header.msg_type == ULog.MSG_TYPE_LOGGING:
+                self.logged_messages.append(ULog.MessageLogging(data, header))
+            elif header.msg_type == ULog.MSG_TYPE_INFO:
+                msg_info = ULog._MessageInfo(data, header)
+                self.msg_info_dict[msg_info.key] = msg_info.value
+            elif header.msg_type == ULog.MSG_TYPE_INFO_MULTIPLE:
+                self._add_message_info_multiple(ULog._MessageInfo(data, header, is_info_multiple=True))
+
+    # Split the collected offsets into data messages per topic and handle all other message types. Returns the number
+    # of data messages of every topic with new messages before they were added
+    def _index_messages(self, positions):
+        msg_types = self._buffer[positions + 2]
+        is_data = msg_types == ULog.MSG_TYPE_DATA
+        self._index_other_messages(positions[~is_data])
+
+        data_positions = positions[is_data]
+        msg_sizes = self._buffer[data_positions].astype(np.int64) | (self._buffer[data_positions + 1].astype(np.int64) << 8)
+        msg_ids = self._buffer[data_positions + 3].astype(np.int64) | (self._buffer[data_positions + 4].astype(np.int64) << 8)
+        num_old_data_points = {}
+        new_offsets = {}
+        for msg_id, (msg_add_logged, add_logged_pos) in self._subscriptions.items():
+            data_size = msg_sizes - 2
+            # Drop messages logged before the subscription and messages with a corrupt size
+            mask = (msg_ids == msg_id) & (data_positions > add_logged_pos) & \
+                   (data_size >= msg_add_logged.dtype.itemsize) & (data_size <= msg_add_logged.max_data_size)
+            if not mask.any():
+                continue
+            topic = TopicIndex(msg_add_logged, data_positions[mask], add_logged_pos)
+            old_topic = self.topics.get(topic.topic_name)
+            if old_topic is not None and old_topic.msg_id == msg_id:
+                num_old_data_points.setdefault(topic.topic_name, old_topic.num_data_points)
+                old_topic.append_offsets(topic.offsets)
+            elif old_topic is None or self._subscriptions[old_topic.msg_id][1] < add_logged_pos:
+                # A later subscription of the same topic replaces the earlier one
+                num_old_data_points[topic.topic_name] = 0
+                self.topics[topic.topic_name] = topic
+            else:
+                continue
+            new_offsets[topic.topic_name] = topic.offsets
+
+        self._set_message_timestamps(new_offsets)
+        return num_old_data_points
+
+    # Changed parameters and dropouts are timestamped with the latest data timestamp logged before them. Only the
+    # timestamps of the newly indexed data messages new_offsets (topic name -> file offsets) are read
+    def _set_message_timestamps(self, new_offsets):
+        previous_max_timestamps = dict(self._max_timestamps)
+        running_max = {}
+        for topic_name, offsets in new_offsets.items():
+            topic = self.topics[topic_name]
+            timestamps = self._gather(offsets + 5 + topic.timestamp_offset, np.dtype('<u8'))
+            if len(timestamps) > 0:
+                if topic_name in previous_max_timestamps and len(offsets) < topic.num_data_points:
+                    timestamps[0] = max(timestamps[0], previous_max_timestamps[topic_name])
+                running_max[topic_name] = (offsets, np.maximum.accumulate(timestamps))
+                self._max_timestamps[topic_name] = int(running_max[topic_name][1][-1])
+                self.last_timestamp = max(self.last_timestamp, self._max_timestamps[topic_name])
+
+        for pos, target_list, item in self._timestamped_messages:
+            timestamp = self.start_timestamp
+            for topic_name, max_timestamp in previous_max_timestamps.items():
+                if topic_name in self.topics and (topic_name not in running_max or len(running_max[topic_name][0]) < self.topics[topic_name].num_data_points):
+                    timestamp = max(timestamp, max_timestamp)
+            for topic_name, (offsets, timestamps) in running_max.items():
+                idx = np.searchsorted(offsets, pos) - 1
+                if idx >= 0:
+                    timestamp = max(timestamp, int(timestamps[idx]))
+            if target_list is self.changed_parameters:
+                target_list.append((timestamp,) + item)
+            else:
+                item.timestamp = timestamp
+                target_list.append(item)
+        self._timestamped_messages = []
+
+    # Return the raw timestamps of a topic without decoding the other fields
+    def get_timestamps(self, topic_name):
+        topic = self.topics[topic_name]
+        return self._gather(topic.offsets + 5 + topic.timestamp_offset, np.dtype('<u8'))
+
+    # Decode all messages of a topic into a structured array
+    def decode(self, topic_name):
+        topic = self.topics[topic_name]
+        return self._gather(topic.offsets + 5, topic.dtype)
+
+    # Decode all messages of a topic into separate column arrays, e.g. views of a memory mapped file. Only the fields
+    # in columns are decoded. The timestamps are written to time_column in seconds. With start > 0 only the messages
+    # from start on are decoded, e.g. messages appended since the topic was decoded
+    def decode_into(self, topic_name, columns, time_column=None, start=0):
+        topic = self.topics[topic_name]
+        for row, chunk in self._gather_chunks(topic.offsets[start:] + 5, topic.dtype):
+            for name, column in columns.items():
+                column[row:row + len(chunk)] = chunk[name]
+            if time_column is not None:
+                time_column[row:row + len(chunk)] = chunk['timestamp'] / 1e6
+
+    def _gather(self, payload_offsets, dtype):
+        out = np.empty(len(payload_offsets), dtype=dtype)
+        for start, chunk in self._gather_chunks(payload_offsets, dtype):
+            out[start:start + len(chunk)] = chunk
+
+        return out
+
+    # Copy the messages in chunks to keep the index array and the chunk small
+    def _gather_chunks(self, payload_offsets, dtype):
+        itemsize = dtype.itemsize
+        byte_range = np.arange(itemsize)
+        chunk_size = max(1, (1 << 22) // itemsize)
+        for start in range(0, len(payload_offsets), chunk_size):
+            chunk_offsets = payload_offsets[start:start + chunk_size]
+            yield start, self._buffer[chunk_offsets[:, None] + byte_range].view(dtype).ravel()
+
+
+# Collect the file offset of every message in buf[pos:end] that starts before stop. Only the three header bytes of each
+# message are read. Returns the offset where the scan stopped, which is the start of the first incomplete message at the
+# end, or end if no message can follow, and the offset of the last corrupt message that was skipped, -1 if there is none
+def scan_messages(buf, pos, end, positions, stop=None):
+    if stop is None:
+        stop = end
+    append = positions.append
+    data_section_types = ULogIndex._DATA_SECTION_TYPES
+    corrupt_pos = -1
+    while pos + 3 <= end and pos < stop:
+        msg_size = buf[pos] | (buf[pos + 1] << 8)
+        if buf[pos + 2] not in data_section_types:
+            # Unknown message type, try to recover at the next sync sequence
+            corrupt_pos = pos
+            pos = buf.find(ULog.SYNC_BYTES, pos + 1, end)
+            if pos < 0:
+                return end, corrupt_pos
+            pos += len(ULog.SYNC_BYTES)
+            continue
+        if pos + 3 + msg_size > end:
+            break
+        append(pos)
+        pos += 3 + msg_size
+
+    return pos, corrupt_pos
+
+
+# Returns the first offset in [start, stop) that is followed by a chain of valid message headers, stop if there is none.
+# The offset may still be inside the payload of a message, this is detected when the chunks are merged
+def find_message_boundary(buf, start, stop, end):
+    data_section_types = ULogIndex._DATA_SECTION_TYPES
+    for candidate in range(start, stop):
+        pos = candidate
+        for _ in range(MESSAGE_CHAIN_LENGTH):
+            if pos == end:
+                return candidate
+            if pos + 3 > end or buf[pos + 2] not in data_section_types:
+                break
+            if buf[pos + 2] == ULog.MSG_TYPE_SYNC and buf[pos + 3:pos + 3 + len(ULog.SYNC_BYTES)] != ULog.SYNC_BYTES:
+                break
+            pos += 3 + (buf[pos] | (buf[pos + 1] << 8))
+            if pos > end:
+                break
+        else:
+            return candidate
+
+    return stop
+
+
+# Scan a chunk [start, stop) of the data section that ends at end, run in a worker process. Returns the same as
+# scan_messages with the collected offsets first
+def _scan_chunk(logfile_str, start, stop, end):
+    with open(logfile_str, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            positions = array('q')
+            pos, corrupt_pos = scan_messages(mm, find_message_boundary(mm, start, stop, end), end, positions, stop)
+        finally:
+            mm.close()
+
+    return positions, pos, corrupt_pos
+
+
+# Pool of worker processes for the parallel scan and decode. The workers are spawned instead of forked since logfiles
+# are also opened in a background thread of the GUI
+def create_process_pool(num_workers):
+    return concurrent.futures.ProcessPoolExecutor(num_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+# Topic entry of the ULogIndex
+class TopicIndex():
+    def __init__(self, msg_add_logged, offsets, add_logged_pos):
+        self.name = msg_add_logged.message_name
+        self.multi_id = msg_add_logged.multi_id
+        self.msg_id = msg_add_logged.msg_id
+        self.topic_name = self.name + "_" + str(self.multi_id)
+        self.field_data = msg_add_logged.field_data
+        self.dtype = msg_add_logged.dtype
+        self.timestamp_offset = msg_add_logged.timestamp_offset
+        # File offset of the add logged message of the subscription
+        self.add_logged_pos = add_logged_pos
+        # File offsets of the data messages of this topic, a view of a buffer that new offsets can be appended to
+        self.offsets = offsets
+        self._offsets_buffer = offsets
+
+    @property
+    def field_names(self):
+        return [field.field_name for field in self.field_data]
+
+    @property
+    def num_data_points(self):
+        return len(self.offsets)
+
+    # The buffer is not stored, it is recreated when offsets are appended
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_offsets_buffer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._offsets_buffer = self.offsets
+
+    # Add the offsets of data messages that were logged after the indexed ones
+    def append_offsets(self, offsets):
+        length = len(self.offsets)
+        self._offsets_buffer = append_to_buffer(self._offsets_buffer, length, offsets)
+        self.offsets = self._offsets_buffer[:length + len(offsets)]
+
+    # Returns a copy of the entry with only the data messages [start, stop), e.g. to decode a topic in parts
+    def get_rows(self, start, stop):
+        topic = copy.copy(self)
+        topic.offsets = self.offsets[start:stop]
+        return topic
@@ -0,0 +1,263 @@
+# Module: ULogStream.py
+
+from pyulog import ULog
+from array import array
+import os
+import socket
+import stat
+import struct
+import numpy as np
+from ULogIndex import *
+
+# Receive buffer of the UDP socket, large enough for the messages of several refreshes at a high replay speed [bytes]
+UDP_RECEIVE_BUFFER_SIZE = 1 << 23
+# Maximum size of a UDP datagram [bytes]
+UDP_MAX_DATAGRAM_SIZE = 65507
+# Message types of the definitions section that are not in the data section
+DEFINITION_TYPES = {ULog.MSG_TYPE_FORMAT, ULog.MSG_TYPE_FLAG_BITS}
+
+
+# Returns the (host, port) of a udp://host:port source, None if the source is not a UDP address
+def get_udp_address(source_str):
+    if not source_str.startswith('udp://'):
+        return None
+
+    host, _, port = source_str[len('udp://'):].rpartition(':')
+    return host or '0.0.0.0', int(port)
+
+
+# Reader of a uLog stream, e.g. from a vehicle or ulog_replay.py. The stream is read from a UDP socket (udp://host:port)
+# or a named pipe. Through a named pipe the stream is the content of a logfile. Over UDP every datagram contains
+# complete messages, datagrams that start with the file header contain definitions and are sent repeatedly so the
+# stream can be joined at any time. The data messages are decoded when they are read and not kept in the stream, it has
+# the same attributes as a ULogIndex otherwise. Like ULogIndex it parses the messages with the private message classes of
+# pyulog
+class ULogStream():
+    def __init__(self, source_str):
+        self.source_str = source_str
+        # Dictionary of message formats
+        self.message_formats = {}
+        # Dictionary of subscribed topics (topic name -> StreamTopic)
+        self.topics = {}
+        self.initial_parameters = {}
+        self.changed_parameters = []
+        self.logged_messages = []
+        self.dropouts = []
+        self.msg_info_dict = {}
+        self.msg_info_multiple_dict = {}
+        self.start_timestamp = 0
+        self.last_timestamp = 0
+        self.file_corrupt = False
+        # Subscriptions by message id
+        self._subscriptions = {}
+        # True once the file header is read and after the first data message, the definitions are then complete
+        self._header_read = False
+        self._definitions_read = False
+        # Start of a message that is not received completely
+        self._remainder = b''
+
+        udp_address = get_udp_address(source_str)
+        if udp_address is not None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER_SIZE)
+            self._socket.bind(udp_address)
+            self._socket.setblocking(False)
+            self._pipe = None
+        else:
+            if not os.path.exists(source_str):
+                os.mkfifo(source_str)
+            elif not stat.S_ISFIFO(os.stat(source_str).st_mode):
+                raise TypeError(source_str + " is not a named pipe or udp://host:port")
+            # The pipe is opened without waiting for a writer
+            self._pipe = os.open(source_str, os.O_RDONLY | os.O_NONBLOCK)
+            self._socket = None
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+        if self._pipe is not None:
+            os.close(self._pipe)
+
+    # Read the messages received since the last call. Returns the new data of every topic (topic name -> structured
+    # array of the messages)
+    def read(self):
+        new_data = {}
+        if self._socket is not None:
+            # Datagrams contain complete messages, consecutive data datagrams are read at once
+            datagrams = []
+            while True:
+                try:
+                    datagram = self._socket.recv(UDP_MAX_DATAGRAM_SIZE)
+                except BlockingIOError:
+                    break
+                if datagram[:len(ULog.HEADER_BYTES)] == ULog.HEADER_BYTES:
+                    if len(datagrams) > 0:
+                        self._read_data(b''.join(datagrams), 0, new_data)
+                        datagrams = []
+                    self._read_definitions(datagram)
+                else:
+                    self._definitions_read = True
+                    datagrams.append(datagram)
+            if len(datagrams) > 0:
+                self._read_data(b''.join(datagrams), 0, new_data)
+        else:
+            chunks = [self._remainder]
+            while True:
+                try:
+                    chunk = os.read(self._pipe, 1 << 20)
+                except BlockingIOError:
+                    break
+                if len(chunk) == 0:
+                    break
+                chunks.append(chunk)
+            buf = b''.join(chunks)
+            pos = 0
+            if not self._definitions_read:
+                pos = self._read_definitions(buf)
+            if self._definitions_read:
+                pos = self._read_data(buf, pos, new_data)
+            self._remainder = buf[pos:]
+
+        return {topic_name: np.concatenate(data) for topic_name, data in new_data.items()}
+
+    # Read the file header and the definitions in buf until the first message of the data section. Returns the offset
+    # of the first message that was not read
+    def _read_definitions(self, buf):
+        pos = 0
+        if not self._header_read or buf[:len(ULog.HEADER_BYTES)] == ULog.HEADER_BYTES:
+            if len(buf) < 16:
+                return 0
+            if buf[:len(ULog.HEADER_BYTES)] != ULog.HEADER_BYTES:
+                raise TypeError("Invalid stream format (Failed to parse header)")
+            self.start_timestamp, = struct.unpack('<Q', buf[8:16])
+            self._header_read = True
+            pos = 16
+
+        header = ULog._MessageHeader()
+        while pos + 3 <= len(buf):
+            header.initialize(buf[pos:pos + 3])
+            if pos + 3 + header.msg_size > len(buf):
+                break
+            data = buf[pos + 3:pos + 3 + header.msg_size]
+            if header.msg_type == ULog.MSG_TYPE_FORMAT:
+                msg_format = ULog.MessageFormat(data, header)
+                self.message_formats[msg_format.name] = msg_format
+            elif header.msg_type == ULog.MSG_TYPE_INFO:
+                msg_info = ULog._MessageInfo(data, header)
+                self.msg_info_dict[msg_info.key] = msg_info.value
+            elif header.msg_type == ULog.MSG_TYPE_INFO_MULTIPLE:
+                # Definitions that are sent again do not add to the multiple info messages
+                if not self._definitions_read:
+                    self._add_message_info_multiple(ULog._MessageInfo(data, header, is_info_multiple=True))
+            elif header.msg_type == ULog.MSG_TYPE_PARAMETER:
+                msg_info = ULog._MessageInfo(data, header)
+                self.initial_parameters[msg_info.key] = msg_info.value
+            elif header.msg_type == ULog.MSG_TYPE_ADD_LOGGED_MSG:
+                self._add_subscription(ULog._MessageAddLogged(data, header, self.message_formats))
+            elif header.msg_type not in DEFINITION_TYPES:
+                # Start of the data section
+                self._definitions_read = True
+                break
+            pos += 3 + header.msg_size
+
+        return pos
+
+    # Subscriptions that are sent again are ignored, a new subscription with the same message id replaces the topic
+    def _add_subscription(self, msg_add_logged):
+        topic = StreamTopic(msg_add_logged)
+        subscription = self._subscriptions.get(msg_add_logged.msg_id)
+        if subscription is not None and subscription.topic_name == topic.topic_name:
+            return
+
+        self._subscriptions[msg_add_logged.msg_id] = topic
+        self.topics[topic.topic_name] = topic
+
+    # Read the messages of the data section in buf from pos on and add the decoded data messages to new_data (topic
+    # name -> list of structured arrays). Returns the offset of the first incomplete message
+    def _read_data(self, buf, pos, new_data):
+        positions = array('q')
+        pos, corrupt_pos = scan_messages(buf, pos, len(buf), positions)
+        self.file_corrupt = self.file_corrupt or corrupt_pos >= 0
+        positions = np.frombuffer(positions, dtype=np.int64)
+        if len(positions) == 0:
+            return pos
+
+        buffer = np.frombuffer(buf, dtype=np.uint8)
+        is_data = buffer[positions + 2] == ULog.MSG_TYPE_DATA
+        header = ULog._MessageHeader()
+        timestamped_messages = []
+        subscription_positions = {}
+        for msg_pos in positions[~is_data].tolist():
+            header.initialize(buf[msg_pos:msg_pos + 3])
+            data = buf[msg_pos + 3:msg_pos + 3 + header.msg_size]
+            if header.msg_type == ULog.MSG_TYPE_ADD_LOGGED_MSG:
+                msg_add_logged = ULog._MessageAddLogged(data, header, self.message_formats)
+                self._add_subscription(msg_add_logged)
+                subscription_positions[msg_add_logged.msg_id] = msg_pos
+            elif header.msg_type == ULog.MSG_TYPE_PARAMETER:
+                msg_info = ULog._MessageInfo(data, header)
+                timestamped_messages.append((msg_pos, self.changed_parameters, (msg_info.key, msg_info.value)))
+            elif header.msg_type == ULog.MSG_TYPE_DROPOUT:
+                timestamped_messages.append((msg_pos, self.dropouts, ULog.MessageDropout(data, header, 0)))
+            elif header.msg_type == ULog.MSG_TYPE_LOGGING:
+                self.logged_messages.append(ULog.MessageLogging(data, header))
+            elif header.msg_type == ULog.MSG_TYPE_INFO:
+                msg_info = ULog._MessageInfo(data, header)
+                self.msg_info_dict[msg_info.key] = msg_info.value
+            elif header.msg_type == ULog.MSG_TYPE_INFO_MULTIPLE:
+                self._add_message_info_multiple(ULog._MessageInfo(data, header, is_info_multiple=True))
+
+        # The data messages of all subscribed topics are decoded at once per topic
+        data_positions = positions[is_data]
+        msg_sizes = buffer[data_positions].astype(np.int64) | (buffer[data_positions + 1].astype(np.int64) << 8)
+        msg_ids = buffer[data_positions + 3].astype(np.int64) | (buffer[data_positions + 4].astype(np.int64) << 8)
+        timestamps = np.zeros(len(data_positions), dtype=np.uint64)
+        for msg_id, topic in self._subscriptions.items():
+            data_size = msg_sizes - 2
+            # Drop messages received before the subscription and messages with a corrupt size
+            mask = (msg_ids == msg_id) & (data_positions > subscription_positions.get(msg_id, -1)) & \
+                   (data_size >= topic.dtype.itemsize) & (data_size <= topic.max_data_size)
+            if not mask.any():
+                continue
+            payload_offsets = data_positions[mask] + 5
+            rows = buffer[payload_offsets[:, None] + np.arange(topic.dtype.itemsize)].view(topic.dtype).ravel()
+            timestamps[mask] = rows['timestamp']
+            topic.num_received += len(rows)
+            new_data.setdefault(topic.topic_name, []).append(rows)
+
+        # Changed parameters and dropouts are timestamped with the latest data timestamp received before them
+        running_max = np.maximum.accumulate(np.maximum(timestamps, self.last_timestamp))
+        for msg_pos, target_list, item in timestamped_messages:
+            idx = np.searchsorted(data_positions, msg_pos) - 1
+            timestamp = int(running_max[idx]) if idx >= 0 else self.last_timestamp
+            if target_list is self.changed_parameters:
+                target_list.append((timestamp,) + item)
+            else:
+                item.timestamp = timestamp
+                target_list.append(item)
+        if len(running_max) > 0:
+            self.last_timestamp = int(running_max[-1])
+
+        return pos
+
+    def _add_message_info_multiple(self, msg_info):
+        if msg_info.key in self.msg_info_multiple_dict:
+            if msg_info.is_continued:
+                self.msg_info_multiple_dict[msg_info.key][-1].append(msg_info.value)
+            else:
+                self.msg_info_multiple_dict[msg_info.key].append([msg_info.value])
+        else:
+            self.msg_info_multiple_dict[msg_info.key] = [[msg_info.value]]
+
+
+# Topic entry of the ULogStream, its data messages are only counted. Its messages are not in a file, so it has no file
+# offsets
+class StreamTopic(TopicIndex):
+    def __init__(self, msg_add_logged):
+        super(StreamTopic, self).__init__(msg_add_logged, np.empty(0, dtype=np.int64), -1)
+        self.max_data_size = msg_add_logged.max_data_size
+        self.num_received = 0
+
+    @property
+    def num_data_points(self):
+        return self.num_received
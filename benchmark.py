@@ -0,0 +1,910 @@
+# Benchmarks of the performance critical parts of ulog_explorer
+# Run with: python3 benchmark.py <benchmark> [options], see python3 benchmark.py -h
+
+import argparse
+import os
+import time
+import numpy as np
+
+
+# Returns the time and values of a field from a logfile, or a synthetic high rate signal with spikes and nans
+def get_test_curve(args):
+    if args.logfile is not None:
+        from GraphData import GraphData
+        graph_data = GraphData()
+        graph_data.ulog_to_df(args.logfile, lazy=True)
+        field = graph_data.get_field(args.topic, args.field)
+        return field.index.values, field.values
+
+    num_samples = int(args.rate * args.duration)
+    time_s = np.arange(num_samples) / args.rate
+    rng = np.random.default_rng(0)
+    y_value = (np.sin(time_s) + rng.normal(0, 0.1, num_samples)).astype(np.float32)
+    y_value[rng.integers(0, num_samples, 20)] = 5
+    y_value[num_samples // 3:num_samples // 3 + int(args.rate)] = np.nan
+    return time_s, y_value
+
+
+def print_frame_times(name, frame_times):
+    frame_times = np.array(frame_times) * 1e3
+    print("{:<28} mean: {:8.2f} ms, median: {:8.2f} ms, max: {:8.2f} ms".format(name, np.mean(frame_times), np.median(frame_times), np.max(frame_times)))
+
+
+# Zoom in towards the middle of the curve and pan, returns the list of visible x ranges
+def get_view_ranges(time_s, num_frames):
+    t_min, t_max = time_s[0], time_s[-1]
+    view_ranges = []
+    for zoom in np.geomspace(1, 1e-4, num_frames // 2):
+        half_width = (t_max - t_min) * zoom / 2
+        view_ranges.append(((t_min + t_max) / 2 - half_width, (t_min + t_max) / 2 + half_width))
+    for center in np.linspace(t_min, t_max, num_frames - len(view_ranges)):
+        half_width = (t_max - t_min) * 0.05
+        view_ranges.append((center - half_width, center + half_width))
+
+    return view_ranges
+
+
+def benchmark_level_of_detail(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import pyqtgraph as pg
+    from LevelOfDetail import MinMaxPyramid
+
+    app = pg.mkQApp()
+    time_s, y_value = get_test_curve(args)
+    view_ranges = get_view_ranges(time_s, args.frames)
+    print("Samples: {:d}, frames: {:d}, width: {:d} px".format(len(time_s), len(view_ranges), args.width))
+
+    def render(widget, update):
+        frame_times = []
+        for x_min, x_max in view_ranges:
+            start = time.perf_counter()
+            widget.setXRange(x_min, x_max, padding=0)
+            update()
+            app.processEvents()
+            widget.grab()
+            frame_times.append(time.perf_counter() - start)
+        return frame_times
+
+    # Current path, all samples are passed to the plot
+    widget = pg.PlotWidget()
+    widget.resize(args.width, 600)
+    widget.show()
+    start = time.perf_counter()
+    widget.plot(time_s, y_value)
+    print("{:<28} {:8.2f} ms".format('full resolution: plot', (time.perf_counter() - start) * 1e3))
+    print_frame_times('full resolution: frames', render(widget, lambda: None))
+    widget.close()
+
+    # Level of detail path, only the samples needed for the visible pixel width are passed to the plot
+    widget = pg.PlotWidget()
+    widget.resize(args.width, 600)
+    widget.show()
+    start = time.perf_counter()
+    pyramid = MinMaxPyramid(time_s, y_value)
+    print("{:<28} {:8.2f} ms".format('level of detail: pyramid', (time.perf_counter() - start) * 1e3))
+    curve = widget.plot(*pyramid.get_curve(time_s[0], time_s[-1], args.width))
+
+    def update():
+        x_range = widget.viewRange()[0]
+        curve.setData(*pyramid.get_curve(x_range[0], x_range[1], widget.getViewBox().width()))
+    print_frame_times('level of detail: frames', render(widget, update))
+    widget.close()
+
+
+def benchmark_nan_markers(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import pyqtgraph as pg
+    from LevelOfDetail import NanRuns
+
+    app = pg.mkQApp()
+    num_samples = int(args.rate * args.duration)
+    time_s = np.arange(num_samples) / args.rate
+    rng = np.random.default_rng(0)
+    y_value = rng.normal(size=num_samples).astype(np.float32)
+    # A dropout and short gaps of a few samples
+    y_value[num_samples // 3:num_samples // 3 + int(args.dropout * args.rate)] = np.nan
+    for start in rng.integers(0, num_samples - 10, args.gaps).tolist():
+        y_value[start:start + rng.integers(1, 10)] = np.nan
+    view_ranges = get_view_ranges(time_s, args.frames)
+    print("Samples: {:d}, nan samples: {:d}, frames: {:d}".format(num_samples, int(np.isnan(y_value).sum()), len(view_ranges)))
+
+    def render(widget, update):
+        frame_times = []
+        for x_min, x_max in view_ranges:
+            start = time.perf_counter()
+            widget.setXRange(x_min, x_max, padding=0)
+            update()
+            app.processEvents()
+            widget.grab()
+            frame_times.append(time.perf_counter() - start)
+        return frame_times
+
+    # Previous path, a marker at every nan sample
+    widget = pg.PlotWidget()
+    widget.resize(args.width, 600)
+    widget.show()
+    start = time.perf_counter()
+    if np.isnan(y_value).any():
+        time_of_nans = time_s[np.isnan(y_value)]
+        widget.plot(time_of_nans, 0 * time_of_nans, symbol='t', symbolSize=20)
+    print("{:<28} {:8.2f} ms".format('nan samples: plot', (time.perf_counter() - start) * 1e3))
+    print_frame_times('nan samples: frames', render(widget, lambda: None))
+    widget.close()
+
+    # Markers at the start and end of the visible runs
+    widget = pg.PlotWidget()
+    widget.resize(args.width, 600)
+    widget.show()
+    start = time.perf_counter()
+    nan_runs = NanRuns()
+    nan_runs.extend(y_value)
+    nan_curve = widget.plot(connect='pairs', symbol='t', symbolSize=20)
+    print("{:<28} {:8.2f} ms, {:d} runs".format('nan runs: plot', (time.perf_counter() - start) * 1e3, len(nan_runs)))
+
+    def update():
+        x_range = widget.viewRange()[0]
+        time_of_nans = nan_runs.get_markers(time_s, x_range[0], x_range[1], (x_range[1] - x_range[0]) / widget.getViewBox().width())
+        nan_curve.setData(time_of_nans, np.zeros(len(time_of_nans)))
+    print_frame_times('nan runs: frames', render(widget, update))
+    widget.close()
+
+
+def benchmark_event_lines(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import pyqtgraph as pg
+    from EventLinesItem import EventLinesItem
+
+    app = pg.mkQApp()
+    rng = np.random.default_rng(0)
+    times = np.sort(rng.uniform(0, args.duration, args.lines))
+    labels = ['PARAM_{:d}: {:d}'.format(i % 50, i) for i in range(args.lines)]
+    view_ranges = get_view_ranges(times, args.frames)
+    print("Lines: {:d}, frames: {:d}, width: {:d} px".format(args.lines, len(view_ranges), args.width))
+
+    def render(widget):
+        frame_times = []
+        for x_min, x_max in view_ranges:
+            start = time.perf_counter()
+            widget.setXRange(x_min, x_max, padding=0)
+            app.processEvents()
+            widget.grab()
+            frame_times.append(time.perf_counter() - start)
+        return frame_times
+
+    # Previous path, an InfiniteLine with a label per parameter change
+    widget = pg.PlotWidget()
+    widget.resize(args.width, 600)
+    widget.show()
+    widget.plot([0, args.duration], [0, 1])
+    start = time.perf_counter()
+    for t, label in zip(times.tolist(), labels):
+        widget.addItem(pg.InfiniteLine(angle=90, movable=False, pos=t, pen=pg.mkPen(color='k'), label=label,
+                                       labelOpts={'position': 0.8, 'color': (0, 0, 0), 'fill': (200, 200, 200, 100), 'movable': True}), ignoreBounds=True)
+    print("{:<28} {:8.2f} ms".format('infinite lines: add', (time.perf_counter() - start) * 1e3))
+    print_frame_times('infinite lines: frames', render(widget))
+    widget.close()
+
+    # One item draws all lines and the labels that do not overlap
+    widget = pg.PlotWidget()
+    widget.resize(args.width, 600)
+    widget.show()
+    widget.plot([0, args.duration], [0, 1])
+    start = time.perf_counter()
+    widget.addItem(EventLinesItem(times, (0, 0, 0), labels), ignoreBounds=True)
+    print("{:<28} {:8.2f} ms".format('event lines item: add', (time.perf_counter() - start) * 1e3))
+    print_frame_times('event lines item: frames', render(widget))
+    widget.close()
+
+
+# Time of the vectorized map projection compared to the loop it replaced. The results are compared in
+# test_map_projection.py
+def benchmark_projection(args):
+    from DerivedFields import map_projection
+    from test_map_projection import map_projection_loop
+
+    # Positions of the projected topics around their anchors, some exactly at the anchor
+    rng = np.random.default_rng(0)
+    lat_list = []
+    lon_list = []
+    anchor_list = []
+    for i in range(args.topics):
+        anchor = (47.39 + i * 0.01, 8.54 - i * 0.01)
+        lat = anchor[0] + rng.normal(0, 0.01, args.samples)
+        lon = anchor[1] + rng.normal(0, 0.01, args.samples)
+        lat[::100] = anchor[0]
+        lon[::100] = anchor[1]
+        lat_list.append(lat)
+        lon_list.append(lon)
+        anchor_list.append(np.deg2rad(anchor))
+    print("Topics: {:d}, samples per topic: {:d}".format(args.topics, args.samples))
+
+    def run(name, project):
+        start = time.perf_counter()
+        project()
+        print("{:<28} {:8.2f} ms".format(name, (time.perf_counter() - start) * 1e3))
+
+    run('loop', lambda: [map_projection_loop(np.deg2rad(lat), np.deg2rad(lon), *anchor) for lat, lon, anchor in zip(lat_list, lon_list, anchor_list)])
+    run('vectorized', lambda: [map_projection(np.deg2rad(lat), np.deg2rad(lon), *anchor) for lat, lon, anchor in zip(lat_list, lon_list, anchor_list)])
+
+
+# Euler angles of a quaternion as calculated before the attitude kernels, on pandas series like the original
+# GraphData._add_yaw_pitch_roll, or with one kernel per angle like the first derived fields
+def yaw_pitch_roll_series(q0, q1, q2, q3):
+    yaw = np.arctan2(-2.0 * (q1 * q2 - q0 * q3), q0 * q0 - q1 * q1 + q2 * q2 - q3 * q3)
+    roll = np.arcsin(2.0 * (q2 * q3 + q0 * q1))
+    pitch = np.arctan2(-2.0 * (q1 * q3 - q0 * q2), q0 * q0 - q1 * q1 - q2 * q2 + q3 * q3)
+    return yaw, roll, pitch, np.rad2deg(yaw), np.rad2deg(roll), np.rad2deg(pitch)
+
+
+def benchmark_attitude(args):
+    import pandas as pd
+    from AttitudeKernels import stack_quaternions, euler312, euler321, rotation_matrix, interpolate_quaternions, attitude_error
+
+    rng = np.random.default_rng(0)
+    num_samples = int(args.rate * args.duration)
+    time_s = np.arange(num_samples) / args.rate
+    q = rng.normal(size=(num_samples, 4))
+    q /= np.linalg.norm(q, axis=1)[:, np.newaxis]
+    q_components = [np.ascontiguousarray(component) for component in q.T]
+    setpoint_time = time_s[::4] + 0.5 / args.rate
+    q_setpoint = q[::4] + rng.normal(0, 0.01, (len(setpoint_time), 4))
+    q_setpoint /= np.linalg.norm(q_setpoint, axis=1)[:, np.newaxis]
+    print("Samples: {:d} per topic, {:d} topics".format(num_samples, args.topics))
+
+    def run(name, calculate):
+        start = time.perf_counter()
+        for i in range(args.topics):
+            result = calculate()
+        print("{:<32} {:8.2f} ms".format(name, (time.perf_counter() - start) * 1e3))
+        return result
+
+    series = [pd.Series(component, index=time_s) for component in q_components]
+    reference = run('312 pandas series (previous)', lambda: yaw_pitch_roll_series(*series))
+    run('312 numpy per angle', lambda: yaw_pitch_roll_series(*q_components))
+    angles = run('312 batched kernel', lambda: euler312(stack_quaternions(*q_components)))
+    run('312 batched kernel and [deg]', lambda: [np.rad2deg(angle) for angle in euler312(stack_quaternions(*q_components))])
+    run('321 batched kernel', lambda: euler321(stack_quaternions(*q_components)))
+    run('rotation matrix', lambda: rotation_matrix(stack_quaternions(*q_components)))
+    run('error to interpolated setpoint', lambda: attitude_error(q, interpolate_quaternions(setpoint_time, q_setpoint, time_s)))
+
+    # The batched kernel has to give the same angles as the previous implementation
+    for angle_reference, angle in zip(reference[:3], angles):
+        if not np.allclose(angle_reference.values, angle, rtol=0, atol=1e-9):
+            raise SystemExit("ERROR: batched Euler angles differ from the reference")
+
+
+# Time and memory of the bits of a flag field as int64 columns like before compared to bytes, and of the change index
+def benchmark_flags(args):
+    from FlagFields import get_bit, get_flag_changes
+
+    rng = np.random.default_rng(0)
+    num_samples = int(args.rate * args.duration)
+    # Every bit flips a few times during the log
+    flags = np.zeros(num_samples, dtype=np.uint32)
+    for bit in range(args.bits):
+        for start in np.sort(rng.integers(0, num_samples, 2 * args.flips)).reshape(-1, 2):
+            flags[start[0]:start[1]] ^= np.uint32(1 << bit)
+    print("Samples: {:d}, bits: {:d}".format(num_samples, args.bits))
+
+    start = time.perf_counter()
+    int64_bits = [((flags & (1 << bit)) > 0) * 1 for bit in range(args.bits)]
+    print("{:<28} {:8.2f} ms {:10.1f} MB".format('int64 columns (previous)', (time.perf_counter() - start) * 1e3, sum(values.nbytes for values in int64_bits) / 1e6))
+    start = time.perf_counter()
+    byte_bits = [get_bit(flags, bit) for bit in range(args.bits)]
+    print("{:<28} {:8.2f} ms {:10.1f} MB".format('byte columns', (time.perf_counter() - start) * 1e3, sum(values.nbytes for values in byte_bits) / 1e6))
+    start = time.perf_counter()
+    indices, changed_bits = get_flag_changes(flags)
+    print("{:<28} {:8.2f} ms, {:d} changes".format('change index', (time.perf_counter() - start) * 1e3, len(indices)))
+
+    for bit, (int64_values, byte_values) in enumerate(zip(int64_bits, byte_bits)):
+        if not np.array_equal(int64_values, byte_values):
+            raise SystemExit("ERROR: bit {:d} differs from the reference".format(bit))
+
+
+# Transitions from the edges of all columns of vehicle_status like before the event index
+def get_transition_timestamps_dataframe(vehicle_status):
+    import pandas as pd
+    changed = vehicle_status.ne(vehicle_status.shift())
+    forward_transition_lines = vehicle_status.index[changed['in_transition_to_fw']].tolist()
+    forward_transition_lines.pop(0)
+    df_comb = pd.concat([changed[['in_transition_mode']], vehicle_status['is_rotary_wing'] == True], axis=1)
+    back_transition_lines = vehicle_status.index[df_comb['in_transition_mode'] & df_comb['is_rotary_wing']].tolist()
+    back_transition_lines.pop(0)
+    return forward_transition_lines, back_transition_lines
+
+
+def benchmark_events(args):
+    import pandas as pd
+    from EventIndex import get_edges, create_event_index
+
+    rng = np.random.default_rng(0)
+    num_samples = int(args.rate * args.duration)
+    time_s = np.arange(num_samples) / args.rate
+    # Transitions of 10 s every 100 s, the vehicle is a rotary wing until the forward transition ends
+    cycle = np.mod(time_s, 100)
+    vehicle_status = pd.DataFrame({'in_transition_mode': (cycle >= 40) & (cycle < 50), 'in_transition_to_fw': (cycle >= 40) & (cycle < 50),
+                                   'is_rotary_wing': cycle < 50, 'arming_state': np.where(time_s > 5, 2, 1).astype(np.uint8),
+                                   'nav_state': (time_s // 300 % 5).astype(np.uint8)}, index=time_s)
+    for i in range(args.columns):
+        vehicle_status['field{:d}'.format(i)] = rng.normal(size=num_samples)
+    changed_parameters = [(int(t * 1e6), 'PARAM_{:d}'.format(i % 50), float(i)) for i, t in enumerate(np.sort(rng.uniform(0, args.duration, args.parameters)))]
+    print("Samples: {:d}, columns: {:d}, parameter changes: {:d}".format(num_samples, len(vehicle_status.columns), len(changed_parameters)))
+
+    start = time.perf_counter()
+    reference = get_transition_timestamps_dataframe(vehicle_status)
+    print("{:<28} {:8.2f} ms".format('transitions from dataframe', (time.perf_counter() - start) * 1e3))
+    start = time.perf_counter()
+    forward_transition_lines = time_s[get_edges(vehicle_status['in_transition_to_fw'].values)].tolist()
+    edges = get_edges(vehicle_status['in_transition_mode'].values)
+    back_transition_lines = time_s[edges[vehicle_status['is_rotary_wing'].values[edges]]].tolist()
+    print("{:<28} {:8.2f} ms".format('transitions from edges', (time.perf_counter() - start) * 1e3))
+    if (forward_transition_lines, back_transition_lines) != reference:
+        raise SystemExit("ERROR: transitions differ from the reference")
+
+    start = time.perf_counter()
+    event_index = create_event_index({'time': time_s, 'nav_state': vehicle_status['nav_state'].values, 'arming_state': vehicle_status['arming_state'].values},
+                                     forward_transition_lines, back_transition_lines, changed_parameters, [], [])
+    print("{:<28} {:8.2f} ms, {:d} events".format('event index', (time.perf_counter() - start) * 1e3, len(event_index)))
+    start = time.perf_counter()
+    for t in rng.uniform(0, args.duration, args.queries):
+        event_index.get_events(t, t + 60, ['parameter', 'mode'])
+        event_index.get_next_event(t, 1)
+    print("{:<28} {:8.3f} ms per query".format('range and next event', (time.perf_counter() - start) * 1e3 / args.queries))
+
+
+def benchmark_lookup(args):
+    import pandas as pd
+    from GraphData import GraphData
+
+    # Topics with high rate samples and some jitter in the timestamps, one curve per topic
+    rng = np.random.default_rng(0)
+    graph_data = GraphData()
+    num_samples = int(args.rate * args.duration)
+    for i in range(args.curves):
+        time_s = np.arange(num_samples) / args.rate + rng.uniform(0, 0.5 / args.rate, num_samples)
+        graph_data.df_dict['topic_{:d}'.format(i)] = pd.DataFrame(index=time_s)
+    topics = list(graph_data.df_dict)
+    # Marker line positions of a drag across the log
+    marker_times = np.linspace(-1, args.duration + 1, args.events)
+    print("Curves: {:d}, samples per curve: {:d}, marker events: {:d}".format(args.curves, num_samples, args.events))
+
+    def run(name, lookup):
+        start = time.perf_counter()
+        result = lookup()
+        print("{:<28} {:10.3f} ms per event".format(name, (time.perf_counter() - start) * 1e3 / args.events))
+        return result
+
+    # The sorted timestamps of a topic are prepared by the first lookup
+    for topic in topics:
+        graph_data.get_sample_index(topic, 0)
+    reference = run('linear search', lambda: [[np.argmax(graph_data.df_dict[topic].index > t) - 1 for t in marker_times] for topic in topics])
+    single = run('binary search', lambda: [[graph_data.get_sample_index(topic, t) for t in marker_times] for topic in topics])
+    batch = run('binary search, batch', lambda: [graph_data.get_sample_index(topic, marker_times) for topic in topics])
+
+    # The linear search wraps around to the last sample outside of the logged time
+    for topic, reference_indices, indices, batch_indices in zip(topics, reference, single, batch):
+        time_s = graph_data.df_dict[topic].index.values
+        inside = (marker_times >= time_s[0]) & (marker_times < time_s[-1])
+        if not (np.array_equal(np.array(reference_indices)[inside], np.array(indices)[inside]) and np.array_equal(indices, batch_indices)):
+            raise SystemExit("ERROR: binary search differs from the linear search")
+
+
+# Latency of the ROI statistics for ROIs of several widths, computed from the samples in the ROI and from the index of
+# the field. The statistics of both have to match, except for the subsampled percentiles
+def benchmark_statistics(args):
+    from RangeStatistics import RangeStatistics, STATISTICS_NAMES, MAX_PERCENTILE_SAMPLES
+
+    rng = np.random.default_rng(0)
+    num_samples = int(args.rate * args.duration)
+    time_s = np.arange(num_samples) / args.rate + rng.uniform(0, 0.5 / args.rate, num_samples)
+    y_value = 1e3 + np.cumsum(rng.normal(0, 1, num_samples))
+    y_value[rng.random(num_samples) < 0.001] = np.nan
+    print("Samples: {:d}".format(num_samples))
+
+    start = time.perf_counter()
+    range_statistics = RangeStatistics(time_s, y_value)
+    print("{:<28} {:10.2f} ms".format('build index', (time.perf_counter() - start) * 1e3))
+
+    def get_statistics(t0, t1):
+        idx_min, idx_max = np.searchsorted(time_s, [t0, t1 + 1e-12])
+        values = y_value[idx_min:idx_max]
+        values = values[~np.isnan(values)]
+        dt = np.diff(time_s[idx_min:idx_max])
+        return {'min': np.min(values), 'max': np.max(values), 'mean': np.mean(values), 'std': np.std(values),
+                'rms': np.sqrt(np.mean(values ** 2)), 'p50': np.percentile(values, 50), 'dt jitter [ms]': np.std(dt) * 1e3}
+
+    for width in args.widths:
+        ranges = [(t0, t0 + width) for t0 in rng.uniform(0, max(args.duration - width, 0), args.events)]
+        start = time.perf_counter()
+        references = [get_statistics(t0, t1) for t0, t1 in ranges]
+        reference_time = (time.perf_counter() - start) / args.events
+        start = time.perf_counter()
+        results = [range_statistics.get_statistics(t0, t1) for t0, t1 in ranges]
+        index_time = (time.perf_counter() - start) / args.events
+        print("width {:10.1f} s: samples {:10.3f} ms, index {:8.3f} ms per ROI, {:d} statistics".format(width, reference_time * 1e3, index_time * 1e3, len(STATISTICS_NAMES)))
+        for reference, result in zip(references, results):
+            for statistics_str, value in reference.items():
+                if statistics_str == 'p50' and result['samples'] > MAX_PERCENTILE_SAMPLES:
+                    continue
+                if not np.isclose(result[statistics_str], value, rtol=1e-6, atol=1e-6):
+                    raise SystemExit("ERROR: {:s} differs for a width of {:g} s: {:g} != {:g}".format(statistics_str, width, result[statistics_str], value))
+
+
+# Time of the chunked spectrum compared to scipy.signal.welch on all samples at once, and of a cached spectrum
+def benchmark_spectrum(args):
+    import scipy.signal
+    from SpectralAnalysis import get_spectrum
+
+    time_s, y_value = get_test_curve(args)
+    y_value = np.asarray(y_value, dtype=np.float64)
+    sample_rate = (len(time_s) - 1) / (time_s[-1] - time_s[0])
+    print("Samples: {:d}, segment size: {:d}".format(len(y_value), args.segment_size))
+
+    # The reference needs the samples without nans
+    finite_value = np.where(np.isnan(y_value), 0.0, y_value)
+    start = time.perf_counter()
+    _, reference_psd = scipy.signal.welch(finite_value, sample_rate, window='hann', nperseg=args.segment_size, detrend='constant')
+    print("{:<28} {:10.2f} ms".format('scipy.signal.welch', (time.perf_counter() - start) * 1e3))
+    start = time.perf_counter()
+    spectrum = get_spectrum(y_value, sample_rate, time_s[0], args.segment_size)
+    print("{:<28} {:10.2f} ms, {:d} spectrogram columns".format('chunked spectrum', (time.perf_counter() - start) * 1e3, len(spectrum.column_times)))
+    if not np.isnan(y_value).any() and not np.allclose(spectrum.psd, reference_psd, rtol=1e-6, atol=1e-12):
+        raise SystemExit("ERROR: The PSD differs from scipy.signal.welch")
+
+    if args.logfile is not None:
+        from GraphData import GraphData
+        graph_data = GraphData()
+        graph_data.ulog_to_df(args.logfile, lazy=True)
+        t0, t1 = time_s[0], time_s[-1]
+        for label in ['first spectrum', 'cached spectrum']:
+            start = time.perf_counter()
+            graph_data.get_spectrum(args.topic, args.field, t0, t1, args.segment_size)
+            print("{:<28} {:10.3f} ms".format(label, (time.perf_counter() - start) * 1e3))
+
+
+# Latency of the filter box on a logfile with many topic instances, the fields of the logfile are repeated
+def benchmark_search(args):
+    import re
+    from FieldSearchIndex import FieldSearchIndex
+    from GraphData import GraphData
+
+    graph_data = GraphData()
+    graph_data.ulog_to_df(args.logfile, lazy=True)
+    topic_fields = [('{:s}_{:d}'.format(topic_str, i), sorted(graph_data.get_field_names(topic_str))) for i in range(args.repeat) for topic_str in sorted(graph_data.df_dict)]
+    graph_data.close()
+
+    start = time.perf_counter()
+    field_search_index = FieldSearchIndex(topic_fields)
+    print("Topics: {:d}, fields: {:d}, index built in {:.1f} ms".format(len(topic_fields), field_search_index.num_fields, (time.perf_counter() - start) * 1e3))
+
+    # Every prefix of the queries is searched, as when they are typed
+    entries = [(topic_str + '->' + field_str).lower() for topic_str, field_names in topic_fields for field_str in field_names]
+    for query in args.queries:
+        search_times = []
+        for length in range(1, len(query) + 1):
+            start = time.perf_counter()
+            field_mask = field_search_index.search(query[:length])
+            search_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        if query.startswith('/'):
+            pattern = re.compile(query[1:], re.IGNORECASE)
+            reference = [pattern.search(entry) is not None for entry in entries]
+        elif query.startswith('~'):
+            reference = [all(character in iter(entry) for character in query[1:].lower()) for entry in entries]
+        else:
+            reference = [query.lower() in entry for entry in entries]
+        scan_time = time.perf_counter() - start
+        print("{:<24} {:6d} matches, median keystroke: {:7.3f} ms, max keystroke: {:7.3f} ms, linear scan: {:7.3f} ms".format(
+            query, int(field_mask.sum()), np.median(search_times) * 1e3, np.max(search_times) * 1e3, scan_time * 1e3))
+        if not np.array_equal(field_mask, reference):
+            raise SystemExit("ERROR: the search index differs from the linear scan for " + query)
+
+
+# Time to convert a logfile with several numbers of workers. test_parallel_indexing.py checks that the result is the
+# same as with one worker
+def benchmark_parallel(args):
+    from GraphData import GraphData
+
+    print("Logfile: {:s}, {:.1f} MB".format(args.logfile, os.path.getsize(args.logfile) / 1e6))
+    reference = None
+    reference_time = None
+    for num_workers in args.workers:
+        graph_data = GraphData()
+        start = time.perf_counter()
+        graph_data.ulog_to_df(args.logfile, lazy=args.lazy, num_workers=num_workers)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = graph_data
+            reference_time = elapsed
+        print("{:3d} workers: {:10.2f} ms, speed-up: {:5.2f}".format(num_workers, elapsed * 1e3, reference_time / elapsed))
+
+
+# Returns the size of the decoded dataframes of a logfile [bytes]
+def get_decoded_size(graph_data):
+    return sum(int(graph_data.df_dict[topic_str].memory_usage(index=True).sum()) for topic_str in graph_data.df_dict if graph_data.df_dict.is_loaded(topic_str))
+
+
+# Overlay several logfiles as the GUI does, they are indexed and only the topics of the displayed fields are decoded.
+# The decoded size is compared to decoding the first logfile completely
+def benchmark_overlay(args):
+    from GraphData import GraphData
+
+    start = time.perf_counter()
+    overlays = []
+    for logfile_str in args.logfiles:
+        graph_data = GraphData()
+        graph_data.ulog_to_df(logfile_str, lazy=True)
+        overlays.append(graph_data)
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for graph_data in overlays:
+        for topic_and_field in args.fields:
+            topic_str, field_str = topic_and_field.split('->')
+            graph_data.get_field(topic_str, field_str)
+    decode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    event_times = [graph_data.get_event_time(args.align) for graph_data in overlays]
+    align_time = time.perf_counter() - start
+
+    reference = GraphData()
+    reference.ulog_to_df(args.logfiles[0])
+    print("{:d} logfiles, {:.1f} MB".format(len(args.logfiles), sum(os.path.getsize(logfile_str) for logfile_str in args.logfiles) / 1e6))
+    print("{:<28} {:10.2f} ms".format('index', index_time * 1e3))
+    print("{:<28} {:10.2f} ms".format('decode displayed fields', decode_time * 1e3))
+    print("{:<28} {:10.2f} ms".format('align on ' + args.align, align_time * 1e3))
+    for logfile_str, graph_data, event_time in zip(args.logfiles, overlays, event_times):
+        print("{:<40} event: {:>10s}, decoded: {:8.2f} MB".format(os.path.basename(logfile_str), 'none' if event_time is None else '{:.2f} s'.format(event_time), get_decoded_size(graph_data) / 1e6))
+    print("{:<40} {:27s} {:8.2f} MB".format('completely decoded ' + os.path.basename(args.logfiles[0]), '', get_decoded_size(reference) / 1e6))
+
+
+# Align a logfile with a reference logfile on an event and on the cross-correlation of a field, and resample fields of
+# both on a common time grid. The repeated comparisons are served from the caches
+def benchmark_align(args):
+    from GraphData import GraphData, CORRELATION_ALIGNMENT_PREFIX
+
+    reference = GraphData()
+    reference.ulog_to_df(args.reference, lazy=True)
+    graph_data = GraphData()
+    graph_data.ulog_to_df(args.logfile, lazy=True)
+    topic_and_fields = [tuple(topic_and_field.split('->')) for topic_and_field in args.fields]
+    for topic_str, field_str in topic_and_fields:
+        reference.get_field(topic_str, field_str)
+        graph_data.get_field(topic_str, field_str)
+
+    for alignment_str in [args.align, CORRELATION_ALIGNMENT_PREFIX + args.fields[0]]:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            time_offset = graph_data.get_time_offset(reference, alignment_str)
+            times.append(time.perf_counter() - start)
+        print("{:<60} offset: {:>10s}, first: {:8.2f} ms, cached: {:8.4f} ms".format(alignment_str, 'none' if time_offset is None else '{:.3f} s'.format(time_offset), times[0] * 1e3, np.median(times[1:]) * 1e3))
+
+    graph_data.time_offset = time_offset or 0
+    start_time = max(reference.start_timestamp / 1e6, reference.df_dict[topic_and_fields[0][0]].index[0])
+    stop_time = reference.df_dict[topic_and_fields[0][0]].index[-1]
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        time_grid, reference_values = reference.get_resampled_fields(topic_and_fields, start_time, stop_time, args.period)
+        time_grid, values = graph_data.get_resampled_fields(topic_and_fields, start_time, stop_time, args.period)
+        times.append(time.perf_counter() - start)
+    print("resample {:d} fields x {:d} samples x 2 logfiles, first: {:8.2f} ms, cached: {:8.4f} ms".format(len(topic_and_fields), len(time_grid), times[0] * 1e3, np.median(times[1:]) * 1e3))
+    for (topic_str, field_str), reference_row, row in zip(topic_and_fields, reference_values, values):
+        print("{:<60} mean absolute difference: {:.4g}".format(topic_str + '->' + field_str, np.nanmean(np.abs(row - reference_row))))
+
+
+# Append the messages of a logfile in chunks to a copy of a part of it and update the opened copy after every chunk, as
+# in follow mode. The refresh times are compared to opening the copy again, for several lengths of the part
+def benchmark_follow(args):
+    import shutil
+    import tempfile
+    from GraphData import GraphData
+
+    with open(args.logfile, 'rb') as f:
+        data = f.read()
+    print("Logfile: {:s}, {:.1f} MB, curve: {:s}->{:s}, {:d} refreshes of {:d} bytes".format(
+        args.logfile, len(data) / 1e6, args.topic, args.field, args.refreshes, args.chunk))
+    tmp_dir = tempfile.mkdtemp(prefix='ulog_explorer_follow_')
+    followed_logfile = os.path.join(tmp_dir, 'follow.ulg')
+    try:
+        for fraction in args.fractions:
+            pos = int(len(data) * fraction)
+            if pos + args.refreshes * args.chunk > len(data):
+                print("{:.2f} of the logfile: skipped, not enough data to append".format(fraction))
+                continue
+            with open(followed_logfile, 'wb') as f:
+                f.write(data[:pos])
+            graph_data = GraphData()
+            graph_data.ulog_to_df(followed_logfile, lazy=True)
+            graph_data.get_min_max_pyramid(args.topic, args.field)
+
+            refresh_times = []
+            for refresh in range(args.refreshes):
+                with open(followed_logfile, 'ab') as f:
+                    f.write(data[pos:pos + args.chunk])
+                pos += args.chunk
+                start = time.perf_counter()
+                graph_data.update()
+                graph_data.get_min_max_pyramid(args.topic, args.field)
+                refresh_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            reference = GraphData()
+            reference.ulog_to_df(followed_logfile, lazy=True)
+            reference.get_min_max_pyramid(args.topic, args.field)
+            reload_time = time.perf_counter() - start
+
+            # The first refresh copies the columns of the topic into growable buffers, it is not included in the median
+            refresh_times = np.array(refresh_times) * 1e3
+            print("{:.2f} of the logfile ({:6.1f} MB): first refresh: {:8.2f} ms, median refresh: {:8.2f} ms, max refresh: {:8.2f} ms, reopen: {:8.2f} ms".format(
+                fraction, pos / 1e6, refresh_times[0], np.median(refresh_times[1:]), np.max(refresh_times[1:]), reload_time * 1e3))
+
+            # The followed topics have to be the same as after opening the logfile again
+            if sorted(graph_data.df_dict) != sorted(reference.df_dict):
+                raise SystemExit("ERROR: topics differ from the reopened logfile")
+            for topic_str in reference.df_dict:
+                if not graph_data.df_dict[topic_str].equals(reference.df_dict[topic_str]):
+                    raise SystemExit("ERROR: {:s} differs from the reopened logfile".format(topic_str))
+            if not graph_data.get_field(args.topic, args.field).equals(reference.get_field(args.topic, args.field)):
+                raise SystemExit("ERROR: {:s}->{:s} differs from the reopened logfile".format(args.topic, args.field))
+            graph_data.close()
+            reference.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Replay a logfile into a stream with ulog_replay.py and refresh it at the rate of the GUI
+def benchmark_stream(args):
+    import subprocess
+    import sys
+    from StreamGraphData import StreamGraphData
+
+    print("Logfile: {:s}, curve: {:s}->{:s}, {:g}x to {:s}, capacity: {:d}".format(args.logfile, args.topic, args.field, args.speed, args.source, args.capacity))
+    graph_data = StreamGraphData(args.capacity)
+    graph_data.open_stream(args.source)
+    replay = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ulog_replay.py'), args.logfile, args.source, '-s', str(args.speed)], stdout=subprocess.DEVNULL)
+    refresh_times = []
+    max_buffer_size = 0
+    start = time.perf_counter()
+    try:
+        while replay.poll() is None:
+            refresh_start = time.perf_counter()
+            updated_topics = graph_data.update()
+            if args.topic in updated_topics:
+                graph_data.get_min_max_pyramid(args.topic, args.field)
+                refresh_times.append(time.perf_counter() - refresh_start)
+            max_buffer_size = max(max_buffer_size, graph_data.buffer_size)
+            time.sleep(max(args.interval - (time.perf_counter() - refresh_start), 0))
+    finally:
+        replay.wait()
+    duration = time.perf_counter() - start
+    time.sleep(args.interval)
+    graph_data.update()
+
+    num_received = sum(topic.num_received for topic in graph_data.data_list)
+    refresh_times = np.array(refresh_times[1:]) * 1e3
+    print("Received {:d} messages in {:.1f} s: {:.0f} messages/s, median refresh: {:.2f} ms, max refresh: {:.2f} ms, ring buffers: {:.1f} MB".format(
+        num_received, duration, num_received / duration, np.median(refresh_times), np.max(refresh_times), max_buffer_size / 1e6))
+
+    # The kept samples have to be the last ones of the logfile
+    from GraphData import GraphData
+    reference = GraphData()
+    reference.ulog_to_df(args.logfile, lazy=True)
+    for topic_str in [topic.topic_name for topic in graph_data.data_list]:
+        df = graph_data.df_dict[topic_str]
+        if not df.equals(reference.df_dict[topic_str].iloc[-len(df):]):
+            raise SystemExit("ERROR: {:s} differs from the last samples of the logfile".format(topic_str))
+    graph_data.close()
+    reference.close()
+
+
+# Start the GUI with a logfile in this process and print the times since the process was launched at launch_time
+def measure_startup(args):
+    import sys
+    sys.argv = ['ulog_explorer.py', args.logfile] + ([] if args.cache else ['-nc'])
+    import ulog_explorer
+    from pyqtgraph.Qt import QtGui
+    import_time = time.time()
+
+    app = QtGui.QApplication(sys.argv)
+    window = ulog_explorer.Window()
+    window.show()
+    while not window.windowHandle().isExposed():
+        app.processEvents()
+    app.processEvents()
+    window_time = time.time()
+
+    def wait_for(condition):
+        timeout = time.time() + 60
+        while not condition():
+            if time.time() > timeout:
+                raise SystemExit("ERROR: Timeout while starting up")
+            app.processEvents()
+            time.sleep(0.001)
+
+    wait_for(lambda: not window.is_indexing(0))
+    if args.field not in window.backend.graph_data[0].get_field_names(args.topic):
+        raise SystemExit("ERROR: {:s}->{:s} not available".format(args.topic, args.field))
+    window.toggle_visible_field(args.topic, args.field)
+    curve_items = window.backend.graph_data[0].curve_items
+    wait_for(lambda: any(items.curve.xData is not None and len(items.curve.xData) > 0 for items in curve_items.values()))
+    first_curve_time = time.time()
+
+    window.close()
+    print("STARTUP {:f} {:f} {:f}".format(import_time - args.launch_time, window_time - args.launch_time, first_curve_time - args.launch_time))
+
+
+def benchmark_startup(args):
+    if args.launch_time is not None:
+        measure_startup(args)
+        return
+
+    import subprocess
+    import sys
+
+    # Every run is a new process, the times include the start of the interpreter and all imports
+    print("Logfile: {:s}, curve: {:s}->{:s}, runs: {:d}".format(args.logfile, args.topic, args.field, args.runs))
+    times = []
+    for run in range(args.runs):
+        command = [sys.executable, os.path.abspath(__file__), 'startup', '-l', args.logfile, '-t', args.topic, '-f', args.field, '--launch_time', repr(time.time())]
+        if args.cache:
+            command.append('--cache')
+        output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True).stdout
+        lines = [line for line in output.splitlines() if line.startswith('STARTUP ')]
+        if len(lines) == 0:
+            raise SystemExit("ERROR: Startup failed:\n" + output)
+        times.append([float(value) for value in lines[-1].split()[1:]])
+
+    times = np.median(times, axis=0)
+    print("{:<28} {:8.2f} ms".format('imports', times[0] * 1e3))
+    print("{:<28} {:8.2f} ms, budget: {:8.2f} ms".format('time to window', times[1] * 1e3, args.window_budget * 1e3))
+    print("{:<28} {:8.2f} ms, budget: {:8.2f} ms".format('time to first curve', times[2] * 1e3, args.curve_budget * 1e3))
+    if times[1] > args.window_budget or times[2] > args.curve_budget:
+        raise SystemExit("ERROR: startup exceeds the budget")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of ulog_explorer')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    lod_parser = subparsers.add_parser('lod', help='Frame times of full resolution and level of detail curves')
+    lod_parser.add_argument('-l', '--logfile', type=str, help='Logfile to take the curve from, a synthetic curve is used if not given')
+    lod_parser.add_argument('-t', '--topic', type=str, default='sensor_combined_0', help='Topic of the curve')
+    lod_parser.add_argument('-f', '--field', type=str, default='accelerometer_m_s2[0]', help='Field of the curve')
+    lod_parser.add_argument('--rate', type=float, default=2000, help='Sample rate of the synthetic curve [Hz]')
+    lod_parser.add_argument('--duration', type=float, default=3600, help='Duration of the synthetic curve [s]')
+    lod_parser.add_argument('--frames', type=int, default=40, help='Number of rendered frames')
+    lod_parser.add_argument('--width', type=int, default=1600, help='Width of the graph [px]')
+    lod_parser.set_defaults(function=benchmark_level_of_detail)
+
+    nan_parser = subparsers.add_parser('nan', help='Frame times of the markers of nan samples compared to a marker per nan sample')
+    nan_parser.add_argument('--rate', type=float, default=250, help='Sample rate of the curve [Hz]')
+    nan_parser.add_argument('--duration', type=float, default=3600, help='Duration of the curve [s]')
+    nan_parser.add_argument('--dropout', type=float, default=300, help='Duration of the dropout [s]')
+    nan_parser.add_argument('--gaps', type=int, default=1000, help='Number of short gaps')
+    nan_parser.add_argument('--frames', type=int, default=20, help='Number of rendered frames')
+    nan_parser.add_argument('--width', type=int, default=1600, help='Width of the graph [px]')
+    nan_parser.set_defaults(function=benchmark_nan_markers)
+
+    event_lines_parser = subparsers.add_parser('event_lines', help='Frame times of parameter change lines as InfiniteLines and as one event lines item')
+    event_lines_parser.add_argument('--lines', type=int, default=500, help='Number of lines')
+    event_lines_parser.add_argument('--duration', type=float, default=3600, help='Duration of the logfile [s]')
+    event_lines_parser.add_argument('--frames', type=int, default=40, help='Number of rendered frames')
+    event_lines_parser.add_argument('--width', type=int, default=1600, help='Width of the graph [px]')
+    event_lines_parser.set_defaults(function=benchmark_event_lines)
+
+    projection_parser = subparsers.add_parser('projection', help='Map projection of lat, lon compared to the previous implementation')
+    projection_parser.add_argument('--topics', type=int, default=4, help='Number of projected topics')
+    projection_parser.add_argument('--samples', type=int, default=200000, help='Number of samples per topic')
+    projection_parser.set_defaults(function=benchmark_projection)
+
+    attitude_parser = subparsers.add_parser('attitude', help='Euler angles, rotation matrix and attitude error of quaternions compared to the previous implementation')
+    attitude_parser.add_argument('--rate', type=float, default=250, help='Sample rate of the attitude [Hz]')
+    attitude_parser.add_argument('--duration', type=float, default=3600, help='Duration of the attitude [s]')
+    attitude_parser.add_argument('--topics', type=int, default=6, help='Number of topics with an attitude')
+    attitude_parser.set_defaults(function=benchmark_attitude)
+
+    flags_parser = subparsers.add_parser('flags', help='Time and memory of the bits of a flag field and of its change index')
+    flags_parser.add_argument('--rate', type=float, default=100, help='Sample rate of the flag field [Hz]')
+    flags_parser.add_argument('--duration', type=float, default=3600, help='Duration of the flag field [s]')
+    flags_parser.add_argument('--bits', type=int, default=24, help='Number of bits')
+    flags_parser.add_argument('--flips', type=int, default=10, help='Number of times every bit is set and cleared')
+    flags_parser.set_defaults(function=benchmark_flags)
+
+    events_parser = subparsers.add_parser('events', help='Time to build the event index compared to the transitions from the dataframe, and query latency')
+    events_parser.add_argument('--rate', type=float, default=50, help='Sample rate of vehicle_status [Hz]')
+    events_parser.add_argument('--duration', type=float, default=3600, help='Duration of the logfile [s]')
+    events_parser.add_argument('--columns', type=int, default=30, help='Number of other fields of vehicle_status')
+    events_parser.add_argument('--parameters', type=int, default=500, help='Number of parameter changes')
+    events_parser.add_argument('--queries', type=int, default=1000, help='Number of queries')
+    events_parser.set_defaults(function=benchmark_events)
+
+    lookup_parser = subparsers.add_parser('lookup', help='Latency of the sample lookups at the marker line')
+    lookup_parser.add_argument('--curves', type=int, default=10, help='Number of displayed curves')
+    lookup_parser.add_argument('--rate', type=float, default=1000, help='Sample rate of the curves [Hz]')
+    lookup_parser.add_argument('--duration', type=float, default=3600, help='Duration of the curves [s]')
+    lookup_parser.add_argument('--events', type=int, default=50, help='Number of marker line events')
+    lookup_parser.set_defaults(function=benchmark_lookup)
+
+    statistics_parser = subparsers.add_parser('statistics', help='Latency of the ROI statistics for several ROI widths')
+    statistics_parser.add_argument('--rate', type=float, default=1000, help='Sample rate of the curve [Hz]')
+    statistics_parser.add_argument('--duration', type=float, default=3600, help='Duration of the curve [s]')
+    statistics_parser.add_argument('--widths', type=float, nargs='+', default=[1, 60, 600, 3000], help='Widths of the ROI [s]')
+    statistics_parser.add_argument('--events', type=int, default=50, help='Number of ROI positions per width')
+    statistics_parser.set_defaults(function=benchmark_statistics)
+
+    spectrum_parser = subparsers.add_parser('spectrum', help='Time of the PSD and spectrogram of a curve compared to scipy.signal.welch')
+    spectrum_parser.add_argument('-l', '--logfile', type=str, default=None, help='Logfile with the curve, a synthetic curve if not set')
+    spectrum_parser.add_argument('-t', '--topic', type=str, default='sensor_combined_0', help='Topic of the curve')
+    spectrum_parser.add_argument('-f', '--field', type=str, default='accelerometer_m_s2[0]', help='Field of the curve')
+    spectrum_parser.add_argument('--rate', type=float, default=1000, help='Sample rate of the synthetic curve [Hz]')
+    spectrum_parser.add_argument('--duration', type=float, default=3600, help='Duration of the synthetic curve [s]')
+    spectrum_parser.add_argument('--segment_size', type=int, default=1024, help='Number of samples per segment')
+    spectrum_parser.set_defaults(function=benchmark_spectrum)
+
+    search_parser = subparsers.add_parser('search', help='Latency of the filter box of the topic tree')
+    search_parser.add_argument('-l', '--logfile', type=str, required=True, help='Logfile whose fields are searched')
+    search_parser.add_argument('--repeat', type=int, default=20, help='Number of instances of every topic')
+    search_parser.add_argument('--queries', type=str, nargs='+', default=['accelerometer_m_s2', '~vattq', '/^vehicle_.*q\\[[0-3]\\]$'], help='Searched filters, ~ for fuzzy and / for regex')
+    search_parser.set_defaults(function=benchmark_search)
+
+    parallel_parser = subparsers.add_parser('parallel', help='Scaling of indexing and decoding a logfile with the number of worker processes')
+    parallel_parser.add_argument('-l', '--logfile', type=str, required=True, help='Logfile to decode')
+    parallel_parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Numbers of worker processes, the first one is the reference')
+    parallel_parser.add_argument('--lazy', action='store_true', help='Only index the logfile')
+    parallel_parser.set_defaults(function=benchmark_parallel)
+
+    overlay_parser = subparsers.add_parser('overlay', help='Load time and decoded size of overlaid logfiles')
+    overlay_parser.add_argument('-l', '--logfiles', type=str, nargs='+', required=True, help='Overlaid logfiles')
+    overlay_parser.add_argument('-f', '--fields', type=str, nargs='+', default=['sensor_combined_0->accelerometer_m_s2[0]', 'vehicle_status_0->arming_state'], help='Displayed "topic->field"')
+    overlay_parser.add_argument('-a', '--align', type=str, default='arming', help='Alignment event')
+    overlay_parser.set_defaults(function=benchmark_overlay)
+
+    align_parser = subparsers.add_parser('align', help='Alignment of a logfile with a reference logfile and resampling on a common time grid')
+    align_parser.add_argument('-r', '--reference', type=str, required=True, help='Reference logfile')
+    align_parser.add_argument('-l', '--logfile', type=str, required=True, help='Aligned logfile')
+    align_parser.add_argument('-f', '--fields', type=str, nargs='+', default=['vehicle_status_0->arming_state', 'vehicle_attitude_0->q[0]', 'sensor_combined_0->accelerometer_m_s2[2]'], help='Resampled "topic->field", the first one is cross-correlated')
+    align_parser.add_argument('-a', '--align', type=str, default='arming', help='Alignment event')
+    align_parser.add_argument('-p', '--period', type=float, default=0.01, help='Period of the time grid [s]')
+    align_parser.add_argument('--repeat', type=int, default=20, help='Number of repeated comparisons')
+    align_parser.set_defaults(function=benchmark_align)
+
+    follow_parser = subparsers.add_parser('follow', help='Refresh times of a logfile that is followed while it is written')
+    follow_parser.add_argument('-l', '--logfile', type=str, required=True, help='Logfile whose messages are appended')
+    follow_parser.add_argument('-t', '--topic', type=str, default='sensor_combined_0', help='Topic of the displayed curve')
+    follow_parser.add_argument('-f', '--field', type=str, default='accelerometer_m_s2[0]', help='Field of the displayed curve')
+    follow_parser.add_argument('--fractions', type=float, nargs='+', default=[0.1, 0.3, 0.9], help='Parts of the logfile written when it is opened')
+    follow_parser.add_argument('--chunk', type=int, default=1 << 16, help='Number of bytes appended per refresh')
+    follow_parser.add_argument('--refreshes', type=int, default=10, help='Number of refreshes')
+    follow_parser.set_defaults(function=benchmark_follow)
+
+    stream_parser = subparsers.add_parser('stream', help='Message rate and refresh times of a stream replayed from a logfile')
+    stream_parser.add_argument('-l', '--logfile', type=str, required=True, help='Logfile to replay')
+    stream_parser.add_argument('-t', '--topic', type=str, default='sensor_combined_0', help='Topic of the displayed curve')
+    stream_parser.add_argument('-f', '--field', type=str, default='accelerometer_m_s2[0]', help='Field of the displayed curve')
+    stream_parser.add_argument('-s', '--speed', type=float, default=50, help='Replay speed')
+    stream_parser.add_argument('--source', type=str, default='udp://127.0.0.1:14570', help='udp://host:port or named pipe of the stream')
+    stream_parser.add_argument('--capacity', type=int, default=1 << 16, help='Number of samples kept per topic')
+    stream_parser.add_argument('--interval', type=float, default=0.2, help='Refresh interval [s]')
+    stream_parser.set_defaults(function=benchmark_stream)
+
+    startup_parser = subparsers.add_parser('startup', help='Time to window and time to first curve of the GUI, median of several runs')
+    startup_parser.add_argument('-l', '--logfile', type=str, required=True, help='Logfile to open')
+    startup_parser.add_argument('-t', '--topic', type=str, default='sensor_combined_0', help='Topic of the first curve')
+    startup_parser.add_argument('-f', '--field', type=str, default='accelerometer_m_s2[0]', help='Field of the first curve')
+    startup_parser.add_argument('--runs', type=int, default=5, help='Number of runs')
+    startup_parser.add_argument('--cache', action='store_true', help='Use the on-disk cache of converted logfiles')
+    startup_parser.add_argument('--window_budget', type=float, default=1.0, help='Maximum median time to window [s]')
+    startup_parser.add_argument('--curve_budget', type=float, default=2.0, help='Maximum median time to first curve [s]')
+    startup_parser.add_argument('--launch_time', type=float, help=argparse.SUPPRESS)
+    startup_parser.set_defaults(function=benchmark_startup)
+
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Module: test_map_projection.py
+
+import numpy as np
+from DerivedFields import map_projection, lat_lon_m
+
+
+# Map projection with a loop over the samples as it was taken from flight_review, used as reference for the vectorized
+# projection
+def map_projection_loop(lat, lon, anchor_lat, anchor_lon):
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    cos_d_lon = np.cos(lon - anchor_lon)
+    sin_anchor_lat = np.sin(anchor_lat)
+    cos_anchor_lat = np.cos(anchor_lat)
+
+    arg = sin_anchor_lat * sin_lat + cos_anchor_lat * cos_lat * cos_d_lon
+    arg[arg > 1] = 1
+    arg[arg < -1] = -1
+
+    c = np.arccos(arg)
+    k = np.copy(lat)
+    for i in range(len(lat)):
+        if np.abs(c[i]) < np.finfo(float).eps:
+            k[i] = 1
+        else:
+            k[i] = c[i] / np.sin(c[i])
+
+    CONSTANTS_RADIUS_OF_EARTH = 6371000
+    x = k * (cos_anchor_lat * sin_lat - sin_anchor_lat * cos_lat * cos_d_lon) * CONSTANTS_RADIUS_OF_EARTH
+    y = k * cos_lat * np.sin(lon - anchor_lon) * CONSTANTS_RADIUS_OF_EARTH
+
+    return x, y
+
+
+# Positions [deg] around an anchor with the edge cases of k: the anchor itself, its antipode and both poles
+def get_positions(anchor, num_samples=200, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = anchor[0] + rng.normal(0, 0.01, num_samples)
+    lon = anchor[1] + rng.normal(0, 0.01, num_samples)
+    lat[::20] = anchor[0]
+    lon[::20] = anchor[1]
+    edge_lat = [anchor[0], -anchor[0], 90.0, -90.0]
+    edge_lon = [anchor[1], anchor[1] + 180.0, anchor[1], anchor[1]]
+    return np.append(lat, edge_lat), np.append(lon, edge_lon)
+
+
+def assert_same_projection(x, y, x_reference, y_reference):
+    np.testing.assert_allclose(x, x_reference, rtol=1e-12, atol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(y, y_reference, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+
+def test_map_projection_matches_loop():
+    for anchor in [(47.39, 8.54), (0.0, 0.0), (-33.9, 151.2), (89.9, -120.0)]:
+        lat, lon = get_positions(anchor)
+        anchor_rad = np.deg2rad(anchor)
+        x_reference, y_reference = map_projection_loop(np.deg2rad(lat), np.deg2rad(lon), *anchor_rad)
+        x, y = map_projection(np.deg2rad(lat), np.deg2rad(lon), *anchor_rad)
+        assert_same_projection(x, y, x_reference, y_reference)
+
+
+def test_map_projection_at_anchor_is_zero():
+    lat, lon = np.deg2rad([47.39, 47.39]), np.deg2rad([8.54, 8.54])
+    x, y = map_projection(lat, lon, lat[0], lon[0])
+    np.testing.assert_array_equal(x, 0)
+    np.testing.assert_array_equal(y, 0)
+
+
+# The derived fields are projected on the reference position of the local position estimate once it is set, otherwise
+# on the first position. Positions are logged in [deg] * 1e7
+def test_lat_lon_m_matches_loop():
+    lat, lon = get_positions((47.39, 8.54))
+    reference = (47.4, 8.55)
+    ref_timestamp = np.zeros(len(lat), dtype=np.uint64)
+    ref_timestamp[5:] = 1000
+    for anchor, anchor_fields in [((lat[0], lon[0]), (None, None, None)),
+                                  (reference, (ref_timestamp, np.full(len(lat), reference[0]), np.full(len(lat), reference[1])))]:
+        x_reference, y_reference = map_projection_loop(np.deg2rad(lat), np.deg2rad(lon), *np.deg2rad(anchor))
+        x, y = lat_lon_m(lat * 1e7, lon * 1e7, 1e7, *anchor_fields)
+        assert_same_projection(x, y, x_reference, y_reference)
@@ -0,0 +1,93 @@
+# Module: test_parallel_indexing.py
+
+import struct
+import sys
+import numpy as np
+import pytest
+from GraphData import GraphData
+
+# Topics of the generated logfile as (multi id, sample rate [Hz])
+TEST_TOPICS = [(0, 1000), (1, 400), (2, 50)]
+TEST_DURATION = 60
+
+
+def get_message(msg_type, payload):
+    return struct.pack('<HB', len(payload), ord(msg_type)) + payload
+
+
+def get_key_value(key_str, value):
+    key = key_str.encode()
+    return struct.pack('<B', len(key)) + key + value
+
+
+# Write a logfile with several subscriptions of one format whose data messages are interleaved by timestamp, and
+# parameter changes and logged messages in the data section
+def write_test_logfile(path):
+    content = bytearray(b'ULog\x01\x12\x35\x01' + struct.pack('<Q', 0))
+    content += get_message('B', bytes(40))
+    content += get_message('F', b'test_sensor:uint64_t timestamp;float x;float y;uint8_t status;')
+    content += get_message('I', get_key_value('char[3] sys_name', b'PX4'))
+    content += get_message('P', get_key_value('float MC_ROLL_P', struct.pack('<f', 6.5)))
+    for msg_id, (multi_id, rate) in enumerate(TEST_TOPICS):
+        content += get_message('A', struct.pack('<BH', multi_id, msg_id) + b'test_sensor')
+
+    rng = np.random.default_rng(0)
+    dtype = np.dtype([('msg_size', '<u2'), ('msg_type', 'u1'), ('msg_id', '<u2'), ('timestamp', '<u8'), ('x', '<f4'), ('y', '<f4'), ('status', 'u1')])
+    records = []
+    for msg_id, (multi_id, rate) in enumerate(TEST_TOPICS):
+        topic_records = np.zeros(TEST_DURATION * rate, dtype=dtype)
+        topic_records['msg_size'] = dtype.itemsize - 3
+        topic_records['msg_type'] = ord('D')
+        topic_records['msg_id'] = msg_id
+        topic_records['timestamp'] = 1000000 + np.arange(len(topic_records)) * (1000000 // rate) + msg_id
+        topic_records['x'] = rng.normal(size=len(topic_records))
+        topic_records['y'] = np.sin(np.arange(len(topic_records)) / rate)
+        topic_records['status'] = np.arange(len(topic_records)) // rate % 4
+        records.append(topic_records)
+    records = np.concatenate(records)
+    records = records[np.argsort(records['timestamp'], kind='stable')]
+
+    # Messages that are not data are inserted between the data messages
+    half = len(records) // 2
+    content += records[:half].tobytes()
+    content += get_message('P', get_key_value('float MC_ROLL_P', struct.pack('<f', 7.0)))
+    content += get_message('L', struct.pack('<BQ', ord('6'), int(records['timestamp'][half])) + b'Test message')
+    content += records[half:].tobytes()
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+@pytest.fixture(scope='module')
+def test_logfile(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('logfiles') / 'test.ulg')
+    write_test_logfile(path)
+    return path
+
+
+# Compare the topics, dataframes and parameter changes of a logfile converted with several workers to the serial path
+def assert_same_conversion(graph_data, reference):
+    assert sorted(graph_data.df_dict) == sorted(reference.df_dict)
+    for topic_str in reference.df_dict:
+        df = graph_data.df_dict[topic_str]
+        reference_df = reference.df_dict[topic_str]
+        assert df.equals(reference_df), topic_str
+        assert df.dtypes.equals(reference_df.dtypes), topic_str
+        np.testing.assert_array_equal(df.index.values, reference_df.index.values)
+    assert graph_data.changed_parameters == reference.changed_parameters
+    assert [message.message for message in graph_data._ulog_index.logged_messages] == [message.message for message in reference._ulog_index.logged_messages]
+
+
+# The logfile is small, the chunks scanned and the parts decoded in parallel are made small enough that every worker
+# gets several of them
+@pytest.mark.parametrize('lazy', [True, False])
+def test_parallel_conversion_matches_serial(test_logfile, lazy, monkeypatch):
+    monkeypatch.setattr(sys.modules['ULogIndex'], 'PARALLEL_MIN_CHUNK_SIZE', 1 << 16)
+    monkeypatch.setattr(sys.modules['GraphData'], 'PARALLEL_DECODE_SIZE', 1 << 14)
+    reference = GraphData()
+    reference.ulog_to_df(test_logfile, lazy=lazy)
+    assert len(reference.df_dict['test_sensor_0']) == TEST_DURATION * TEST_TOPICS[0][1]
+    assert [(name, value) for timestamp, name, value in reference.changed_parameters] == [('MC_ROLL_P', 7.0)]
+    for num_workers in [2, 4]:
+        graph_data = GraphData()
+        graph_data.ulog_to_df(test_logfile, lazy=lazy, num_workers=num_workers)
+        assert_same_conversion(graph_data, reference)
@@ -0,0 +1,145 @@
+# Headless summary of all uLog files in a directory tree, written to one Parquet or CSV table. Qt is not imported
+# Run with: python3 ulog_batch.py <directory or .ulg file> [-o ulog_summary.csv] [-j jobs], see python3 ulog_batch.py -h
+
+import argparse
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from GraphData import GraphData
+from ULogIndex import create_process_pool
+
+# Columns of the summary table. Every row is one record of a logfile, the record column tells which of the other
+# columns are used:
+# summary:            key, value                     (start time and duration [s], dropouts, corrupt file)
+# info:               key, text                      (info messages)
+# info_multiple:      key, value                     (number of info multiple messages)
+# dropout:            timestamp, value               (duration [ms])
+# changed_parameter:  timestamp, key, value
+# forward_transition: timestamp
+# back_transition:    timestamp
+# field:              topic, field, count, nan_count, min, max, mean, std
+# error:              text
+# Timestamps are in seconds like the time axis of the graphs
+COLUMNS = ['logfile', 'record', 'timestamp', 'topic', 'field', 'key', 'text', 'value', 'count', 'nan_count', 'min', 'max', 'mean', 'std']
+
+
+# Returns the paths of all uLog files in a directory tree in sorted order, or the path itself if it is a file
+def find_logfiles(input_path):
+    if os.path.isfile(input_path):
+        return [input_path]
+
+    logfiles = []
+    for dir_path, dir_names, file_names in os.walk(input_path):
+        dir_names.sort()
+        logfiles += [os.path.join(dir_path, file_name) for file_name in sorted(file_names) if file_name.endswith('.ulg')]
+
+    return logfiles
+
+
+# Returns the count, nan count, min, max, mean and std of the values of a field
+def get_field_statistics(values):
+    values = np.asarray(values, dtype=np.float64)
+    finite_values = values[~np.isnan(values)]
+    if len(finite_values) == 0:
+        return len(values), len(values), np.nan, np.nan, np.nan, np.nan
+
+    return len(values), len(values) - len(finite_values), np.min(finite_values), np.max(finite_values), np.mean(finite_values), np.std(finite_values)
+
+
+# Returns the records of the summary table for one logfile, run in a worker process. A logfile that can not be
+# processed gives an error record
+def summarize_logfile(logfile_str):
+    rows = []
+
+    def add_row(record, **kwargs):
+        rows.append(dict(kwargs, logfile=logfile_str, record=record))
+
+    graph_data = GraphData()
+    try:
+        with warnings.catch_warnings():
+            # Derived fields of invalid values, e.g. nan attitudes, are expected
+            warnings.simplefilter('ignore', RuntimeWarning)
+            add_logfile_records(graph_data, logfile_str, add_row)
+    except Exception as ex:
+        print("WARNING: Failed to process " + logfile_str + ": " + str(ex))
+        add_row('error', text=str(ex))
+    graph_data.close()
+
+    return rows
+
+
+# Add the records of an opened logfile, the topics are decoded one at a time to compute the field statistics
+def add_logfile_records(graph_data, logfile_str, add_row):
+    graph_data.ulog_to_df(logfile_str, lazy=True)
+    info = graph_data.get_ulog_info()
+    for key in ['start_time', 'duration', 'dropout_count', 'dropout_total_duration', 'dropout_max_duration', 'dropout_mean_duration']:
+        add_row('summary', key=key, value=info[key])
+    add_row('summary', key='file_corrupt', value=int(graph_data.file_corrupt))
+    for key, value in info['info'].items():
+        add_row('info', key=key, text=str(value))
+    for key, value in info['info_multiple'].items():
+        add_row('info_multiple', key=key, value=len(value))
+
+    for dropout in graph_data.dropouts:
+        add_row('dropout', timestamp=dropout.timestamp / 1e6, value=dropout.duration)
+    for timestamp, key, value in graph_data.changed_parameters:
+        add_row('changed_parameter', timestamp=timestamp / 1e6, key=key, value=value)
+    for timestamp in graph_data.forward_transition_lines:
+        add_row('forward_transition', timestamp=timestamp)
+    for timestamp in graph_data.back_transition_lines:
+        add_row('back_transition', timestamp=timestamp)
+
+    for topic_str in sorted(graph_data.df_dict):
+        for field_str in graph_data.get_field_names(topic_str):
+            try:
+                statistics = get_field_statistics(graph_data.get_field(topic_str, field_str))
+            except Exception as ex:
+                print("WARNING: " + logfile_str + ": " + topic_str + "->" + field_str + " skipped: " + str(ex))
+                continue
+            add_row('field', topic=topic_str, field=field_str, **dict(zip(['count', 'nan_count', 'min', 'max', 'mean', 'std'], statistics)))
+
+
+# Write the table as Parquet if the output path ends with .parquet and a Parquet engine is installed, otherwise as CSV
+def write_table(df, output_path):
+    if output_path.endswith('.parquet'):
+        try:
+            df.to_parquet(output_path, index=False)
+            return output_path
+        except ImportError as ex:
+            output_path = os.path.splitext(output_path)[0] + '.csv'
+            print("WARNING: Failed to write Parquet, writing " + output_path + " instead: " + str(ex))
+
+    df.to_csv(output_path, index=False)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless summary of uLog files')
+    parser.add_argument('input_path', type=str, help='Path to directory tree or .ulg file to summarize')
+    parser.add_argument('-o', '--output', type=str, default='ulog_summary.csv', help='Output table, .parquet or .csv (default: ulog_summary.csv)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Number of logfiles processed in parallel (default: number of cores)')
+    args = parser.parse_args()
+
+    logfiles = find_logfiles(args.input_path)
+    if len(logfiles) == 0:
+        raise SystemExit("ERROR: No .ulg files found in " + args.input_path)
+
+    rows = []
+    if args.jobs > 1 and len(logfiles) > 1:
+        with create_process_pool(min(args.jobs, len(logfiles))) as executor:
+            for i, logfile_rows in enumerate(executor.map(summarize_logfile, logfiles)):
+                print("Processed {:d}/{:d}: {:s}".format(i + 1, len(logfiles), logfiles[i]))
+                rows += logfile_rows
+    else:
+        for i, logfile_str in enumerate(logfiles):
+            rows += summarize_logfile(logfile_str)
+            print("Processed {:d}/{:d}: {:s}".format(i + 1, len(logfiles), logfile_str))
+
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    output_path = write_table(df, args.output)
+    print("Wrote {:d} records of {:d} logfiles to {:s}".format(len(df), len(logfiles), output_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 import sys
-from scipy import signal
 
 from pyqtgraph.Qt import QtCore, QtGui
 import pyqtgraph as pg
@@ -8,9 +7,23 @@ from pathlib import Path
 import os
 from os.path import expanduser
 from GUIBackend import *
+from LogLoader import *
+from FieldSearchIndex import *
+from TopicTreeModel import *
+from SpectrumWorker import *
+from EventLinesItem import *
 import subprocess
 from functools import partial
 
+# Interval at which a followed logfile is checked for new messages [ms]
+FOLLOW_REFRESH_INTERVAL = 200
+# Maximum number of topics that are expanded to show the fields that match the filter
+MAX_EXPANDED_TOPICS = 10
+# Line styles of the curves of the overlaid logfiles in the main graph, in the order the logfiles are added
+OVERLAY_PEN_STYLES = [QtCore.Qt.DashLine, QtCore.Qt.DotLine, QtCore.Qt.DashDotLine, QtCore.Qt.DashDotDotLine]
+# Color map of the spectrogram from low to high power
+SPECTROGRAM_COLOR_MAP = pg.ColorMap([0.0, 0.25, 0.5, 0.75, 1.0], [(68, 1, 84), (59, 82, 139), (33, 145, 140), (94, 201, 98), (253, 231, 37)])
+
 
 class Window(QtGui.QMainWindow):
 
@@ -24,7 +37,21 @@ class Window(QtGui.QMainWindow):
         parser.add_argument('-kx', '--link_x_range', action='store_true', help='Link x axes of main and secondary graph')
         parser.add_argument('-ky', '--link_y_range', action='store_true', help='Link y axes of main and secondary graph')
         parser.add_argument('-k', '--link_xy_range', action='store_true', help='Link x and y axes of main and secondary graph')
+        parser.add_argument('-nc', '--no_cache', action='store_true', help='Do not use the on-disk cache of converted logfiles (~/.cache/ulog_explorer)')
+        parser.add_argument('-cs', '--cache_size', type=int, default=CACHE_SIZE >> 20, help='Maximum size of the on-disk cache in MB, the least recently used logfiles are removed (default: {:d})'.format(CACHE_SIZE >> 20))
+        parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes used to index large logfiles (default: number of cores)')
+        parser.add_argument('-f', '--follow', action='store_true', help='Follow the logfiles while they are written and extend the curves with new samples')
+        parser.add_argument('-s', '--stream', type=str, help='Display a live uLog stream from udp://host:port or a named pipe instead of a logfile, e.g. from ulog_replay.py')
+        parser.add_argument('-o', '--overlay', type=str, nargs='+', default=[], help='uLog files to overlay on the main graph, only the topics of the displayed curves are loaded')
+        parser.add_argument('-a', '--align', type=str, default='start', help='Event the overlaid logfiles are aligned on: {:s} or parameter:<name> (default: start)'.format(', '.join(ALIGNMENT_EVENTS)))
+        parser.add_argument('-as', '--align_secondary', type=str, help='Event or correlation:<topic>-><field> the secondary logfile is aligned on while the x axes are linked')
+        parser.add_argument('-ps', '--psd_segment_size', type=int, default=SEGMENT_SIZE, help='Number of samples per segment of the PSD and the spectrogram (default: {:d})'.format(SEGMENT_SIZE))
+        parser.add_argument('-sm', '--small_multiples', action='store_true', help='Display the overlaid logfiles in small multiples instead of in the main graph')
+        parser.add_argument('-sc', '--stream_capacity', type=int, default=STREAM_CAPACITY, help='Number of samples of every topic kept from the stream (default: {:d})'.format(STREAM_CAPACITY))
         args = parser.parse_args()
+        for alignment_str in [args.align, args.align_secondary]:
+            if alignment_str is not None and not is_valid_alignment(alignment_str):
+                parser.error('unknown alignment ' + alignment_str)
 
         link_x = False
         link_y = False
@@ -37,7 +64,7 @@ class Window(QtGui.QMainWindow):
             link_y = True
 
         # Initialize the GUI backend
-        self.backend = GUIBackend(link_x, link_y)
+        self.backend = GUIBackend(link_x, link_y, not args.no_cache, max(args.jobs, 1), max(args.stream_capacity, 1), max(args.cache_size, 0) << 20)
 
         self.main_widget = QtGui.QWidget(self)
         self.main_layout = QtGui.QHBoxLayout()
@@ -62,7 +89,7 @@ class Window(QtGui.QMainWindow):
 
         # Add filter box
         self.filter_box = QtGui.QLineEdit()
-        self.filter_box.setPlaceholderText('filter by topic name (F)')
+        self.filter_box.setPlaceholderText('filter by topic->field, ~fuzzy or /regex (F)')
         self.filter_box.textChanged.connect(self.callback_filter_box)
         self.selected_fields_and_button_layout.addWidget(self.filter_box)
 
@@ -72,13 +99,15 @@ class Window(QtGui.QMainWindow):
         self.tree_frame.resize(200, 700)
         self.tree_layout = QtGui.QVBoxLayout(self.tree_frame)
 
-        self.topic_tree_widget = QtGui.QTreeWidget(self.tree_frame)
-        self.topic_tree_widget.clear()
-        self.topic_tree_widget.setColumnCount(1)
-        self.topic_tree_widget.setHeaderHidden(True)
-        self.topic_tree_widget.setExpandsOnDoubleClick(False)
-        self.topic_tree_widget.itemClicked.connect(self.callback_topic_tree_clicked)
-        self.topic_tree_widget.setSelectionMode(QtGui.QAbstractItemView.NoSelection)
+        self.topic_tree_model = TopicTreeModel(self)
+        self.topic_tree_view = QtGui.QTreeView(self.tree_frame)
+        self.topic_tree_view.setModel(self.topic_tree_model)
+        self.topic_tree_view.setHeaderHidden(True)
+        self.topic_tree_view.setUniformRowHeights(True)
+        self.topic_tree_view.setExpandsOnDoubleClick(False)
+        self.topic_tree_view.clicked.connect(self.callback_topic_tree_clicked)
+        self.topic_tree_view.setSelectionMode(QtGui.QAbstractItemView.NoSelection)
+        self.set_tree_topic_fields([])
 
         self.main_graph_frame = QtGui.QFrame(self)
         self.main_graph_frame.setFrameShape(QtGui.QFrame.StyledPanel)
@@ -101,6 +130,41 @@ class Window(QtGui.QMainWindow):
         self.graph[1].showGrid(True, True, 0.5)
         self.graph[0].keyPressEvent = self.keyPressed_main_graph
         self.graph[1].keyPressEvent = self.keyPressed_secondary_graph
+        # Update the level of detail of the curves when the visible range changes
+        for graph_id in range(2):
+            self.graph[graph_id].getViewBox().sigXRangeChanged.connect(partial(self.update_curve_level_of_detail, graph_id))
+        # Window with a graph per overlaid logfile, displayed if the overlaid logfiles are shown in small multiples
+        self.overlay_window = QtGui.QWidget()
+        self.overlay_window.setWindowTitle('Overlaid logfiles')
+        self.overlay_layout = QtGui.QVBoxLayout(self.overlay_window)
+        # Dictionary of the graphs of the overlaid logfiles in the small multiples by graph id
+        self.overlay_graphs = {}
+        # Window with the PSD of the displayed curves and the spectrogram of one of them in the ROI or the visible range
+        self.spectrum_window = QtGui.QWidget()
+        self.spectrum_window.setWindowTitle('Spectral analysis')
+        spectrum_layout = QtGui.QVBoxLayout(self.spectrum_window)
+        self.psd_graph = pg.PlotWidget(labels={'bottom': 'frequency [Hz]', 'left': 'PSD [unit^2/Hz]'})
+        self.psd_graph.setLogMode(False, True)
+        self.psd_graph.showGrid(True, True, 0.5)
+        self.psd_graph.addLegend()
+        spectrum_layout.addWidget(self.psd_graph)
+        spectrogram_controls_layout = QtGui.QHBoxLayout()
+        spectrogram_controls_layout.addWidget(QtGui.QLabel('Spectrogram of'))
+        self.spectrogram_field_box = QtGui.QComboBox()
+        self.spectrogram_field_box.currentIndexChanged.connect(self.update_spectrogram)
+        spectrogram_controls_layout.addWidget(self.spectrogram_field_box, 1)
+        update_spectra_button = QtGui.QPushButton('Update')
+        update_spectra_button.clicked.connect(self.update_spectra)
+        spectrogram_controls_layout.addWidget(update_spectra_button)
+        spectrum_layout.addLayout(spectrogram_controls_layout)
+        self.spectrogram_graph = pg.PlotWidget(labels={'bottom': 'time [s]', 'left': 'frequency [Hz]'})
+        self.spectrogram_image = pg.ImageItem()
+        self.spectrogram_image.setLookupTable(SPECTROGRAM_COLOR_MAP.getLookupTable())
+        self.spectrogram_graph.addItem(self.spectrogram_image)
+        spectrum_layout.addWidget(self.spectrogram_graph)
+        # Worker calculating the spectra and the dictionary of the displayed spectra by (topic name, field name)
+        self.spectrum_worker = None
+        self.spectra = {}
 
         # Populate the graph context menu
         open_main_logfile_action_0 = QtGui.QAction('open main logfile (O)', self)
@@ -172,10 +236,54 @@ class Window(QtGui.QMainWindow):
             link_graph_range_action.triggered.connect(self.callback_toggle_link_xy_graph_range)
             self.graph[graph_id].scene().contextMenu.append(link_graph_range_action)
 
+            follow_logfile_action = QtGui.QAction('start/stop following logfile (W)', self)
+            follow_logfile_action.triggered.connect(self.callback_toggle_follow_logfile)
+            self.graph[graph_id].scene().contextMenu.append(follow_logfile_action)
+
+            toggle_events_action = QtGui.QAction('show/hide events (Z)', self)
+            toggle_events_action.triggered.connect(self.callback_toggle_events)
+            self.graph[graph_id].scene().contextMenu.append(toggle_events_action)
+
+            next_event_action = QtGui.QAction('jump to next event (])', self)
+            next_event_action.triggered.connect(partial(self.callback_jump_to_event, 1, graph_id))
+            self.graph[graph_id].scene().contextMenu.append(next_event_action)
+
+            previous_event_action = QtGui.QAction('jump to previous event ([)', self)
+            previous_event_action.triggered.connect(partial(self.callback_jump_to_event, -1, graph_id))
+            self.graph[graph_id].scene().contextMenu.append(previous_event_action)
+
         ROI_action = QtGui.QAction('show/hide ROI (A)', self)
         ROI_action.triggered.connect(self.callback_toggle_ROI)
         self.graph[0].scene().contextMenu.append(ROI_action)
 
+        spectrum_action = QtGui.QAction('show/hide spectral analysis (S)', self)
+        spectrum_action.triggered.connect(self.callback_toggle_spectrum_window)
+        self.graph[0].scene().contextMenu.append(spectrum_action)
+
+        align_secondary_logfile_action = QtGui.QAction('align secondary logfile (E)', self)
+        align_secondary_logfile_action.triggered.connect(self.callback_align_secondary_logfile)
+        self.graph[1].scene().contextMenu.append(align_secondary_logfile_action)
+
+        add_overlay_logfiles_action = QtGui.QAction('add overlay logfiles (G)', self)
+        add_overlay_logfiles_action.triggered.connect(lambda: self.callback_add_overlay_logfiles())
+        self.graph[0].scene().contextMenu.append(add_overlay_logfiles_action)
+
+        remove_overlay_logfiles_action = QtGui.QAction('remove overlay logfiles (Ctrl+G)', self)
+        remove_overlay_logfiles_action.triggered.connect(self.callback_remove_overlay_logfiles)
+        self.graph[0].scene().contextMenu.append(remove_overlay_logfiles_action)
+
+        cycle_overlay_alignment_action = QtGui.QAction('align overlays on next event (H)', self)
+        cycle_overlay_alignment_action.triggered.connect(self.callback_cycle_overlay_alignment)
+        self.graph[0].scene().contextMenu.append(cycle_overlay_alignment_action)
+
+        align_overlays_on_parameter_action = QtGui.QAction('align overlays on parameter change', self)
+        align_overlays_on_parameter_action.triggered.connect(self.callback_align_overlays_on_parameter)
+        self.graph[0].scene().contextMenu.append(align_overlays_on_parameter_action)
+
+        toggle_small_multiples_action = QtGui.QAction('overlay/small multiples (J)', self)
+        toggle_small_multiples_action.triggered.connect(self.callback_toggle_overlay_small_multiples)
+        self.graph[0].scene().contextMenu.append(toggle_small_multiples_action)
+
         # Define global shortcuts
         QtGui.QShortcut(QtGui.QKeySequence("F"), self, self.set_focus_to_filter)
         QtGui.QShortcut(QtGui.QKeySequence("T"), self, self.set_focus_to_tree)
@@ -195,18 +303,30 @@ class Window(QtGui.QMainWindow):
         QtGui.QShortcut(QtGui.QKeySequence("O"), self, lambda: self.callback_open_logfile(os.path.dirname(self.backend.graph_data[0].path_to_logfile)))
         QtGui.QShortcut(QtGui.QKeySequence("D"), self, self.callback_toggle_marker_line)
         QtGui.QShortcut(QtGui.QKeySequence("N"), self, self.callback_print_ROI_info)
+        QtGui.QShortcut(QtGui.QKeySequence("S"), self, self.callback_toggle_spectrum_window)
+        QtGui.QShortcut(QtGui.QKeySequence("W"), self, self.callback_toggle_follow_logfile)
+        QtGui.QShortcut(QtGui.QKeySequence("X"), self, lambda: self.callback_jump_to_flag_change(1))
+        QtGui.QShortcut(QtGui.QKeySequence("Shift+X"), self, lambda: self.callback_jump_to_flag_change(-1))
+        QtGui.QShortcut(QtGui.QKeySequence("Z"), self, self.callback_toggle_events)
+        QtGui.QShortcut(QtGui.QKeySequence("]"), self, lambda: self.callback_jump_to_event(1))
+        QtGui.QShortcut(QtGui.QKeySequence("["), self, lambda: self.callback_jump_to_event(-1))
+        QtGui.QShortcut(QtGui.QKeySequence("E"), self, self.callback_align_secondary_logfile)
+        QtGui.QShortcut(QtGui.QKeySequence("G"), self, lambda: self.callback_add_overlay_logfiles())
+        QtGui.QShortcut(QtGui.QKeySequence("Ctrl+G"), self, self.callback_remove_overlay_logfiles)
+        QtGui.QShortcut(QtGui.QKeySequence("H"), self, self.callback_cycle_overlay_alignment)
+        QtGui.QShortcut(QtGui.QKeySequence("J"), self, self.callback_toggle_overlay_small_multiples)
 
         # Define shortcuts for when the filter box is in focus
         QtGui.QShortcut(QtCore.Qt.Key_Return, self.filter_box, context=QtCore.Qt.WidgetShortcut, activated=self.callback_focus_on_topic_tree)
         QtGui.QShortcut(QtCore.Qt.Key_Down, self.filter_box, context=QtCore.Qt.WidgetShortcut, activated=self.callback_focus_on_topic_tree)
 
         # Define shortcuts for when the topic tree is in focus
-        QtGui.QShortcut(QtCore.Qt.Key_Return, self.topic_tree_widget, context=QtCore.Qt.WidgetShortcut, activated=self.callback_tree_enter)
+        QtGui.QShortcut(QtCore.Qt.Key_Return, self.topic_tree_view, context=QtCore.Qt.WidgetShortcut, activated=self.callback_tree_enter)
 
         self.main_graph_layout.addWidget(self.graph[0])
         self.secondary_graph_layout.addWidget(self.graph[1])
 
-        self.tree_layout.addWidget(self.topic_tree_widget)
+        self.tree_layout.addWidget(self.topic_tree_view)
 
         self.split_vertical_0 = QtGui.QSplitter(QtCore.Qt.Vertical)
         self.split_vertical_0.addWidget(self.selected_fields_frame)
@@ -217,8 +337,16 @@ class Window(QtGui.QMainWindow):
         self.split_graph_horizontal.addWidget(self.secondary_graph_frame)
         self.split_graph_horizontal.setSizes([1, 0])
 
+        # Table of the statistics of the curves in the ROI, a row per curve
+        self.ROI_statistics_table = QtGui.QTableWidget(0, len(STATISTICS_NAMES))
+        self.ROI_statistics_table.setHorizontalHeaderLabels(STATISTICS_NAMES)
+        self.ROI_statistics_table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.ROI_statistics_table.hide()
+
         self.split_vertical_1 = QtGui.QSplitter(QtCore.Qt.Vertical)
         self.split_vertical_1.addWidget(self.split_graph_horizontal)
+        self.split_vertical_1.addWidget(self.ROI_statistics_table)
+        self.split_vertical_1.setSizes([4, 1])
 
         self.split_horizontal_1 = QtGui.QSplitter(QtCore.Qt.Horizontal)
         self.split_horizontal_1.addWidget(self.split_vertical_1)
@@ -231,53 +359,216 @@ class Window(QtGui.QMainWindow):
         # Create ROI
         self.ROI_region = pg.LinearRegionItem()
         self.ROI_region.hide()
+        self.ROI_region.sigRegionChanged.connect(self.update_ROI_statistics)
+        self.ROI_region.sigRegionChangeFinished.connect(self.callback_ROI_moved)
         self.graph[0].addItem(self.ROI_region, ignoreBounds=True)
 
-        # Initiate the legend
-        self.backend.graph_data[0].legend_obj = self.graph[0].addLegend()
-        self.backend.graph_data[1].legend_obj = self.graph[1].addLegend()
-
         pg.setConfigOptions(antialias=True)
 
-        # Load main logfile from argument or file dialog
-        self.callback_open_logfile(args.input_path)
+        # Show the progress of the logfiles loaded in the background in the status bar
+        self.log_loaders = [None, None]
+        # True until a graph is auto ranged after its logfile is opened
+        self.auto_range_on_load = [False, False]
+        self.load_progress_bar = QtGui.QProgressBar()
+        self.load_progress_bar.setMaximumWidth(300)
+        self.cancel_load_btn = QtGui.QPushButton('Cancel')
+        self.cancel_load_btn.clicked.connect(self.callback_cancel_loading)
+        self.statusBar().addPermanentWidget(self.load_progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_load_btn)
+        self.load_progress_bar.hide()
+        self.cancel_load_btn.hide()
+
+        # Check the followed logfiles for new messages at a fixed rate
+        self.follow_timer = QtCore.QTimer(self)
+        self.follow_timer.setInterval(FOLLOW_REFRESH_INTERVAL)
+        self.follow_timer.timeout.connect(self.callback_follow_timer)
+
+        # Display the stream or load main logfile from argument or file dialog
+        if args.stream is not None:
+            self.callback_open_stream(args.stream)
+        else:
+            self.callback_open_logfile(args.input_path)
         # Try to open the secondary logfile if a second argument is given
         if args.input_path_seondary_logfile is not None:
             self.callback_open_secondary_logfile(args.input_path_seondary_logfile, True)
+        if args.follow and not self.backend.follow_logfile:
+            self.callback_toggle_follow_logfile()
+        self.backend.overlay_alignment = args.align
+        self.backend.overlay_small_multiples = args.small_multiples
+        self.backend.secondary_alignment = args.align_secondary
+        self.backend.spectrum_segment_size = max(args.psd_segment_size, MIN_SPECTRUM_SAMPLES)
+        if len(args.overlay) > 0:
+            self.callback_add_overlay_logfiles(args.overlay)
 
     def callback_print_ROI_info(self):
-        if self.backend.show_ROI:
-            minX, maxX = self.ROI_region.getRegion()
+        if self.backend.show_ROI and not self.is_indexing(0):
             print("########################################################")
+            for name, color, statistics in self.get_ROI_statistics():
+                if statistics is None:
+                    print(name + ' no samples in ROI')
+                    continue
+                print(name + ' ' + ', '.join(statistics_str + ': ' + self.format_statistic(statistics[statistics_str]) for statistics_str in STATISTICS_NAMES))
+
+    def callback_ROI_moved(self):
+        if self.spectrum_window.isVisible():
+            self.update_spectra()
+
+    def callback_toggle_spectrum_window(self):
+        if self.spectrum_window.isVisible():
+            self.stop_spectrum_worker()
+            self.spectrum_window.hide()
+        else:
+            self.spectrum_window.show()
+            self.update_spectra()
+
+    def stop_spectrum_worker(self):
+        if self.spectrum_worker is not None:
+            self.spectrum_worker.cancel()
+            self.spectrum_worker.wait()
+            self.spectrum_worker = None
+
+    def clear_spectra(self):
+        self.stop_spectrum_worker()
+        self.spectra = {}
+        self.psd_graph.clear()
+        self.spectrogram_image.clear()
+
+    # Calculate the spectra of the displayed curves of the main logfile in the ROI, or in the visible range if the ROI
+    # is hidden. They are calculated in a worker and displayed as they are ready
+    def update_spectra(self):
+        self.clear_spectra()
+        if self.is_indexing(0):
+            return
+
+        t0, t1 = self.ROI_region.getRegion() if self.backend.show_ROI else self.graph[0].viewRange()[0]
+        curves = [elem for elem in self.backend.curve_list if elem.selected_topic_and_field in self.backend.graph_data[0].curve_items]
+        spectrogram_field = self.spectrogram_field_box.currentData()
+        self.spectrogram_field_box.blockSignals(True)
+        self.spectrogram_field_box.clear()
+        for elem in curves:
+            self.spectrogram_field_box.addItem(elem.selected_topic_and_field, (elem.selected_topic, elem.selected_field))
+            if (elem.selected_topic, elem.selected_field) == spectrogram_field:
+                self.spectrogram_field_box.setCurrentIndex(self.spectrogram_field_box.count() - 1)
+        self.spectrogram_field_box.blockSignals(False)
+        if len(curves) == 0:
+            return
+
+        self.spectrum_worker = SpectrumWorker(self.backend.graph_data[0], [(elem.selected_topic, elem.selected_field) for elem in curves], t0, t1, self.backend.spectrum_segment_size)
+        self.spectrum_worker.sigSpectrum.connect(self.callback_spectrum_calculated)
+        self.spectrum_worker.sigDone.connect(self.callback_spectra_done)
+        self.spectrum_worker.start()
+        self.statusBar().showMessage('Calculating the spectra from {:.2f} s to {:.2f} s'.format(t0, t1))
+
+    def callback_spectrum_calculated(self, topic_str, field_str):
+        if self.sender() is not self.spectrum_worker:
+            return
+        spectrum = self.spectrum_worker.spectra[(topic_str, field_str)]
+        self.spectra[(topic_str, field_str)] = spectrum
+        name = CurveClass.get_name_combined(topic_str, field_str)
+        color = next((elem.color for elem in self.backend.curve_list if elem.selected_topic_and_field == name), (0, 0, 0))
+        # The constant component is removed from the segments, it is not displayed on the logarithmic axis
+        self.psd_graph.plot(spectrum.frequencies[1:], np.maximum(spectrum.psd[1:], np.finfo(float).tiny), pen=pg.mkPen(width=self.backend.line_width, color=QtGui.QColor(color[0], color[1], color[2])),
+                            name=name + (' (resampled)' if spectrum.resampled else ''))
+        if self.spectrogram_field_box.currentData() == (topic_str, field_str):
+            self.update_spectrogram()
+
+    def callback_spectra_done(self):
+        if self.sender() is not self.spectrum_worker:
+            return
+        self.statusBar().showMessage('Calculated {:d} spectra'.format(len(self.spectra)), 2000)
+
+    # Display the spectrogram of the field selected in the spectrum window in dB
+    def update_spectrogram(self):
+        spectrum = self.spectra.get(self.spectrogram_field_box.currentData())
+        if spectrum is None:
+            self.spectrogram_image.clear()
+            return
+
+        image = 10 * np.log10(np.maximum(spectrum.spectrogram, np.finfo(float).tiny))
+        if np.isnan(image).all():
+            self.spectrogram_image.clear()
+            return
+        # Columns without segments are displayed at the lowest power
+        image[np.isnan(image)] = np.nanmin(image)
+        self.spectrogram_image.setImage(image, autoLevels=True)
+        self.spectrogram_image.setRect(QtCore.QRectF(spectrum.column_times[0], 0, len(spectrum.column_times) * spectrum.column_duration, spectrum.frequencies[-1]))
+        self.spectrogram_graph.autoRange()
+
+    # Returns a list of (curve name, color, statistics) of the displayed curves of the main and the overlaid logfiles in
+    # the ROI, the statistics are None if a curve has no samples in the ROI
+    def get_ROI_statistics(self):
+        minX, maxX = self.ROI_region.getRegion()
+        graph_ids = [0] + (self.backend.overlay_graph_ids if not self.backend.overlay_small_multiples else [])
+        ROI_statistics = []
+        for graph_id in graph_ids:
+            graph_data = self.backend.graph_data[graph_id]
             for elem in self.backend.curve_list:
-                idx_min = np.argmax(self.backend.graph_data[0].df_dict[elem.selected_topic].index > minX)
-                idx_max = np.argmax(self.backend.graph_data[0].df_dict[elem.selected_topic].index > maxX) - 1
-                mean = np.mean(self.backend.graph_data[0].df_dict[elem.selected_topic][elem.selected_field].values[idx_min:idx_max])
-                delta_y = self.backend.graph_data[0].df_dict[elem.selected_topic][elem.selected_field].values[idx_max] - self.backend.graph_data[0].df_dict[elem.selected_topic][elem.selected_field].values[idx_min]
-                delta_t = self.backend.graph_data[0].df_dict[elem.selected_topic][elem.selected_field].index[idx_max] - self.backend.graph_data[0].df_dict[elem.selected_topic][elem.selected_field].index[idx_min]
-                diff = delta_y / delta_t
-                print(elem.selected_topic_and_field + ' mean: ' + str(mean) + ' diff: ' + str(diff))
+                if elem.selected_topic_and_field not in graph_data.curve_items:
+                    continue
+                range_statistics = graph_data.get_range_statistics(elem.selected_topic, elem.selected_field)
+                statistics = range_statistics.get_statistics(minX - graph_data.time_offset, maxX - graph_data.time_offset)
+                ROI_statistics.append((self.get_curve_name(graph_id, elem), QtGui.QColor(elem.color[0], elem.color[1], elem.color[2]), statistics))
+
+        return ROI_statistics
+
+    @staticmethod
+    def format_statistic(value):
+        if isinstance(value, int):
+            return str(value)
+
+        return '' if np.isnan(value) else '{:.6g}'.format(value)
+
+    # Display the statistics of the curves in the ROI in the table, they are updated while the ROI is dragged
+    def update_ROI_statistics(self):
+        if not self.backend.show_ROI or self.is_indexing(0):
+            return
+
+        ROI_statistics = self.get_ROI_statistics()
+        self.ROI_statistics_table.setRowCount(len(ROI_statistics))
+        for row, (name, color, statistics) in enumerate(ROI_statistics):
+            header_item = self.ROI_statistics_table.verticalHeaderItem(row)
+            if header_item is None:
+                header_item = QtGui.QTableWidgetItem()
+                self.ROI_statistics_table.setVerticalHeaderItem(row, header_item)
+            header_item.setText(name)
+            header_item.setData(QtCore.Qt.DecorationRole, color)
+            for column, statistics_str in enumerate(STATISTICS_NAMES):
+                item = self.ROI_statistics_table.item(row, column)
+                if item is None:
+                    item = QtGui.QTableWidgetItem()
+                    self.ROI_statistics_table.setItem(row, column, item)
+                item.setText(self.format_statistic(statistics[statistics_str]) if statistics is not None else '')
 
     def set_focus_to_filter(self):
         self.filter_box.clear()
         self.filter_box.setFocus()
-        self.topic_tree_widget.collapseAll()
+        self.topic_tree_view.collapseAll()
 
     def set_focus_to_tree(self):
-        self.topic_tree_widget.setFocus()
+        self.topic_tree_view.setFocus()
 
+    # Show the fields that match the filter and their topics. The matches are looked up in the search index of the tree
+    # and the model is given the shown fields at once, the topics that were expanded stay expanded
     def callback_filter_box(self, filter_str):
-        # Hide all topics
-        for i in range(self.topic_tree_widget.topLevelItemCount()):
-            self.topic_tree_widget.topLevelItem(i).setHidden(True)
-        # Show all topics that match the filter
-        top_level_items_to_show = self.topic_tree_widget.findItems(filter_str, QtCore.Qt.MatchContains)
-        for elem in top_level_items_to_show:
-            elem.setHidden(False)
-
-        # Expand if only one topic match the filter
-        if len(top_level_items_to_show) == 1:
-            top_level_items_to_show[0].setExpanded(True)
+        field_mask = self.field_search_index.search(filter_str)
+        if field_mask is None:
+            self.statusBar().showMessage('Invalid regular expression', 2000)
+            return
+
+        expanded_topics = [self.topic_tree_model.index(row, 0).data() for row in range(self.topic_tree_model.rowCount())
+                           if self.topic_tree_view.isExpanded(self.topic_tree_model.index(row, 0))]
+        self.topic_tree_model.set_shown_fields(field_mask if filter_str != '' else None)
+        # Expand if only one topic matches the filter, or the topics of which only some fields match
+        if self.topic_tree_model.rowCount() == 1:
+            expanded_topics.append(self.topic_tree_model.index(0, 0).data())
+        elif filter_str != '':
+            partially_shown_topics = [topic_str for topic_str, field_names in self.field_search_index.topic_fields if self.topic_tree_model.is_partially_shown(topic_str)]
+            if len(partially_shown_topics) <= MAX_EXPANDED_TOPICS:
+                expanded_topics += partially_shown_topics
+        for topic_str in expanded_topics:
+            topic_index = self.topic_tree_model.get_topic_index(topic_str)
+            if topic_index.isValid():
+                self.topic_tree_view.setExpanded(topic_index, True)
 
     def update_marker_line_status(self, graph_id=0):
         self.backend.graph_data[graph_id].marker_line_pos = self.backend.graph_data[graph_id].marker_line_obj.value()
@@ -301,14 +592,20 @@ class Window(QtGui.QMainWindow):
             self.update_marker_line_label(0)
 
     def update_marker_line_label(self, graph_id):
-        # TODO: check -1 index here
         marker_line_label = ''
         marker_line_label = marker_line_label + 't = {:0.2f}'.format(self.backend.graph_data[graph_id].marker_line_pos)
+        # Index of the sample at the marker line, looked up once per topic
+        sample_index = {}
         for elem in self.backend.curve_list:
             # Try to add the field to the label. Will fail if not present in secondary logfile
             try:
-                idx = np.argmax(self.backend.graph_data[graph_id].df_dict[elem.selected_topic].index > self.backend.graph_data[graph_id].marker_line_obj.value()) - 1
-                value = self.backend.graph_data[graph_id].df_dict[elem.selected_topic][elem.selected_field].values[idx]
+                if elem.selected_topic not in sample_index:
+                    sample_index[elem.selected_topic] = self.backend.graph_data[graph_id].get_sample_index(elem.selected_topic, self.backend.graph_data[graph_id].marker_line_obj.value() - self.backend.graph_data[graph_id].time_offset)
+                idx = sample_index[elem.selected_topic]
+                # Skip fields without samples before the marker line
+                if idx < 0:
+                    continue
+                value = self.backend.graph_data[graph_id].get_field(elem.selected_topic, elem.selected_field).values[idx]
                 value_str = str(value)
                 if elem.selected_field[-5:] == 'flags':
                     value_str = value_str + " ({0:b})".format(int(value))
@@ -332,11 +629,12 @@ class Window(QtGui.QMainWindow):
         else:
             return
 
-        idx_vehicle_position = np.argmax(self.backend.graph_data[0].df_dict[topic_str].index > self.backend.graph_data[0].marker_line_obj.value()) - 1
-        pos_x = self.backend.graph_data[0].df_dict[topic_str][x].values[idx_vehicle_position]
-        pos_y = self.backend.graph_data[0].df_dict[topic_str][y].values[idx_vehicle_position]
-        idx_vehicle_attitude = np.argmax(self.backend.graph_data[0].df_dict['vehicle_attitude_0'].index > self.backend.graph_data[0].marker_line_obj.value()) - 1
-        yaw = self.backend.graph_data[0].df_dict['vehicle_attitude_0']['q_yaw312* [deg]'].values[idx_vehicle_attitude]
+        marker_line_time = self.backend.graph_data[0].marker_line_obj.value()
+        idx_vehicle_position = max(self.backend.graph_data[0].get_sample_index(topic_str, marker_line_time), 0)
+        pos_x = self.backend.graph_data[0].get_field(topic_str, x).values[idx_vehicle_position]
+        pos_y = self.backend.graph_data[0].get_field(topic_str, y).values[idx_vehicle_position]
+        idx_vehicle_attitude = max(self.backend.graph_data[0].get_sample_index('vehicle_attitude_0', marker_line_time), 0)
+        yaw = self.backend.graph_data[0].get_field('vehicle_attitude_0', 'q_yaw312* [deg]').values[idx_vehicle_attitude]
 
         try:
             self.graph[1].removeItem(self.backend.arrow_obj)
@@ -355,23 +653,25 @@ class Window(QtGui.QMainWindow):
         except:
             pass
         try:
-            idx_position_setpoint_triplet = np.argmax(self.backend.graph_data[0].df_dict['position_setpoint_triplet_0'].index > self.backend.graph_data[0].marker_line_obj.value()) - 1
-            north_setpoint = self.backend.graph_data[0].df_dict['position_setpoint_triplet_0']['current.lat_m*'].values[idx_position_setpoint_triplet]
-            east_setpoint = self.backend.graph_data[0].df_dict['position_setpoint_triplet_0']['current.lon_m*'].values[idx_position_setpoint_triplet]
+            idx_position_setpoint_triplet = max(self.backend.graph_data[0].get_sample_index('position_setpoint_triplet_0', marker_line_time), 0)
+            north_setpoint = self.backend.graph_data[0].get_field('position_setpoint_triplet_0', 'current.lat_m*').values[idx_position_setpoint_triplet]
+            east_setpoint = self.backend.graph_data[0].get_field('position_setpoint_triplet_0', 'current.lon_m*').values[idx_position_setpoint_triplet]
             self.backend.current_sp_marker_obj = self.graph[1].plot([None, east_setpoint], [None, north_setpoint], name='position_setpoint_marker', pen=None, symbol='o', symbolBrush='r')
         except:
             pass
 
     def callback_open_logfile(self, input_path=expanduser('~'), graph_id=0):
         if Path(input_path).is_file() and Path(input_path).suffix == ".ulg":
+            self.stop_log_loader(graph_id)
+            if isinstance(self.backend.graph_data[graph_id], StreamGraphData):
+                self.fronted_cleanup()
+                self.backend.graph_data[graph_id].close()
+                self.backend.graph_data[graph_id] = GraphData()
             self.backend.graph_data[graph_id].path_to_logfile = input_path
             self.fronted_cleanup()
-            self.backend.load_ulog_to_graph_data(self.backend.graph_data[graph_id].path_to_logfile, graph_id)
             if graph_id == 0:
-                self.load_logfile_to_tree()
-            self.update_frontend()
-            self.graph[graph_id].autoRange()
-            self.set_marker_line_in_middle(graph_id)
+                self.set_tree_topic_fields([])
+            self.start_log_loader(graph_id)
             return True
 
         else:
@@ -391,13 +691,158 @@ class Window(QtGui.QMainWindow):
             else:
                 return False
 
+    # Display a live stream in the main graph. It is read by the follow timer, which is started if it is not running
+    def callback_open_stream(self, source_str):
+        self.stop_log_loader(0)
+        self.fronted_cleanup()
+        self.set_tree_topic_fields([])
+        self.backend.graph_data[0].close()
+        self.backend.graph_data[0] = StreamGraphData(self.backend.stream_capacity)
+        try:
+            self.backend.graph_data[0].open_stream(source_str)
+        except Exception as ex:
+            print("ERROR: Failed to open stream " + source_str + ": " + str(ex))
+            self.statusBar().showMessage("Failed to open stream " + source_str)
+            return False
+
+        self.backend.graph_data[0].path_to_logfile = source_str
+        if not self.backend.follow_logfile:
+            self.callback_toggle_follow_logfile()
+        return True
+
+    # Load the logfile of a graph in a background thread. The topics of the displayed curves are decoded first, overlaid
+    # logfiles only decode them
+    def start_log_loader(self, graph_id, priority_topics=None, indexed=False):
+        if priority_topics is None:
+            priority_topics = [elem.selected_topic for elem in self.backend.curve_list]
+        loader = LogLoader(self.backend, graph_id, priority_topics, graph_id < FIRST_OVERLAY_ID, indexed)
+        loader.sigIndexed.connect(self.callback_logfile_indexed)
+        loader.sigTopicLoaded.connect(self.callback_topic_loaded)
+        loader.sigDone.connect(self.callback_logfile_loaded)
+        loader.sigFailed.connect(self.callback_logfile_failed)
+        self.log_loaders[graph_id] = loader
+        if graph_id < FIRST_OVERLAY_ID:
+            self.auto_range_on_load[graph_id] = True
+        self.update_load_progress()
+        loader.start()
+
+    def stop_log_loader(self, graph_id):
+        if self.log_loaders[graph_id] is not None:
+            self.log_loaders[graph_id].cancel()
+            self.log_loaders[graph_id].wait()
+            self.log_loaders[graph_id] = None
+
+    # True while the topic and field names of the logfile of a graph are not known
+    def is_indexing(self, graph_id):
+        return self.log_loaders[graph_id] is not None and not self.log_loaders[graph_id].indexed
+
+    def is_loading(self, graph_id):
+        return self.log_loaders[graph_id] is not None and self.log_loaders[graph_id].isRunning()
+
+    # Signals of a stopped loader can still be queued when the next logfile is already loading or the overlaid logfiles
+    # were removed, they are ignored
+    def is_current_loader(self, graph_id):
+        return graph_id < len(self.log_loaders) and self.sender() is self.log_loaders[graph_id]
+
+    # Decode a topic of a logfile in its loader, a loader is started for an overlaid logfile that is not loading
+    def load_topic(self, graph_id, topic_str):
+        if self.is_loading(graph_id) and self.log_loaders[graph_id].prioritize(topic_str):
+            return
+        if graph_id >= FIRST_OVERLAY_ID:
+            self.start_log_loader(graph_id, [topic_str], True)
+
+    def callback_logfile_indexed(self, graph_id):
+        if not self.is_current_loader(graph_id):
+            return
+        if graph_id == 0:
+            self.load_logfile_to_tree()
+            self.align_overlay_logfiles()
+        elif graph_id >= FIRST_OVERLAY_ID:
+            self.align_overlay_logfiles([graph_id])
+        self.update_frontend()
+        self.auto_range_loaded_graph(graph_id)
+        self.update_load_progress()
+
+    def callback_topic_loaded(self, graph_id, topic_str):
+        if not self.is_current_loader(graph_id):
+            return
+        if any(elem.selected_topic == topic_str for elem in self.backend.curve_list):
+            self.update_frontend()
+            self.auto_range_loaded_graph(graph_id)
+        self.update_load_progress()
+
+    def callback_logfile_loaded(self, graph_id):
+        if not self.is_current_loader(graph_id):
+            return
+        self.log_loaders[graph_id] = None
+        self.update_frontend()
+        self.auto_range_loaded_graph(graph_id, True)
+        self.update_load_progress()
+
+    def callback_logfile_failed(self, graph_id, message):
+        if not self.is_current_loader(graph_id):
+            return
+        print("ERROR: Failed to open " + self.backend.graph_data[graph_id].path_to_logfile + ": " + message)
+        self.log_loaders[graph_id] = None
+        self.update_load_progress()
+        self.statusBar().showMessage("Failed to open " + self.backend.graph_data[graph_id].path_to_logfile)
+
+    def callback_cancel_loading(self):
+        for loader in self.log_loaders:
+            if loader is not None:
+                loader.cancel()
+
+    # Auto range a graph after its logfile is opened, once the displayed curves are plotted
+    def auto_range_loaded_graph(self, graph_id, force=False):
+        if graph_id >= FIRST_OVERLAY_ID or not self.auto_range_on_load[graph_id]:
+            return
+        num_curves = len(self.backend.curve_list) if graph_id == 0 or self.split_screen_mode() == 'secondary_logfile' else 0
+        if force or len(self.backend.graph_data[graph_id].curve_items) >= num_curves:
+            self.graph[graph_id].autoRange()
+            self.set_marker_line_in_middle(graph_id)
+            self.auto_range_on_load[graph_id] = False
+
+    def update_load_progress(self):
+        loaders = [loader for loader in self.log_loaders if loader is not None]
+        if len(loaders) == 0:
+            self.load_progress_bar.hide()
+            self.cancel_load_btn.hide()
+            self.statusBar().clearMessage()
+            return
+
+        self.load_progress_bar.setRange(0, max(sum(loader.num_topics for loader in loaders), 1))
+        self.load_progress_bar.setValue(sum(loader.num_loaded_topics for loader in loaders))
+        self.load_progress_bar.show()
+        self.cancel_load_btn.show()
+        messages = []
+        for loader in loaders:
+            if loader.indexed:
+                messages.append('Loading topics of {0}: {1}/{2}'.format(loader.logfile_str, loader.num_loaded_topics, loader.num_topics))
+            else:
+                messages.append('Indexing ' + loader.logfile_str)
+        self.statusBar().showMessage(', '.join(messages))
+
+    def closeEvent(self, event):
+        for graph_id in range(len(self.log_loaders)):
+            self.stop_log_loader(graph_id)
+        self.overlay_window.close()
+        self.stop_spectrum_worker()
+        self.spectrum_window.close()
+        super(Window, self).closeEvent(event)
+
     def load_logfile_to_tree(self):
-        self.topic_tree_widget.clear()
-        for topic_str, fields_df in sorted(self.backend.graph_data[0].df_dict.items()):
-            current_topic = QtGui.QTreeWidgetItem(self.topic_tree_widget, [topic_str])
-            for field in sorted(list(fields_df)):
-                current_field = QtGui.QTreeWidgetItem(current_topic, [field])
-                # current_field.setToolTip(0, field) # TODO: add field description
+        # Only the field names are needed here, the topics are decoded when they are plotted
+        topic_fields = [(topic_str, sorted(self.backend.graph_data[0].get_field_names(topic_str))) for topic_str in sorted(self.backend.graph_data[0].df_dict)]
+        self.set_tree_topic_fields(topic_fields)
+        # TODO: add field descriptions as tool tips of the model
+        # A tree that is loaded again keeps the filter
+        if self.filter_box.text() != '':
+            self.callback_filter_box(self.filter_box.text())
+
+    # Set the topics and fields of the tree and their search index, all rows are shown and collapsed
+    def set_tree_topic_fields(self, topic_fields):
+        self.field_search_index = FieldSearchIndex(topic_fields)
+        self.topic_tree_model.set_topic_fields(topic_fields)
 
     def callback_open_secondary_logfile(self, input_path='', force=False):
         # This is a hack for now
@@ -414,7 +859,139 @@ class Window(QtGui.QMainWindow):
                 self.split_graph_horizontal.setSizes([1, 1])
 
             self.update_frontend()
-            self.graph[1].autoRange()
+
+    # Choose what the secondary logfile is aligned on while the x axes are linked, an event or the cross-correlation of
+    # a field. The first displayed field is offered for the cross-correlation
+    def callback_align_secondary_logfile(self):
+        alignment_strs = ['none'] + ALIGNMENT_EVENTS + [CORRELATION_ALIGNMENT_PREFIX + elem.selected_topic_and_field for elem in self.backend.curve_list[:1]]
+        current = alignment_strs.index(self.backend.secondary_alignment) if self.backend.secondary_alignment in alignment_strs else 0
+        alignment_str, ok = QtGui.QInputDialog.getItem(self, 'Align secondary logfile', 'Align on (or parameter:<name>, correlation:<topic>-><field>):', alignment_strs, current, True)
+        if not ok:
+            return
+        if alignment_str != 'none' and not is_valid_alignment(alignment_str):
+            print("ERROR: Unknown alignment " + alignment_str)
+            return
+
+        self.backend.secondary_alignment = None if alignment_str == 'none' else alignment_str
+        if not self.backend.link_x_range:
+            self.statusBar().showMessage('The secondary logfile is aligned while the x axes are linked (K)', 2000)
+        self.update_frontend()
+
+    # Overlay logfiles on the main graph, from a file dialog if no logfiles are given
+    def callback_add_overlay_logfiles(self, logfile_strs=None):
+        if logfile_strs is None:
+            logfile_strs = QtGui.QFileDialog.getOpenFileNames(self, 'Add overlay logfiles', os.path.dirname(self.backend.graph_data[0].path_to_logfile), 'Log Files (*.ulg)')
+            if isinstance(logfile_strs, tuple):
+                logfile_strs = logfile_strs[0]
+
+        # Every overlaid logfile is indexed by its own loader, it is aligned and plotted when it is indexed
+        for logfile_str in logfile_strs:
+            self.log_loaders.append(None)
+            self.start_log_loader(self.backend.add_overlay_logfile(logfile_str), [elem.selected_topic for elem in self.backend.curve_list])
+        self.update_overlay_graphs()
+        self.statusBar().showMessage('{:d} overlaid logfiles'.format(len(self.backend.overlay_graph_ids)), 2000)
+
+    def callback_remove_overlay_logfiles(self):
+        for graph_id in self.backend.overlay_graph_ids:
+            self.stop_log_loader(graph_id)
+        del self.log_loaders[FIRST_OVERLAY_ID:]
+        self.remove_overlay_curves()
+        self.backend.remove_overlay_logfiles()
+        self.update_load_progress()
+        self.update_overlay_graphs()
+
+    def callback_cycle_overlay_alignment(self):
+        if self.backend.overlay_alignment in ALIGNMENT_EVENTS:
+            self.backend.overlay_alignment = ALIGNMENT_EVENTS[(ALIGNMENT_EVENTS.index(self.backend.overlay_alignment) + 1) % len(ALIGNMENT_EVENTS)]
+        else:
+            self.backend.overlay_alignment = ALIGNMENT_EVENTS[0]
+        self.align_overlay_logfiles()
+        self.update_frontend()
+        self.statusBar().showMessage('Overlaid logfiles aligned on ' + self.backend.overlay_alignment, 2000)
+
+    def callback_align_overlays_on_parameter(self):
+        parameter_str, ok = QtGui.QInputDialog.getText(self, 'Align overlaid logfiles', 'Parameter name:')
+        if ok and parameter_str:
+            self.backend.overlay_alignment = PARAMETER_EVENT_PREFIX + parameter_str
+            self.align_overlay_logfiles()
+            self.update_frontend()
+
+    def callback_toggle_overlay_small_multiples(self):
+        self.remove_overlay_curves()
+        self.backend.overlay_small_multiples = not self.backend.overlay_small_multiples
+        self.update_overlay_graphs()
+        self.update_frontend()
+
+    # Align the overlaid logfiles with the main logfile once the names of both are known, their curves are plotted
+    # again. Logfiles that are still indexed or could not be opened are skipped
+    def align_overlay_logfiles(self, graph_ids=None):
+        if graph_ids is None:
+            graph_ids = self.backend.overlay_graph_ids
+        graph_ids = [graph_id for graph_id in graph_ids if not self.is_indexing(graph_id) and len(self.backend.graph_data[graph_id].df_dict) > 0]
+        if len(graph_ids) == 0 or self.is_indexing(0):
+            return
+
+        self.remove_overlay_curves(graph_ids)
+        self.backend.align_overlay_logfiles(graph_ids)
+        self.update_overlay_graphs()
+
+    def remove_overlay_curves(self, graph_ids=None):
+        if graph_ids is None:
+            graph_ids = self.backend.overlay_graph_ids
+        for graph_id in graph_ids:
+            self.remove_curves(graph_id, list(self.backend.graph_data[graph_id].curve_items))
+            if self.backend.overlay_small_multiples:
+                self.update_legend(graph_id, False)
+
+    # Create a graph in the small multiples for every overlaid logfile and show the small multiples if they are used.
+    # The graphs are linked to the range of the main graph
+    def update_overlay_graphs(self):
+        for graph_id in list(self.overlay_graphs):
+            if graph_id not in self.backend.overlay_graph_ids:
+                self.overlay_layout.removeWidget(self.overlay_graphs[graph_id])
+                self.overlay_graphs.pop(graph_id).deleteLater()
+
+        for graph_id in self.backend.overlay_graph_ids:
+            if graph_id not in self.overlay_graphs:
+                graph = pg.PlotWidget()
+                graph.showGrid(True, True, 0.5)
+                graph.setXLink(self.graph[0])
+                graph.getViewBox().sigXRangeChanged.connect(partial(self.update_curve_level_of_detail, graph_id))
+                self.overlay_layout.addWidget(graph)
+                self.overlay_graphs[graph_id] = graph
+            graph_data = self.backend.graph_data[graph_id]
+            self.overlay_graphs[graph_id].setTitle('{:s} ({:+.2f} s)'.format(os.path.basename(graph_data.path_to_logfile), graph_data.time_offset))
+
+        if self.backend.overlay_small_multiples and len(self.overlay_graphs) > 0:
+            self.overlay_window.show()
+        else:
+            self.overlay_window.hide()
+
+    # Returns the graph the curves of a logfile are displayed in. Overlaid logfiles are displayed in the main graph or
+    # in their graph of the small multiples
+    def get_graph(self, graph_id):
+        if graph_id < FIRST_OVERLAY_ID:
+            return self.graph[graph_id]
+        if self.backend.overlay_small_multiples:
+            return self.overlay_graphs[graph_id]
+
+        return self.graph[0]
+
+    # Returns the name of a curve in the legend, curves of overlaid logfiles in the main graph are named after their
+    # logfile
+    def get_curve_name(self, graph_id, elem):
+        if graph_id < FIRST_OVERLAY_ID or self.backend.overlay_small_multiples:
+            return elem.selected_topic_and_field
+
+        return elem.selected_topic_and_field + ' (' + os.path.basename(self.backend.graph_data[graph_id].path_to_logfile) + ')'
+
+    # Returns the pen of a curve, the curves of overlaid logfiles in the main graph have a line style per logfile
+    def get_pen(self, graph_id, color_brush):
+        pen = pg.mkPen(width=self.backend.line_width, color=color_brush)
+        if graph_id >= FIRST_OVERLAY_ID and not self.backend.overlay_small_multiples:
+            pen.setStyle(OVERLAY_PEN_STYLES[(graph_id - FIRST_OVERLAY_ID) % len(OVERLAY_PEN_STYLES)])
+
+        return pen
 
     def callback_toggle_2D_trajectory_graph(self):
         self.unlink_graph_range()
@@ -492,24 +1069,53 @@ class Window(QtGui.QMainWindow):
             self.update_frontend()
             self.set_marker_line_in_middle(graph_id)
 
-    def plot_parameter_changes(self, graph_id=0):
-        last_timestamp = 0
-        last_label = ''
+    # Returns the times and labels of the parameter change lines, the changes at the same time share one line
+    def get_parameter_change_lines(self, graph_id=0):
+        times = []
+        labels = []
         for elem in self.backend.graph_data[graph_id].changed_parameters:
-            timestamp = elem[0] / 1e6
+            timestamp = elem[0] / 1e6 + self.backend.graph_data[graph_id].time_offset
             label = elem[1] + ": " + str(elem[2])
-            if timestamp == last_timestamp:
-                label = label + "\n" + last_label
-                self.backend.graph_data[graph_id].parameter_lines_obj[-1].label.textItem.setPlainText(label)
+            if len(times) > 0 and timestamp == times[-1]:
+                labels[-1] = label + "\n" + labels[-1]
             else:
-                parameter_changed_line = pg.InfiniteLine(angle=90, movable=False, pos=timestamp, pen=pg.mkPen(color='k'), label=label,
-                                                         labelOpts={'position': 0.8, 'color': (0, 0, 0), 'fill': (200, 200, 200, 100), 'movable': True})
-                parameter_changed_line.show()
-                self.graph[graph_id].addItem(parameter_changed_line, ignoreBounds=True)
-                self.backend.graph_data[graph_id].parameter_lines_obj.append(parameter_changed_line)
+                times.append(timestamp)
+                labels.append(label)
+        return times, labels
+
+    def callback_toggle_events(self):
+        self.backend.show_events = not self.backend.show_events
+        self.update_frontend()
 
-            last_timestamp = timestamp
-            last_label = label
+    # Move the marker line to the next event of the event index after it, or to the previous event before it if
+    # direction is negative. The view is centered on the event if it is not visible. Without graph_id the graph in focus
+    # is used
+    def callback_jump_to_event(self, direction, graph_id=None):
+        if graph_id is None:
+            graph_id = 1 if self.graph[1].hasFocus() and self.backend.secondary_graph_mode == 'secondary_logfile' else 0
+        if self.is_loading(graph_id):
+            return
+        graph_data = self.backend.graph_data[graph_id]
+        if not graph_data.show_marker_line:
+            graph_data.show_marker_line = True
+            self.update_frontend()
+
+        event_index = graph_data.get_event_index()
+        # Events within a microsecond of the marker line are at the marker line
+        idx = event_index.get_next_event(graph_data.marker_line_obj.value() - graph_data.time_offset + direction * 1e-6, direction)
+        if idx is None:
+            self.statusBar().showMessage('No ' + ('next' if direction > 0 else 'previous') + ' event', 2000)
+            return
+        event_time = event_index.times[idx] + graph_data.time_offset
+        x_range = self.graph[graph_id].viewRange()[0]
+        if not x_range[0] <= event_time <= x_range[1]:
+            half_width = (x_range[1] - x_range[0]) / 2
+            self.graph[graph_id].setXRange(event_time - half_width, event_time + half_width, padding=0)
+        graph_data.marker_line_obj.setValue(event_time)
+        self.update_marker_line_status(graph_id)
+        # Events at the same time are reached together
+        labels = [event_index.labels[event_idx] for event_idx in event_index.get_events(event_index.times[idx], event_index.times[idx]).tolist()]
+        self.statusBar().showMessage('t = {:.3f} s: {:s}'.format(event_time, ', '.join(labels)), 5000)
 
     def callback_toggle_changed_parameters(self):
         self.backend.show_changed_parameters = not self.backend.show_changed_parameters
@@ -555,6 +1161,83 @@ class Window(QtGui.QMainWindow):
         self.graph[1].getViewBox().setXLink(None)
         self.graph[1].getViewBox().setYLink(None)
 
+    def callback_toggle_follow_logfile(self):
+        self.backend.follow_logfile = not self.backend.follow_logfile
+        if self.backend.follow_logfile:
+            self.follow_timer.start()
+            self.statusBar().showMessage('Following logfile', 2000)
+        else:
+            self.follow_timer.stop()
+            self.statusBar().showMessage('Stopped following logfile', 2000)
+
+    # Read the messages appended to the displayed logfiles since the last refresh. Logfiles that are still loading
+    # are checked once they are loaded
+    def callback_follow_timer(self):
+        for graph_id in range(2):
+            graph_data = self.backend.graph_data[graph_id]
+            if graph_id == 1 and self.split_screen_mode() != 'secondary_logfile':
+                continue
+            if self.is_loading(graph_id):
+                continue
+
+            num_topics = len(graph_data.df_dict)
+            # The samples of a stream are overwritten by the update, the end of the curves is taken before
+            old_end = max([curve_items.time[-1] for curve_items in graph_data.curve_items.values() if len(curve_items.time) > 0], default=None)
+            try:
+                updated_topics = graph_data.update()
+            except Exception as ex:
+                print("ERROR: Failed to follow " + graph_data.path_to_logfile + ": " + str(ex))
+                continue
+            if len(updated_topics) == 0:
+                continue
+
+            if graph_id == 0 and len(graph_data.df_dict) != num_topics:
+                self.load_logfile_to_tree()
+                self.update_frontend()
+            # The line items are only changed if lines were added
+            self.update_parameter_lines(graph_id, self.backend.show_changed_parameters)
+            self.update_transition_lines(graph_id, self.backend.show_transition_lines)
+            self.update_event_lines(graph_id, self.backend.show_events)
+            self.extend_curves(graph_id, updated_topics, old_end)
+            if graph_id == 0:
+                self.update_ROI_statistics()
+
+    # Extend the displayed curves of the updated topics with their new samples. The view scrolls with the new samples
+    # if its right edge was at or after the last sample
+    def extend_curves(self, graph_id, updated_topics, old_end):
+        graph_data = self.backend.graph_data[graph_id]
+        extended_curves = [elem for elem in self.backend.curve_list
+                           if elem.selected_topic in updated_topics and elem.selected_topic_and_field in graph_data.curve_items]
+        if len(extended_curves) == 0:
+            return
+
+        x_range = self.graph[graph_id].viewRange()[0]
+        # Topics that were loaded again are plotted again
+        self.remove_curves(graph_id, [elem.selected_topic_and_field for elem in extended_curves if not graph_data.df_dict.is_loaded(elem.selected_topic)])
+        for elem in extended_curves:
+            if elem.selected_topic_and_field in graph_data.curve_items:
+                self.extend_curve(graph_id, elem)
+        self.update_curves(graph_id, self.backend.curve_list)
+
+        new_end = max(curve_items.time[-1] for curve_items in graph_data.curve_items.values() if len(curve_items.time) > 0)
+        if old_end is not None and x_range[1] >= old_end and new_end > old_end:
+            self.graph[graph_id].setXRange(x_range[0] + new_end - old_end, x_range[1] + new_end - old_end, padding=0)
+        else:
+            self.update_curve_level_of_detail(graph_id)
+
+    # The pyramid of the curve and its nan runs are extended with the topic. Rescaled curves are rescaled again since
+    # their range can change
+    def extend_curve(self, graph_id, elem):
+        graph_data = self.backend.graph_data[graph_id]
+        curve_items = graph_data.curve_items[elem.selected_topic_and_field]
+        pyramid = graph_data.get_min_max_pyramid(elem.selected_topic, elem.selected_field)
+        curve_items.pyramid = pyramid
+        curve_items.time = graph_data.df_dict[elem.selected_topic].index.values
+        curve_items.y_value = self.get_displayed_values(graph_id, elem)
+
+        if curve_items.nan_curve is None and len(pyramid.nan_runs) > 0:
+            self.add_nan_curve(graph_id, elem, curve_items, QtGui.QColor(elem.color[0], elem.color[1], elem.color[2]))
+
     def callback_ulog_info(self, graph_id):
         self.backend.graph_data[graph_id].ulog_info()
 
@@ -564,31 +1247,23 @@ class Window(QtGui.QMainWindow):
     def callback_ulog_params(self, graph_id):
         print("ulog_params " + self.backend.graph_data[graph_id].path_to_logfile + " | grep ")
 
+    # Remove everything displayed in the graphs, used before a logfile is opened
     def fronted_cleanup(self):
-        self.graph[0].clearPlots()
-        self.graph[1].clearPlots()
-        self.graph[1].setAspectLocked(lock=False, ratio=1)
+        self.remove_overlay_curves()
+        self.clear_spectra()
+        for graph_id in range(2):
+            self.remove_curves(graph_id, list(self.backend.graph_data[graph_id].curve_items))
+            self.update_legend(graph_id, False)
+            self.remove_event_lines(graph_id)
+            self.update_marker_line(graph_id, False)
+            self.graph[graph_id].setTitle(None)
+        self.update_trajectory_graph(False)
         self.selected_fields_list_widget.clear()
         self.selected_fields_list_widget.clearSelection()
-        self.topic_tree_widget.clearSelection()
-        self.backend.graph_data[0].legend_obj.close()
-        self.backend.graph_data[1].legend_obj.close()
+        self.topic_tree_view.clearSelection()
         self.ROI_region.hide()
-        self.graph[0].setTitle(None)
-        self.graph[1].setTitle(None)
+        self.ROI_statistics_table.hide()
         self.unlink_graph_range()
-        # Remove the transition lines
-        for graph_id in range(2):
-            for elem in self.backend.graph_data[graph_id].ft_lines_obj:
-                self.graph[graph_id].removeItem(elem)
-            for elem in self.backend.graph_data[graph_id].bt_lines_obj:
-                self.graph[graph_id].removeItem(elem)
-            # Remove the parameter changes
-            for elem in self.backend.graph_data[graph_id].parameter_lines_obj:
-                self.graph[graph_id].removeItem(elem)
-
-            # Remove marker lines
-            self.graph[graph_id].removeItem(self.backend.graph_data[graph_id].marker_line_obj)
 
     def callback_auto_range(self):
         if self.graph[1].hasFocus():
@@ -698,6 +1373,41 @@ class Window(QtGui.QMainWindow):
             self.move_marker_line(1, 'right')
             return
 
+    # Move the marker line to the next change of a displayed flag field or bit after it, or to the previous change
+    # before it if direction is negative. The marker line is shown if it is hidden
+    def callback_jump_to_flag_change(self, direction):
+        if self.graph[1].hasFocus() and self.backend.secondary_graph_mode == 'secondary_logfile':
+            graph_id = 1
+        else:
+            graph_id = 0
+        graph_data = self.backend.graph_data[graph_id]
+        if not graph_data.show_marker_line:
+            graph_data.show_marker_line = True
+            self.update_frontend()
+
+        # Changes within a microsecond of the marker line are at the marker line
+        marker_line_time = graph_data.marker_line_obj.value() - graph_data.time_offset + direction * 1e-6
+        change_times = []
+        for elem in self.backend.curve_list:
+            if not graph_data.is_flag_field(elem.selected_topic, elem.selected_field):
+                continue
+            times = graph_data.get_flag_changes(elem.selected_topic, elem.selected_field)
+            if direction > 0:
+                idx = np.searchsorted(times, marker_line_time, side='right')
+                if idx < len(times):
+                    change_times.append(times[idx])
+            else:
+                idx = np.searchsorted(times, marker_line_time, side='left') - 1
+                if idx >= 0:
+                    change_times.append(times[idx])
+
+        if len(change_times) == 0:
+            self.statusBar().showMessage('No ' + ('next' if direction > 0 else 'previous') + ' change of a displayed flag field', 2000)
+            return
+        change_time = min(change_times) if direction > 0 else max(change_times)
+        graph_data.marker_line_obj.setValue(change_time + graph_data.time_offset)
+        self.update_marker_line_status(graph_id)
+
     def move_marker_line(self, graph_id, direction):
         if direction == 'left':
             step = -1
@@ -718,27 +1428,21 @@ class Window(QtGui.QMainWindow):
         self.update_frontend()
 
     def callback_focus_on_topic_tree(self):
-        self.topic_tree_widget.setFocus()
-        for i in range(self.topic_tree_widget.topLevelItemCount()):
-            if not self.topic_tree_widget.topLevelItem(i).isHidden():
-                self.topic_tree_widget.setCurrentItem(self.topic_tree_widget.topLevelItem(i))
-                return
+        self.topic_tree_view.setFocus()
+        if self.topic_tree_model.rowCount() > 0:
+            self.topic_tree_view.setCurrentIndex(self.topic_tree_model.index(0, 0))
 
     def callback_tree_enter(self):
-        selected_topic = self.topic_tree_widget.currentIndex().parent().data()
-        selected_field = self.topic_tree_widget.currentIndex().data()
-        self.toggle_visible_field(selected_topic, selected_field)
+        self.callback_topic_tree_clicked(self.topic_tree_view.currentIndex())
 
-    def callback_topic_tree_clicked(self, item, col):
-        # Do nothing if a topic was pressed
-        if item.parent() is None:
-            item.setSelected(False)
-            item.setExpanded(not item.isExpanded())
+    def callback_topic_tree_clicked(self, index):
+        if not index.isValid():
+            return
+        # Only expand or collapse if a topic was pressed
+        selected_topic, selected_field = self.topic_tree_model.get_topic_and_field(index)
+        if selected_field is None:
+            self.topic_tree_view.setExpanded(index, not self.topic_tree_view.isExpanded(index))
             return
-
-        # Get the selected topic and field as strings
-        selected_topic = item.parent().text(0)
-        selected_field = item.text(0)
 
         self.toggle_visible_field(selected_topic, selected_field)
 
@@ -750,35 +1454,264 @@ class Window(QtGui.QMainWindow):
 
         self.update_frontend()
 
-    def add_curve(self, graph_id, elem, color_brush):
-        time = self.backend.graph_data[graph_id].df_dict[elem.selected_topic].index
-        y_value = self.backend.graph_data[graph_id].df_dict[elem.selected_topic][elem.selected_field].values
-        max_y_diff = np.max(y_value) - np.min(y_value)
+    # The curves of the overlaid logfiles in the main graph are updated with the main graph
+    def update_curve_level_of_detail(self, graph_id):
+        graph_ids = [graph_id]
+        if graph_id == 0 and not self.backend.overlay_small_multiples:
+            graph_ids += self.backend.overlay_graph_ids
+        for graph_id in graph_ids:
+            for curve_items in self.backend.graph_data[graph_id].curve_items.values():
+                self.set_curve_level_of_detail(graph_id, curve_items)
+
+    # Only plot the samples needed for the visible range, the rescaling keeps the min/max samples of the pyramid. The
+    # samples are shifted by the time offset of the logfile. The nan samples are marked at the start and end of the
+    # visible runs
+    def set_curve_level_of_detail(self, graph_id, curve_items):
+        graph = self.get_graph(graph_id)
+        time_offset = self.backend.graph_data[graph_id].time_offset
+        x_range = graph.viewRange()[0]
+        indices = curve_items.pyramid.get_indices(x_range[0] - time_offset, x_range[1] - time_offset, graph.getViewBox().width())
+        curve_items.curve.setData(curve_items.time[indices] + time_offset, curve_items.y_value[indices])
+        if curve_items.nan_curve is not None:
+            pixel_width = (x_range[1] - x_range[0]) / max(graph.getViewBox().width(), 1)
+            time_of_nans = curve_items.pyramid.nan_runs.get_markers(curve_items.time, x_range[0] - time_offset, x_range[1] - time_offset, pixel_width)
+            curve_items.nan_curve.setData(time_of_nans + time_offset, np.zeros(len(time_of_nans)))
+
+    # Returns the values of a field as they are displayed, rescaled to [0,1] if enabled
+    def get_displayed_values(self, graph_id, elem):
+        y_value = self.backend.graph_data[graph_id].get_field(elem.selected_topic, elem.selected_field).values
         if self.backend.rescale_curves:
+            max_y_diff = np.max(y_value) - np.min(y_value)
             if max_y_diff > 0:
                 y_value = (y_value - np.min(y_value)) / max_y_diff
             else:
                 y_value = 0 * y_value
 
-        pen = pg.mkPen(width=self.backend.line_width, color=color_brush)
-        curve = self.graph[graph_id].plot(time, y_value, pen=pen, name=elem.selected_topic_and_field, symbol=self.backend.symbol, symbolBrush=color_brush, symbolPen=color_brush)
+        return y_value
 
-        # Add a marker if any of the samples are nan
-        if np.isnan(y_value).any():
-            time_of_nans = time[np.isnan(y_value)]
-            zero_vector = 0 * time_of_nans
-            curve = self.graph[graph_id].plot(time_of_nans, zero_vector, pen=pen, name=elem.selected_topic_and_field, symbol='t', symbolBrush=color_brush, symbolPen=color_brush, symbolSize=20)
+    def add_curve(self, graph_id, elem, color_brush):
+        y_value = self.get_displayed_values(graph_id, elem)
+        time = self.backend.graph_data[graph_id].df_dict[elem.selected_topic].index.values
+        pyramid = self.backend.graph_data[graph_id].get_min_max_pyramid(elem.selected_topic, elem.selected_field)
+
+        graph = self.get_graph(graph_id)
+        pen = self.get_pen(graph_id, color_brush)
+        curve = graph.plot(pen=pen, name=self.get_curve_name(graph_id, elem), symbol=self.backend.symbol, symbolBrush=color_brush, symbolPen=color_brush)
+        curve_items = CurvePlotItems(curve, pyramid, time, y_value)
+        curve_items.style = self.get_curve_style(elem)
+        # Add markers if any of the samples are nan
+        if len(pyramid.nan_runs) > 0:
+            self.add_nan_curve(graph_id, elem, curve_items, color_brush)
+        self.set_curve_level_of_detail(graph_id, curve_items)
+
+        self.backend.graph_data[graph_id].curve_items[elem.selected_topic_and_field] = curve_items
+
+    # Add the item that marks the runs of nan samples of a curve with a line at zero between markers at their start
+    # and end. Its samples are set with the level of detail of the curve
+    def add_nan_curve(self, graph_id, elem, curve_items, color_brush):
+        pen = self.get_pen(graph_id, color_brush)
+        curve_items.nan_curve = self.get_graph(graph_id).plot(pen=pen, connect='pairs', name=self.get_curve_name(graph_id, elem), symbol='t', symbolBrush=color_brush, symbolPen=color_brush, symbolSize=20)
+
+    def get_curve_style(self, elem):
+        return tuple(elem.color), self.backend.line_width, self.backend.symbol, self.backend.rescale_curves
+
+    # Update the pens and values of a displayed curve in place if its color, the bold, marker or rescale setting changed
+    def update_curve_style(self, graph_id, elem, color_brush):
+        curve_items = self.backend.graph_data[graph_id].curve_items[elem.selected_topic_and_field]
+        style = self.get_curve_style(elem)
+        if curve_items.style == style:
+            return
 
-    def update_frontend(self):
-        self.fronted_cleanup()
+        if curve_items.style[3] != self.backend.rescale_curves:
+            curve_items.y_value = self.get_displayed_values(graph_id, elem)
+            self.set_curve_level_of_detail(graph_id, curve_items)
+
+        pen = self.get_pen(graph_id, color_brush)
+        curve_items.curve.setPen(pen)
+        curve_items.curve.setSymbol(self.backend.symbol)
+        curve_items.curve.setSymbolBrush(color_brush)
+        curve_items.curve.setSymbolPen(color_brush)
+        if curve_items.nan_curve is not None:
+            curve_items.nan_curve.setPen(pen)
+            curve_items.nan_curve.setSymbolBrush(color_brush)
+            curve_items.nan_curve.setSymbolPen(color_brush)
+        curve_items.style = style
+
+    def remove_curves(self, graph_id, selected_topic_and_fields):
+        graph_data = self.backend.graph_data[graph_id]
+        for selected_topic_and_field in selected_topic_and_fields:
+            for item in graph_data.curve_items.pop(selected_topic_and_field).items:
+                self.get_graph(graph_id).removeItem(item)
+                if graph_data.legend_obj is not None:
+                    graph_data.legend_obj.removeItem(selected_topic_and_field)
+
+    # Add, remove and restyle the curves of a graph so that they match the curve list. Curves that did not change
+    # keep their plot items
+    def update_curves(self, graph_id, curve_list):
+        curve_items = self.backend.graph_data[graph_id].curve_items
+        selected_topic_and_fields = [elem.selected_topic_and_field for elem in curve_list]
+        self.remove_curves(graph_id, [elem for elem in curve_items if elem not in selected_topic_and_fields])
+
+        for elem in curve_list:
+            color_brush = QtGui.QColor(elem.color[0], elem.color[1], elem.color[2])
+            if elem.selected_topic_and_field not in curve_items:
+                # Curves of topics that are still decoded in the background are plotted when the topic is ready. The
+                # topics of overlaid logfiles are decoded by their loader when they are first plotted
+                df_dict = self.backend.graph_data[graph_id].df_dict
+                if not df_dict.is_loaded(elem.selected_topic) and (self.is_loading(graph_id) or (graph_id >= FIRST_OVERLAY_ID and elem.selected_topic in df_dict)):
+                    self.load_topic(graph_id, elem.selected_topic)
+                    continue
+                # Try to add the field to the secondary graph. Will fail if not present in secondary logfile
+                if graph_id == 0:
+                    self.add_curve(graph_id, elem, color_brush)
+                else:
+                    try:
+                        self.add_curve(graph_id, elem, color_brush)
+                    except:
+                        continue
+
+            self.update_curve_style(graph_id, elem, color_brush)
+
+    def update_legend(self, graph_id, show):
+        graph_data = self.backend.graph_data[graph_id]
+        if show and graph_data.legend_obj is None:
+            graph_data.legend_obj = self.get_graph(graph_id).addLegend()
+            # The legend of the main graph includes the overlaid logfiles displayed in it
+            graph_ids = [graph_id]
+            if graph_id == 0 and not self.backend.overlay_small_multiples:
+                graph_ids += self.backend.overlay_graph_ids
+            for graph_id in graph_ids:
+                for curve_items in self.backend.graph_data[graph_id].curve_items.values():
+                    for item in curve_items.items:
+                        graph_data.legend_obj.addItem(item, item.name())
+
+        elif not show and graph_data.legend_obj is not None:
+            if graph_data.legend_obj.scene() is not None:
+                graph_data.legend_obj.scene().removeItem(graph_data.legend_obj)
+            self.get_graph(graph_id).getPlotItem().legend = None
+            graph_data.legend_obj = None
+
+    # Show the lines of an event line item. The item is created the first time and reused after, it is only changed
+    # if the lines changed
+    def show_event_lines(self, graph_id, lines_obj, times, colors, labels=None):
+        if lines_obj is None:
+            lines_obj = EventLinesItem()
+            self.graph[graph_id].addItem(lines_obj, ignoreBounds=True)
+        lines_obj.setData(times, colors, labels)
+        lines_obj.show()
+        return lines_obj
+
+    # Remove the event line items of a graph, used before another logfile is opened
+    def remove_event_lines(self, graph_id):
+        graph_data = self.backend.graph_data[graph_id]
+        for lines_obj in [graph_data.ft_lines_obj, graph_data.bt_lines_obj, graph_data.parameter_lines_obj, graph_data.event_lines_obj]:
+            if lines_obj is not None:
+                self.graph[graph_id].removeItem(lines_obj)
+        graph_data.ft_lines_obj = None
+        graph_data.bt_lines_obj = None
+        graph_data.parameter_lines_obj = None
+        graph_data.event_lines_obj = None
+
+    # Display lines at start and stop of the transitions
+    def update_transition_lines(self, graph_id, show):
+        graph_data = self.backend.graph_data[graph_id]
+        if show:
+            graph_data.ft_lines_obj = self.show_event_lines(graph_id, graph_data.ft_lines_obj, np.array(graph_data.forward_transition_lines) + graph_data.time_offset, (0, 255, 0))
+            graph_data.bt_lines_obj = self.show_event_lines(graph_id, graph_data.bt_lines_obj, np.array(graph_data.back_transition_lines) + graph_data.time_offset, (255, 0, 0))
+
+        else:
+            for lines_obj in [graph_data.ft_lines_obj, graph_data.bt_lines_obj]:
+                if lines_obj is not None:
+                    lines_obj.hide()
+
+    # Display a line at every event of the event index in the color of its category
+    def update_event_lines(self, graph_id, show):
+        graph_data = self.backend.graph_data[graph_id]
+        if show:
+            event_index = graph_data.get_event_index()
+            category_colors = [EVENT_COLORS[category] for category in EVENT_CATEGORIES]
+            graph_data.event_lines_obj = self.show_event_lines(graph_id, graph_data.event_lines_obj, event_index.times + graph_data.time_offset,
+                                                               [category_colors[category] for category in event_index.categories.tolist()])
+
+        elif graph_data.event_lines_obj is not None:
+            graph_data.event_lines_obj.hide()
+
+    # Display a labelled line at every parameter change
+    def update_parameter_lines(self, graph_id, show):
+        graph_data = self.backend.graph_data[graph_id]
+        if show:
+            times, labels = self.get_parameter_change_lines(graph_id)
+            graph_data.parameter_lines_obj = self.show_event_lines(graph_id, graph_data.parameter_lines_obj, times, (0, 0, 0), labels)
+
+        elif graph_data.parameter_lines_obj is not None:
+            graph_data.parameter_lines_obj.hide()
+
+    def update_marker_line(self, graph_id, show):
+        graph_data = self.backend.graph_data[graph_id]
+        if show and graph_data.marker_line_obj is None:
+            graph_data.marker_line_obj = pg.InfiniteLine(angle=90, movable=True, pos=graph_data.marker_line_pos, pen=pg.mkPen(color='b'), label='', labelOpts={'position': 0.1, 'color': (0, 0, 0), 'fill': (200, 200, 200, 100), 'movable': True})
+            graph_data.marker_line_obj.sigDragged.connect(partial(self.update_marker_line_status, graph_id))
+            self.graph[graph_id].addItem(graph_data.marker_line_obj, ignoreBounds=True)
+
+        elif not show and graph_data.marker_line_obj is not None:
+            self.graph[graph_id].removeItem(graph_data.marker_line_obj)
+            graph_data.marker_line_obj = None
+
+        # The label depends on the displayed curves
+        if graph_data.marker_line_obj is not None:
+            self.update_marker_line_status(graph_id)
 
-        # Set all topic colors to white in the tree
-        for topic_index in range(self.topic_tree_widget.topLevelItemCount()):
-            self.topic_tree_widget.topLevelItem(topic_index).setBackground(0, QtGui.QBrush(QtCore.Qt.white))
+    # Display the 2D trajectory in the secondary graph. It is only redrawn if the logfile or the line width changed
+    def update_trajectory_graph(self, show):
+        trajectory_style = None
+        if show:
+            trajectory_style = (self.backend.graph_data[0].path_to_logfile, self.backend.line_width)
+        if trajectory_style == self.backend.trajectory_style:
+            return
 
-        if self.backend.show_legend:
-            self.backend.graph_data[0].legend_obj = self.graph[0].addLegend()
-            self.backend.graph_data[1].legend_obj = self.graph[1].addLegend()
+        for elem in self.backend.trajectory_curves_obj + [self.backend.arrow_obj, self.backend.current_sp_marker_obj]:
+            if elem is not None:
+                self.graph[1].removeItem(elem)
+        self.backend.trajectory_curves_obj = []
+        self.backend.arrow_obj = None
+        self.backend.current_sp_marker_obj = None
+        self.backend.trajectory_style = trajectory_style
+        self.graph[1].setAspectLocked(lock=show, ratio=1)
+        if not show:
+            return
+
+        # Plot estimated position
+        try:
+            north_estimated = self.backend.graph_data[0].get_field('vehicle_local_position_0', 'x').values
+            east_estimated = self.backend.graph_data[0].get_field('vehicle_local_position_0', 'y').values
+            pen = pg.mkPen(width=self.backend.line_width, color='b')
+            curve = self.graph[1].plot(east_estimated, north_estimated, name='vehicle_local_position_0', pen=pen)
+            self.backend.trajectory_curves_obj.append(curve)
+        except:
+            pass
+
+        # Plot measured GPS position
+        try:
+            north_measured = self.backend.graph_data[0].get_field('vehicle_gps_position_0', 'lat_m*').values
+            east_gps_measured = self.backend.graph_data[0].get_field('vehicle_gps_position_0', 'lon_m*').values
+            pen = pg.mkPen(width=self.backend.line_width, color='r')
+            curve = self.graph[1].plot(east_gps_measured, north_measured, name='vehicle_gps_position_0', pen=pen)
+            self.backend.trajectory_curves_obj.append(curve)
+        except:
+            pass
+
+        # Plot mission setpoints
+        try:
+            north_setpoint = self.backend.graph_data[0].get_field('position_setpoint_triplet_0', 'current.lat_m*').values
+            east_setpoint = self.backend.graph_data[0].get_field('position_setpoint_triplet_0', 'current.lon_m*').values
+            pen = pg.mkPen(width=self.backend.line_width, color='g')
+            curve = self.graph[1].plot(east_setpoint, north_setpoint, name='position_setpoint_triplet_0', pen=pen, symbol='o')
+            self.backend.trajectory_curves_obj.append(curve)
+        except:
+            pass
+
+    def update_frontend(self):
+        self.selected_fields_list_widget.clear()
         for elem in self.backend.curve_list:
             color_brush = QtGui.QColor(elem.color[0], elem.color[1], elem.color[2])
             # Add the newly selected field to the list of all currently selected fields
@@ -786,56 +1719,47 @@ class Window(QtGui.QMainWindow):
             new_list_item.setBackground(color_brush)
             self.selected_fields_list_widget.addItem(new_list_item)
 
-            # Show the current curve class element as selected in the tree view and the corresponding topic as grey
-            top_level_item = self.topic_tree_widget.findItems(elem.selected_topic, QtCore.Qt.MatchExactly)[0]
-            top_level_item.setBackground(0, QtGui.QBrush(QtCore.Qt.gray))
-            for field_index in range(top_level_item.childCount()):
-                field_name = top_level_item.child(field_index).text(0)
-                if field_name == elem.selected_field:
-                    top_level_item.child(field_index).setSelected(True)
-                    break
-
-            self.add_curve(0, elem, color_brush)
+        # Show the current curve class elements as selected in the tree view and their topics as grey
+        self.topic_tree_model.set_plotted_fields([(elem.selected_topic, elem.selected_field) for elem in self.backend.curve_list])
 
-            if self.split_screen_mode() == 'secondary_logfile':
-                try:
-                    self.add_curve(1, elem, color_brush)
-                except:
-                    pass
+        # The secondary logfile is aligned with the main logfile when their x axes are linked, its curves and lines are
+        # plotted again at the new times
+        if not self.is_indexing(0) and not self.is_indexing(1) and self.backend.align_secondary_logfile():
+            self.remove_curves(1, list(self.backend.graph_data[1].curve_items))
+            self.update_parameter_lines(1, False)
+            self.update_transition_lines(1, False)
+            self.update_event_lines(1, False)
+            self.statusBar().showMessage('Secondary logfile shifted by {:+.3f} s'.format(self.backend.graph_data[1].time_offset), 2000)
 
-        max_range = range(1)
-        if self.split_screen_mode() == 'secondary_logfile':
-            max_range = range(2)
-        for graph_id in max_range:
+        # Only the differences to the currently displayed items are drawn
+        for graph_id in range(2):
+            # Nothing is displayed in a graph while the names in its logfile are not known
+            show = (graph_id == 0 or self.split_screen_mode() == 'secondary_logfile') and not self.is_indexing(graph_id)
+            self.update_legend(graph_id, show and self.backend.show_legend)
+            self.update_curves(graph_id, self.backend.curve_list if show else [])
             # Display parameter changes
-            if self.backend.show_changed_parameters:
-                self.plot_parameter_changes(graph_id)
+            self.update_parameter_lines(graph_id, show and self.backend.show_changed_parameters)
             # Display marker line
-            if self.backend.graph_data[graph_id].show_marker_line:
-                self.backend.graph_data[graph_id].marker_line_obj = pg.InfiniteLine(angle=90, movable=True, pos=self.backend.graph_data[graph_id].marker_line_pos, pen=pg.mkPen(color='b'), label='', labelOpts={'position': 0.1, 'color': (0, 0, 0), 'fill': (200, 200, 200, 100), 'movable': True})
-                self.backend.graph_data[graph_id].marker_line_obj.sigDragged.connect(partial(self.update_marker_line_status, graph_id))
-                self.graph[graph_id].addItem(self.backend.graph_data[graph_id].marker_line_obj, ignoreBounds=True)
-                self.update_marker_line_status(graph_id)
-                # Display lines at start and stop of forward transition
-            if self.backend.show_transition_lines:
-                for elem in self.backend.graph_data[graph_id].forward_transition_lines:
-                    vLine = pg.InfiniteLine(angle=90, movable=False, pos=elem, pen=pg.mkPen(color='g'))
-                    vLine.show()
-                    self.backend.graph_data[graph_id].ft_lines_obj.append(vLine)
-                    self.graph[graph_id].addItem(vLine, ignoreBounds=True)
-
-                for elem in self.backend.graph_data[graph_id].back_transition_lines:
-                    vLine = pg.InfiniteLine(angle=90, movable=False, pos=elem, pen=pg.mkPen(color='r'))
-                    vLine.show()
-                    self.backend.graph_data[graph_id].bt_lines_obj.append(vLine)
-                    self.graph[graph_id].addItem(vLine, ignoreBounds=True)
-
-            # Display ROI
+            self.update_marker_line(graph_id, show and self.backend.graph_data[graph_id].show_marker_line)
+            self.update_transition_lines(graph_id, show and self.backend.show_transition_lines)
+            self.update_event_lines(graph_id, show and self.backend.show_events)
+        # The overlaid logfiles are displayed with the main logfile
+        for graph_id in self.backend.overlay_graph_ids:
+            self.update_curves(graph_id, self.backend.curve_list if not self.is_indexing(0) and not self.is_indexing(graph_id) else [])
+            if self.backend.overlay_small_multiples:
+                self.update_legend(graph_id, self.backend.show_legend)
+
+        # Display ROI
         if self.backend.show_ROI:
             self.ROI_region.show()
+            self.ROI_statistics_table.show()
+            self.update_ROI_statistics()
+        else:
+            self.ROI_region.hide()
+            self.ROI_statistics_table.hide()
 
         # Autorange
-        if len(self.backend.curve_list) > 0 and self.backend.auto_range:
+        if len(self.backend.graph_data[0].curve_items) > 0 and self.backend.auto_range:
             self.graph[0].autoRange()
             if self.split_screen_mode() == 'secondary_logfile':
                 self.graph[1].autoRange()
@@ -858,41 +1782,21 @@ class Window(QtGui.QMainWindow):
                 self.graph[1].setTitle(self.backend.graph_data[1].title)
             else:
                 self.graph[1].setTitle(self.backend.graph_data[0].title)
+        else:
+            self.graph[0].setTitle(None)
+            self.graph[1].setTitle(None)
 
         if self.backend.link_x_range and self.split_screen_mode() == 'secondary_logfile':
             self.graph[1].getViewBox().setXLink(self.graph[0])
+        else:
+            self.graph[1].getViewBox().setXLink(None)
         if self.backend.link_y_range and self.split_screen_mode() == 'secondary_logfile':
             self.graph[1].getViewBox().setYLink(self.graph[0])
+        else:
+            self.graph[1].getViewBox().setYLink(None)
 
         # Update 2D trajectory graph if enabled
-        if self.split_screen_mode() == 'trajectory':
-            self.graph[1].setAspectLocked(lock=True, ratio=1)
-            # Plot estimated position
-            try:
-                north_estimated = self.backend.graph_data[0].df_dict['vehicle_local_position_0']['x'].values
-                east_estimated = self.backend.graph_data[0].df_dict['vehicle_local_position_0']['y'].values
-                pen = pg.mkPen(width=self.backend.line_width, color='b')
-                curve = self.graph[1].plot(east_estimated, north_estimated, name='vehicle_local_position_0', pen=pen)
-            except:
-                pass
-
-            # Plot measured GPS position
-            try:
-                north_measured = self.backend.graph_data[0].df_dict['vehicle_gps_position_0']['lat_m*'].values
-                east_gps_measured = self.backend.graph_data[0].df_dict['vehicle_gps_position_0']['lon_m*'].values
-                pen = pg.mkPen(width=self.backend.line_width, color='r')
-                curve = self.graph[1].plot(east_gps_measured, north_measured, name='vehicle_gps_position_0', pen=pen)
-            except:
-                pass
-
-            # Plot mission setpoints
-            try:
-                north_setpoint = self.backend.graph_data[0].df_dict['position_setpoint_triplet_0']['current.lat_m*'].values
-                east_setpoint = self.backend.graph_data[0].df_dict['position_setpoint_triplet_0']['current.lon_m*'].values
-                pen = pg.mkPen(width=self.backend.line_width, color='g')
-                curve = self.graph[1].plot(east_setpoint, north_setpoint, name='position_setpoint_triplet_0', pen=pen, symbol='o')
-            except:
-                pass
+        self.update_trajectory_graph(self.split_screen_mode() == 'trajectory' and not self.is_indexing(0))
 
 
 def main():
@@ -0,0 +1,174 @@
+# Replay a uLog file as a live stream at a multiple of the logged speed, stands in for a vehicle to test the stream
+# input of ulog_explorer (--stream). Qt is not imported
+# Run with: python3 ulog_replay.py <logfile> <udp://host:port or named pipe> [-s speed], see python3 ulog_replay.py -h
+
+import argparse
+import mmap
+import os
+import socket
+import stat
+import time
+from array import array
+import numpy as np
+from pyulog import ULog
+from ULogIndex import ULogIndex, scan_messages
+from ULogStream import get_udp_address
+
+# Range of the replay speed
+MIN_SPEED = 1
+MAX_SPEED = 50
+# Interval at which the messages that are due are sent [s]
+SEND_INTERVAL = 0.005
+# Interval at which the definitions are sent again over UDP, so a receiver can join the stream at any time [s]
+DEFINITIONS_INTERVAL = 1.0
+# Maximum size of the UDP datagrams, a larger message is sent in a datagram of its own [bytes]
+DATAGRAM_SIZE = 1 << 15
+
+
+# Returns the offsets of the messages in the definitions section
+def get_definition_positions(buf, data_start):
+    positions = []
+    pos = 16
+    while pos < data_start:
+        positions.append(pos)
+        pos += 3 + (buf[pos] | (buf[pos + 1] << 8))
+
+    return np.array(positions, dtype=np.int64)
+
+
+# Returns the time of every message in the data section [us]. Data messages are sent at their timestamp, all other
+# messages at the latest timestamp before them
+def get_message_times(ulog_index, positions):
+    message_times = np.zeros(len(positions), dtype=np.uint64)
+    for topic_name, topic in ulog_index.topics.items():
+        message_times[np.searchsorted(positions, topic.offsets)] = ulog_index.get_timestamps(topic_name)
+
+    return np.maximum.accumulate(message_times)
+
+
+# Returns the (start, stop) byte ranges that the messages at positions, the last one ending at end, are sent in. Every
+# range contains complete messages and is at most max_size long, unless it is a single longer message
+def split_messages(positions, end, max_size):
+    bounds = np.append(positions, end)
+    ranges = []
+    idx = 0
+    while idx < len(positions):
+        stop_idx = max(int(np.searchsorted(bounds, bounds[idx] + max_size, side='right')) - 1, idx + 1)
+        ranges.append((int(bounds[idx]), int(bounds[stop_idx])))
+        idx = stop_idx
+
+    return ranges
+
+
+# Destination of the replayed stream. Through a named pipe the content of the logfile is written as it is. Over UDP the
+# messages are sent in datagrams of complete messages, and the definitions are sent again at a fixed interval in
+# datagrams that start with the file header
+class ReplayTarget():
+    def __init__(self, target_str):
+        udp_address = get_udp_address(target_str)
+        if udp_address is not None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.connect(('127.0.0.1' if udp_address[0] == '0.0.0.0' else udp_address[0], udp_address[1]))
+            self._pipe = None
+        else:
+            if not os.path.exists(target_str):
+                os.mkfifo(target_str)
+            elif not stat.S_ISFIFO(os.stat(target_str).st_mode):
+                raise SystemExit("ERROR: " + target_str + " is not a named pipe or udp://host:port")
+            print("Waiting for a reader of " + target_str)
+            self._pipe = open(target_str, 'wb', buffering=0)
+            self._socket = None
+
+    @property
+    def is_udp(self):
+        return self._socket is not None
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+        if self._pipe is not None:
+            self._pipe.close()
+
+    # Send the messages at positions, the last one ending at end
+    def send_messages(self, buf, positions, end):
+        if self._pipe is not None:
+            self._pipe.write(buf[positions[0]:end])
+            return
+
+        for start, stop in split_messages(positions, end, DATAGRAM_SIZE):
+            self._send_datagram(buf[start:stop])
+
+    # Send the file header, the definitions and the subscriptions sent so far, only over UDP
+    def send_definitions(self, buf, definition_positions, data_start, subscription_positions):
+        header = buf[:16]
+        for start, stop in split_messages(definition_positions, data_start, DATAGRAM_SIZE - len(header)):
+            self._send_datagram(header + buf[start:stop])
+        if len(subscription_positions) > 0:
+            subscriptions = b''.join(buf[pos:pos + 3 + (buf[pos] | (buf[pos + 1] << 8))] for pos in subscription_positions)
+            self._send_datagram(header + subscriptions)
+
+    def _send_datagram(self, datagram):
+        try:
+            self._socket.send(datagram)
+        except ConnectionRefusedError:
+            # Nobody is receiving yet
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a uLog file as a live stream')
+    parser.add_argument('logfile', type=str, help='uLog file to replay')
+    parser.add_argument('target', type=str, help='udp://host:port or path of a named pipe, the pipe is created if it does not exist')
+    parser.add_argument('-s', '--speed', type=float, default=1, help='Replay speed as a multiple of the logged speed, {:d} to {:d} (default: 1)'.format(MIN_SPEED, MAX_SPEED))
+    args = parser.parse_args()
+    if not MIN_SPEED <= args.speed <= MAX_SPEED:
+        raise SystemExit("ERROR: The speed has to be between {:d} and {:d}".format(MIN_SPEED, MAX_SPEED))
+
+    ulog_index = ULogIndex(args.logfile)
+    with open(args.logfile, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    positions = array('q')
+    end, corrupt_pos = scan_messages(buf, ulog_index.data_start, len(buf), positions)
+    positions = np.frombuffer(positions, dtype=np.int64)
+    if len(positions) == 0:
+        raise SystemExit("ERROR: No messages to replay in " + args.logfile)
+    message_times = get_message_times(ulog_index, positions)
+    ulog_index.close()
+    definition_positions = get_definition_positions(buf, ulog_index.data_start)
+    subscription_positions = positions[np.frombuffer(buf, dtype=np.uint8)[positions + 2] == ULog.MSG_TYPE_ADD_LOGGED_MSG].tolist()
+
+    target = ReplayTarget(args.target)
+    print("Replaying {:s} at {:g}x to {:s}".format(args.logfile, args.speed, args.target))
+    if not target.is_udp:
+        target.send_messages(buf, np.zeros(1, dtype=np.int64), ulog_index.data_start)
+
+    first_time = int(message_times[message_times > 0][0]) if (message_times > 0).any() else 0
+    start = time.monotonic()
+    next_definitions = start
+    idx = 0
+    try:
+        while idx < len(positions):
+            now = time.monotonic()
+            if target.is_udp and now >= next_definitions:
+                num_sent_subscriptions = int(np.searchsorted(subscription_positions, positions[idx]))
+                target.send_definitions(buf, definition_positions, ulog_index.data_start, subscription_positions[:num_sent_subscriptions])
+                next_definitions = now + DEFINITIONS_INTERVAL
+
+            stop_idx = int(np.searchsorted(message_times, first_time + (now - start) * args.speed * 1e6, side='right'))
+            if stop_idx > idx:
+                target.send_messages(buf, positions[idx:stop_idx], positions[stop_idx] if stop_idx < len(positions) else end)
+                idx = stop_idx
+            else:
+                time.sleep(SEND_INTERVAL)
+    except (BrokenPipeError, KeyboardInterrupt) as ex:
+        print("Stopped replay: " + (str(ex) or type(ex).__name__))
+    finally:
+        target.close()
+        buf.close()
+
+    duration = time.monotonic() - start
+    print("Sent {:d} messages in {:.1f} s, {:.0f} messages/s".format(idx, duration, idx / max(duration, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()